@@ -0,0 +1,250 @@
+import csv
+import json
+import time
+import bisect
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import market_data
+import telemetry
+
+
+class Alert:
+    __slots__ = ('id', 'symbol', 'target_price', 'alert_type', 'callback', 'created_at',
+                 'triggered_at', 'triggered_price')
+
+    def __init__(self, alert_id, symbol, target_price, alert_type, callback=None):
+        self.id = alert_id
+        self.symbol = symbol
+        self.target_price = target_price
+        self.alert_type = alert_type
+        self.callback = callback
+        self.created_at = time.time()
+        self.triggered_at = None
+        self.triggered_price = None
+
+    def message(self):
+        if self.alert_type == 'above':
+            return f"Alert: {self.symbol} has reached {self.triggered_price}, above target {self.target_price}"
+        return f"Alert: {self.symbol} has dropped to {self.triggered_price}, below target {self.target_price}"
+
+    def __repr__(self):
+        return f"Alert({self.id}, {self.symbol} {self.alert_type} {self.target_price})"
+
+
+class YahooQuoteSource:
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+
+    def get_quotes(self, symbols):
+        import yfinance as yf
+
+        symbols = list(symbols)
+        quotes = {}
+        try:
+            with telemetry.track('yahoo', 'quotes'):
+                data = yf.download(symbols, period='1d', interval='1m', group_by='ticker', progress=False,
+                                   **market_data.session_kwargs())
+            for symbol in symbols:
+                frame = market_data._symbol_frame(data, symbol)
+                if frame is not None and not frame['Close'].dropna().empty:
+                    quotes[symbol] = float(frame['Close'].dropna().iloc[-1])
+        except Exception:
+            pass
+
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            def live_price(symbol):
+                try:
+                    return symbol, float(market_data.get_live_price(symbol, max_age=0))
+                except Exception:
+                    return symbol, None
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for symbol, price in executor.map(live_price, missing):
+                    if price is not None:
+                        quotes[symbol] = price
+        return quotes
+
+
+class ReplayQuoteSource:
+    def __init__(self, path):
+        self.path = path
+        self._batches = None
+        self._position = 0
+        self._last = {}
+
+    def _load(self):
+        rows = []
+        with open(self.path, newline='') as f:
+            if self.path.endswith('.jsonl'):
+                for line in f:
+                    if line.strip():
+                        tick = json.loads(line)
+                        rows.append((float(tick['timestamp']), tick['symbol'].upper(), float(tick['price'])))
+            else:
+                for tick in csv.DictReader(f):
+                    rows.append((float(tick['timestamp']), tick['symbol'].upper(), float(tick['price'])))
+        rows.sort(key=lambda row: row[0])
+        self._batches = [
+            (timestamp, {symbol: price for _, symbol, price in group})
+            for timestamp, group in itertools.groupby(rows, key=lambda row: row[0])
+        ]
+
+    @property
+    def exhausted(self):
+        if self._batches is None:
+            self._load()
+        return self._position >= len(self._batches)
+
+    def ticks(self):
+        if self._batches is None:
+            self._load()
+        for timestamp, prices in self._batches:
+            for symbol, price in prices.items():
+                yield timestamp, symbol, price
+
+    def get_quotes(self, symbols):
+        if self.exhausted:
+            return {}
+        _, prices = self._batches[self._position]
+        self._position += 1
+        self._last.update(prices)
+        return {symbol: self._last[symbol] for symbol in symbols if symbol in self._last}
+
+
+class AlertEngine:
+    def __init__(self, quote_source=None, interval=60, on_trigger=None):
+        self.quote_source = quote_source or YahooQuoteSource()
+        self.interval = interval
+        self.on_trigger = on_trigger
+        self._alerts = {}
+        self._above = {}
+        self._below = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_poll = {}
+
+    def add_alert(self, symbol, target_price, alert_type='above', callback=None):
+        if alert_type not in ('above', 'below'):
+            raise ValueError(f"Invalid alert type: {alert_type}")
+        symbol = symbol.upper()
+        with self._lock:
+            alert = Alert(next(self._ids), symbol, float(target_price), alert_type, callback)
+            index = self._above if alert_type == 'above' else self._below
+            bisect.insort(index.setdefault(symbol, []), (alert.target_price, alert.id))
+            self._alerts[alert.id] = alert
+        return alert
+
+    def remove_alert(self, alert_id):
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return False
+            index = self._above if alert.alert_type == 'above' else self._below
+            entries = index[alert.symbol]
+            position = bisect.bisect_left(entries, (alert.target_price, alert.id))
+            del entries[position]
+            if not entries:
+                del index[alert.symbol]
+            return True
+
+    def alerts(self, symbol=None):
+        with self._lock:
+            return [alert for alert in self._alerts.values() if symbol is None or alert.symbol == symbol.upper()]
+
+    def symbols(self):
+        with self._lock:
+            return set(self._above) | set(self._below)
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def process_tick(self, symbol, price, timestamp=None):
+        symbol = symbol.upper()
+        timestamp = timestamp or time.time()
+        fired = []
+        with self._lock:
+            # Above alerts fire for every target <= price (a sorted prefix),
+            # below alerts for every target >= price (a sorted suffix).
+            entries = self._above.get(symbol)
+            if entries:
+                cut = bisect.bisect_right(entries, (price, float('inf')))
+                if cut:
+                    fired.extend(entries[:cut])
+                    del entries[:cut]
+                    if not entries:
+                        del self._above[symbol]
+
+            entries = self._below.get(symbol)
+            if entries:
+                cut = bisect.bisect_left(entries, (price, -1))
+                if cut < len(entries):
+                    fired.extend(entries[cut:])
+                    del entries[cut:]
+                    if not entries:
+                        del self._below[symbol]
+
+            triggered = [self._alerts.pop(alert_id) for _, alert_id in fired]
+
+        for alert in triggered:
+            alert.triggered_at = timestamp
+            alert.triggered_price = price
+        # Alerts are already out of the engine, so a failing callback must not
+        # keep the others from being notified.
+        for alert in triggered:
+            for notify in (alert.callback, self.on_trigger):
+                if notify is None:
+                    continue
+                try:
+                    notify(alert)
+                except Exception as e:
+                    print(f"Error notifying {alert!r}: {str(e)}")
+        return triggered
+
+    def poll_once(self):
+        symbols = self.symbols()
+        if not symbols:
+            return []
+        quotes = self.quote_source.get_quotes(sorted(symbols))
+        now = time.time()
+        triggered = []
+        for symbol, price in quotes.items():
+            self.last_poll[symbol] = (now, price)
+            triggered.extend(self.process_tick(symbol, price, now))
+        return triggered
+
+    def replay(self, source=None):
+        source = source or self.quote_source
+        triggered = []
+        for timestamp, symbol, price in source.ticks():
+            triggered.extend(self.process_tick(symbol, price, timestamp))
+        return triggered
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling prices: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
@@ -7,16 +7,52 @@ def calculate_roi(initial_value: float, current_value: float) -> float:
     return round(roi, 2)
 
 def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.02) -> float:
-    excess_returns = returns - risk_free_rate
-    return np.sqrt(252) * (excess_returns.mean() / returns.std())
+    # Annualized, from daily returns and an annual risk-free rate (converted to
+    # daily); NaN with fewer than two returns.
+    returns = np.asarray(returns, dtype=float)
+    if np.count_nonzero(~np.isnan(returns)) < 2:
+        return float('nan')
+    return float(calculate_sharpe_ratios(returns[:, None], risk_free_rate)[0])
 
 def calculate_volatility(returns: pd.Series) -> float:
     return returns.std() * np.sqrt(252) * 100
 
 def track_profit_loss(positions: pd.DataFrame) -> pd.Series:
+    if hasattr(positions, 'profit_loss'):
+        return positions.profit_loss()
     return positions['current_value'] - positions['initial_investment']
 
 def calculate_sector_diversity(positions: pd.DataFrame) -> pd.Series:
+    if hasattr(positions, 'sector_totals'):
+        sector_totals = positions.sector_totals()
+        return sector_totals.div(sector_totals.sum()) * 100
     return (positions.groupby('sector')['current_value']
             .sum()
-            .div(positions['current_value'].sum()) * 100)
\ No newline at end of file
+            .div(positions['current_value'].sum()) * 100)
+
+def calculate_volatilities(returns: np.ndarray) -> np.ndarray:
+    return np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252) * 100
+
+def calculate_sharpe_ratios(returns: np.ndarray, risk_free_rate: float = 0.02) -> np.ndarray:
+    # Daily returns in each column; `risk_free_rate` is annual.
+    excess_returns = returns - risk_free_rate / 252
+    return np.sqrt(252) * (np.nanmean(excess_returns, axis=0) / np.nanstd(returns, axis=0, ddof=1))
+
+def calculate_returns_matrix(prices: np.ndarray) -> np.ndarray:
+    prices = np.asarray(prices, dtype=float)
+    return prices[1:] / prices[:-1] - 1
+
+def calculate_portfolio_returns(returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    weights = np.asarray(weights, dtype=float)
+    # Each day is weighted over the holdings that have a return that day, so a
+    # missing price is not counted as a 0% return.
+    covered = ~np.isnan(returns) @ weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(covered > 0, np.nan_to_num(returns) @ weights / covered, np.nan)
+
+def calculate_max_drawdowns(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    peaks = np.fmax.accumulate(equity, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, 1 - equity / peaks, 0.0)
+    return np.nanmax(drawdowns, axis=0) * 100
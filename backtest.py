@@ -0,0 +1,498 @@
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import telemetry
+from analysis import calculate_roi, calculate_sharpe_ratios, calculate_volatilities, calculate_max_drawdowns
+from risk_management import suggested_position_size
+
+DEFAULT_PARAMS = {
+    'entry': 0.02,
+    'stop': 0.05,
+    'take': 0.10,
+    'horizon': 20,
+    'account_size': 100000.0,
+    'risk_percentage': 2.0,
+    'vol_window': 20
+}
+RISK_FREE_RATE = 0.02
+PARAM_TYPES = {'horizon': int, 'vol_window': int}
+TRADE_FIELDS = ('entry_row', 'exit_row', 'entry_price', 'exit_price', 'shares')
+
+
+def _params(params):
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown backtest parameters: {', '.join(sorted(unknown))}")
+    merged = dict(DEFAULT_PARAMS, **params)
+    return {name: PARAM_TYPES.get(name, float)(value) for name, value in merged.items()}
+
+
+def daily_volatility(close, window=20):
+    import indicators
+
+    close = np.asarray(close, dtype=float)
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return indicators.rolling_std(returns, window)
+
+
+def _symbol_arrays(bars, column):
+    close = bars.close[:, column]
+    rows = np.flatnonzero(np.isfinite(close))
+    if rows.size:
+        rows = np.arange(rows[0], rows[-1] + 1)
+    fields = []
+    for values in (bars.open[:, column], bars.high[:, column], bars.low[:, column], close):
+        values = values[rows].copy()
+        # Fill gaps with the last close so a missing bar is a flat day.
+        missing = ~np.isfinite(values)
+        if missing.any():
+            last = np.maximum.accumulate(np.where(np.isfinite(close[rows]), np.arange(rows.size), 0))
+            values[missing] = close[rows][last][missing]
+        fields.append(values)
+    return rows, fields
+
+
+def _exits(open, high, low, close, entry_rows, entry_prices, stop, take, horizon):
+    n = close.size
+    days = entry_rows[:, None] + np.arange(1, horizon + 1)[None, :]
+    inside = days < n
+    days = np.minimum(days, n - 1)
+    stop_levels = entry_prices * (1 - stop)
+    take_levels = entry_prices * (1 + take)
+    stop_hit = (low[days] <= stop_levels[:, None]) & inside
+    take_hit = (high[days] >= take_levels[:, None]) & inside
+    hit = stop_hit | take_hit
+    any_hit = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+
+    exit_rows = np.where(any_hit, entry_rows + 1 + first, np.minimum(entry_rows + horizon, n - 1))
+    day_open = open[exit_rows]
+    # Within a bar the ticks are open, low, high, close: a gap through
+    # either level fills at the open, otherwise the stop is checked first.
+    take_at_open = any_hit & (day_open >= take_levels)
+    stop_first = any_hit & ~take_at_open & stop_hit[np.arange(entry_rows.size), first]
+    exit_prices = np.where(
+        take_at_open, day_open,
+        np.where(stop_first, np.minimum(day_open, stop_levels),
+                 np.where(any_hit, np.maximum(day_open, take_levels), close[exit_rows]))
+    )
+    return exit_rows, exit_prices
+
+
+def _daily_pnl(close, trades):
+    n = close.size
+    held = np.zeros(n)
+    pnl = np.zeros(n)
+    if trades['shares'].size:
+        np.add.at(held, trades['entry_row'], trades['shares'])
+        np.add.at(held, trades['exit_row'], -trades['shares'])
+        held = np.cumsum(held)
+        np.add.at(pnl, trades['entry_row'], trades['shares'] * (close[trades['entry_row']] - trades['entry_price']))
+        np.add.at(pnl, trades['exit_row'], trades['shares'] * (trades['exit_price'] - close[trades['exit_row']]))
+    pnl[1:] += held[:-1] * np.diff(close)
+    return pnl, held
+
+
+def simulate(open, high, low, close, params, volatility=None):
+    """Vectorized breakout-alert strategy for one symbol's bars."""
+    params = _params(params)
+    n = close.size
+    if volatility is None:
+        volatility = daily_volatility(close, params['vol_window'])
+
+    signal = np.zeros(n, dtype=bool)
+    levels = np.full(n, np.nan)
+    if n > 1:
+        signal[1:] = np.isfinite(volatility[:-1])
+        levels[1:] = close[:-1] * (1 + params['entry'])
+    candidates = np.flatnonzero(signal & (high >= levels))
+    entry_prices = np.maximum(open[candidates], levels[candidates])
+    exit_rows, exit_prices = _exits(open, high, low, close, candidates, entry_prices,
+                                    params['stop'], params['take'], params['horizon'])
+
+    # Trades cannot overlap, so jump from each exit to the next trigger.
+    chosen = []
+    position = 0
+    while position < candidates.size:
+        chosen.append(position)
+        position = np.searchsorted(candidates, exit_rows[position] + 1)
+    chosen = np.asarray(chosen, dtype=int)
+
+    entry_rows = candidates[chosen]
+    sizes = suggested_position_size(params['account_size'], params['risk_percentage'], volatility[entry_rows - 1])
+    trades = {
+        'entry_row': entry_rows,
+        'exit_row': exit_rows[chosen],
+        'entry_price': entry_prices[chosen],
+        'exit_price': exit_prices[chosen],
+        'shares': np.maximum(sizes, 0.0) / entry_prices[chosen]
+    }
+    pnl, held = _daily_pnl(close, trades)
+
+    # Alerts are only armed while flat, i.e. outside (entry, exit] of every trade.
+    in_trade = np.zeros(n + 1)
+    np.add.at(in_trade, trades['entry_row'] + 1, 1)
+    np.add.at(in_trade, trades['exit_row'] + 1, -1)
+    armed = signal & (np.cumsum(in_trade)[:n] == 0)
+    return {'trades': trades, 'pnl': pnl, 'held': held,
+            'signals': int(armed.sum()), 'triggers': int(entry_rows.size)}
+
+
+class EventBacktester:
+    """Replays bars tick by tick (open, low, high, close) through an AlertEngine."""
+
+    def __init__(self, bars, **params):
+        from alert_engine import AlertEngine
+
+        self.bars = bars
+        self.params = _params(params)
+        self.engine = AlertEngine()
+        self._states = {}
+
+    def _fill(self, alert):
+        state = self._states[alert.symbol]
+        # A gap through the level fills at the open, otherwise at the level.
+        return alert.triggered_price if state['tick'] == 'open' else alert.target_price
+
+    def _on_entry(self, alert):
+        state = self._states[alert.symbol]
+        price = self._fill(alert)
+        state['entry_alert'] = None
+        state['triggers'] += 1
+        state['shares'] = max(state['size'], 0.0) / price
+        state['entry_price'] = price
+        state['entry_row'] = state['row']
+        state['cash'] -= state['shares'] * price
+
+    def _on_exit(self, alert):
+        self._close(alert.symbol, self._fill(alert))
+
+    def _close(self, symbol, price):
+        state = self._states[symbol]
+        for alert_id in state['exit_alerts']:
+            self.engine.remove_alert(alert_id)
+        state['exit_alerts'] = ()
+        state['cash'] += state['shares'] * price
+        state['trades'].append((state['entry_row'], state['row'], state['entry_price'], price, state['shares']))
+        state['shares'] = 0.0
+
+    def _bar(self, symbol, row, open, high, low, close, previous_close, last):
+        params = self.params
+        state = self._states[symbol]
+        state['row'] = row
+        for tick, price in (('open', open), ('low', low), ('high', high), ('close', close)):
+            state['tick'] = tick
+            self.engine.process_tick(symbol, price)
+
+        if state['entry_alert'] is not None:
+            self.engine.remove_alert(state['entry_alert'])
+            state['entry_alert'] = None
+        if state['shares'] and (last or row - state['entry_row'] >= params['horizon']):
+            self._close(symbol, close)
+        elif state['shares'] and state['entry_row'] == row:
+            # Stops and targets only go live from the bar after the entry.
+            stop = self.engine.add_alert(symbol, state['entry_price'] * (1 - params['stop']), 'below', self._on_exit)
+            take = self.engine.add_alert(symbol, state['entry_price'] * (1 + params['take']), 'above', self._on_exit)
+            state['exit_alerts'] = (stop.id, take.id)
+
+        if previous_close is not None:
+            state['moments'].push(close / previous_close - 1)
+        state['held'].append(state['shares'])
+        state['equity'].append(state['cash'] + state['shares'] * close)
+
+        if not state['shares'] and not last and state['moments'].count >= params['vol_window']:
+            state['signals'] += 1
+            state['size'] = suggested_position_size(params['account_size'], params['risk_percentage'],
+                                                    state['moments'].std)
+            alert = self.engine.add_alert(symbol, close * (1 + params['entry']), 'above', self._on_entry)
+            state['entry_alert'] = alert.id
+
+    def run(self):
+        from risk_engine import RollingMoments
+
+        arrays = {}
+        for column, symbol in enumerate(self.bars.symbols):
+            rows, fields = _symbol_arrays(self.bars, column)
+            if not rows.size:
+                continue
+            arrays[symbol.upper()] = (rows, fields)
+            self._states[symbol.upper()] = {
+                'moments': RollingMoments(self.params['vol_window']), 'cash': 0.0, 'shares': 0.0, 'size': 0.0,
+                'entry_alert': None, 'exit_alerts': (), 'trades': [], 'signals': 0, 'triggers': 0,
+                'row': -1, 'tick': None, 'equity': [], 'held': []
+            }
+
+        for global_row in range(len(self.bars)):
+            for symbol, (rows, (open, high, low, close)) in arrays.items():
+                row = global_row - rows[0]
+                if 0 <= row < rows.size:
+                    self._bar(symbol, row, open[row], high[row], low[row], close[row],
+                              close[row - 1] if row else None, row == rows.size - 1)
+
+        results = {}
+        for symbol, (rows, _) in arrays.items():
+            state = self._states[symbol]
+            trades = {name: np.asarray([trade[i] for trade in state['trades']], dtype=float)
+                      for i, name in enumerate(TRADE_FIELDS)}
+            for name in ('entry_row', 'exit_row'):
+                trades[name] = trades[name].astype(int)
+            pnl = np.diff(np.asarray(state['equity']), prepend=0.0)
+            results[symbol] = (rows, {'trades': trades, 'pnl': pnl, 'held': np.asarray(state['held']),
+                                      'signals': state['signals'], 'triggers': state['triggers']})
+        return results
+
+
+def summarize(pnl, account_size, trades=None, held=None, signals=None, triggers=None):
+    pnl = np.nan_to_num(np.asarray(pnl, dtype=float))
+    equity = account_size + np.cumsum(pnl)
+    previous = np.concatenate([[account_size], equity[:-1]])
+    returns = pnl / previous
+    summary = {
+        'total_pnl': float(pnl.sum()),
+        'roi': calculate_roi(account_size, account_size + float(pnl.sum())),
+        'sharpe_ratio': float(calculate_sharpe_ratios(returns[:, None], RISK_FREE_RATE)[0]) if pnl.size > 1 else float('nan'),
+        'volatility': float(calculate_volatilities(returns[:, None])[0]) if pnl.size > 1 else float('nan'),
+        'max_drawdown': float(calculate_max_drawdowns(np.concatenate([[account_size], equity]))),
+        'days': int(pnl.size)
+    }
+    if trades is not None:
+        trade_pnl = trades['shares'] * (trades['exit_price'] - trades['entry_price'])
+        summary.update({
+            'trades': int(trade_pnl.size),
+            'hit_rate': float((trade_pnl > 0).mean() * 100) if trade_pnl.size else float('nan'),
+            'avg_trade_return': float(np.mean(trades['exit_price'] / trades['entry_price'] - 1) * 100)
+            if trade_pnl.size else float('nan')
+        })
+    if held is not None:
+        summary['exposure'] = float((np.asarray(held) > 0).mean() * 100) if len(held) else 0.0
+    if signals is not None:
+        summary['alerts'] = signals
+        summary['alert_hit_rate'] = triggers / signals * 100 if signals else float('nan')
+    return summary
+
+
+def _portfolio(bars, per_symbol, account_size):
+    total = np.zeros(len(bars))
+    held = np.zeros(len(bars))
+    trades = {name: [] for name in TRADE_FIELDS}
+    signals = triggers = 0
+    for rows, result in per_symbol.values():
+        total[rows] += result['pnl']
+        held[rows] += result['held']
+        for name in TRADE_FIELDS:
+            trades[name].append(result['trades'][name])
+        signals += result['signals']
+        triggers += result['triggers']
+    trades = {name: np.concatenate(values) if values else np.array([]) for name, values in trades.items()}
+    capital = account_size * max(len(per_symbol), 1)
+    return summarize(total, capital, trades, held, signals, triggers)
+
+
+def run_backtest(bars, engine='vector', **params):
+    params = _params(params)
+    if engine == 'event':
+        per_symbol = EventBacktester(bars, **params).run()
+    elif engine == 'vector':
+        per_symbol = {}
+        for column, symbol in enumerate(bars.symbols):
+            rows, (open, high, low, close) = _symbol_arrays(bars, column)
+            if rows.size:
+                per_symbol[symbol] = (rows, simulate(open, high, low, close, params))
+    else:
+        raise ValueError(f"Unknown engine '{engine}'. Use 'vector' or 'event'.")
+
+    symbols = {
+        symbol: summarize(result['pnl'], params['account_size'], result['trades'], result['held'],
+                          result['signals'], result['triggers'])
+        for symbol, (rows, result) in per_symbol.items()
+    }
+    return {'params': params, 'symbols': symbols, 'portfolio': _portfolio(bars, per_symbol, params['account_size'])}
+
+
+def sizing_backtest(bars, account_size=100000.0, risk_percentage=2.0, vol_window=20):
+    """Always-invested position sizing rule, vectorized across every symbol."""
+    close = bars.close
+    volatility = np.column_stack([daily_volatility(close[:, i], vol_window) for i in range(close.shape[1])]) \
+        if close.size else close.copy()
+    shares = np.nan_to_num(np.maximum(suggested_position_size(account_size, risk_percentage, volatility), 0.0) / close)
+    pnl = np.zeros_like(close)
+    pnl[1:] = shares[:-1] * np.nan_to_num(np.diff(close, axis=0))
+    symbols = {symbol: summarize(pnl[:, i], account_size, held=shares[:, i]) for i, symbol in enumerate(bars.symbols)}
+    return {'symbols': symbols, 'portfolio': summarize(pnl.sum(axis=1), account_size * max(len(bars.symbols), 1))}
+
+
+def alert_hit_rates(bars, thresholds=(0.01, 0.02, 0.05, 0.10), horizon=1):
+    """Share of days on which an alert set at +/- threshold from the close would fire within horizon bars."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    close = bars.close
+    if len(bars) <= horizon:
+        return {}
+    future_high = sliding_window_view(bars.high[1:], horizon, axis=0).max(axis=-1)
+    future_low = sliding_window_view(bars.low[1:], horizon, axis=0).min(axis=-1)
+    base = close[:future_high.shape[0]]
+    valid = np.isfinite(base) & np.isfinite(future_high) & np.isfinite(future_low)
+    rates = {}
+    for threshold in thresholds:
+        above = (future_high >= base * (1 + threshold)) & valid
+        below = (future_low <= base * (1 - threshold)) & valid
+        rates[threshold] = {
+            'above': float(above.sum() / valid.sum() * 100) if valid.any() else float('nan'),
+            'below': float(below.sum() / valid.sum() * 100) if valid.any() else float('nan')
+        }
+    return rates
+
+
+def parameter_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _sweep_chunk(task):
+    rows_count, columns, combos = task
+    totals = [np.zeros(rows_count) for _ in combos]
+    counts = [{'trades': 0, 'wins': 0, 'signals': 0, 'triggers': 0, 'exposure_days': 0} for _ in combos]
+    for rows, (open, high, low, close) in columns:
+        volatility = {}
+        for index, params in enumerate(combos):
+            window = params['vol_window']
+            if window not in volatility:
+                volatility[window] = daily_volatility(close, window)
+            result = simulate(open, high, low, close, params, volatility[window])
+            totals[index][rows] += result['pnl']
+            trades = result['trades']
+            count = counts[index]
+            count['trades'] += trades['shares'].size
+            count['wins'] += int((trades['exit_price'] > trades['entry_price']).sum())
+            count['signals'] += result['signals']
+            count['triggers'] += result['triggers']
+            count['exposure_days'] += int((result['held'] > 0).sum())
+    return totals, counts
+
+
+def sweep(bars, grid, processes=None, chunk_size=25):
+    combos = [_params(params) for params in parameter_grid(grid)]
+    columns = []
+    for column in range(len(bars.symbols)):
+        rows, fields = _symbol_arrays(bars, column)
+        if rows.size:
+            columns.append((rows, fields))
+    tasks = [(len(bars), columns[start:start + chunk_size], combos) for start in range(0, len(columns), chunk_size)]
+
+    totals = [np.zeros(len(bars)) for _ in combos]
+    counts = [{'trades': 0, 'wins': 0, 'signals': 0, 'triggers': 0, 'exposure_days': 0} for _ in combos]
+    if processes == 1 or len(tasks) <= 1:
+        outputs = map(_sweep_chunk, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=processes)
+        outputs = executor.map(_sweep_chunk, tasks)
+    try:
+        for chunk_totals, chunk_counts in outputs:
+            for index in range(len(combos)):
+                totals[index] += chunk_totals[index]
+                for name, value in chunk_counts[index].items():
+                    counts[index][name] += value
+    finally:
+        if not (processes == 1 or len(tasks) <= 1):
+            executor.shutdown()
+
+    results = []
+    for params, total, count in zip(combos, totals, counts):
+        summary = summarize(total, params['account_size'] * max(len(columns), 1))
+        summary.update({
+            'trades': count['trades'],
+            'hit_rate': count['wins'] / count['trades'] * 100 if count['trades'] else float('nan'),
+            'alerts': count['signals'],
+            'alert_hit_rate': count['triggers'] / count['signals'] * 100 if count['signals'] else float('nan'),
+            'exposure': count['exposure_days'] / sum(rows.size for rows, _ in columns) * 100 if columns else 0.0
+        })
+        results.append({'params': params, **summary})
+    return sorted(results, key=lambda result: result['total_pnl'], reverse=True)
+
+
+def _parse_grid(items):
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        if name not in DEFAULT_PARAMS or not values:
+            raise ValueError(f"Bad grid entry '{item}'. Use e.g. entry=0.01,0.02,0.03")
+        grid[name] = [PARAM_TYPES.get(name, float)(value) for value in values.split(',')]
+    return grid
+
+
+def _print_summary(title, summary):
+    from colorama import Fore, Style
+
+    print(f"\n{Fore.CYAN}{title}{Style.RESET_ALL}")
+    color = Fore.GREEN if summary['total_pnl'] >= 0 else Fore.RED
+    print(f"{color}P/L: ${summary['total_pnl']:,.2f} ({summary['roi']:.2f}%){Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}Sharpe: {summary['sharpe_ratio']:.2f} | Volatility: {summary['volatility']:.2f}% | "
+          f"Max Drawdown: {summary['max_drawdown']:.2f}%{Style.RESET_ALL}")
+    if 'trades' in summary:
+        print(f"{Fore.YELLOW}Trades: {summary['trades']} | Hit Rate: {summary['hit_rate']:.1f}% | "
+              f"Alerts Fired: {summary['alert_hit_rate']:.1f}% of {summary['alerts']}{Style.RESET_ALL}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the price alert and position sizing rules on historical bars.")
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--period', default='10y')
+    parser.add_argument('--engine', choices=['vector', 'event'], default='vector')
+    for name, default in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=PARAM_TYPES.get(name, float), default=default)
+    parser.add_argument('--grid', nargs='*', metavar='NAME=V1,V2', help="Sweep these parameters, e.g. entry=0.01,0.02")
+    parser.add_argument('-p', '--processes', type=int, default=None, help="Worker processes for sweeps")
+    parser.add_argument('--top', type=int, default=10, help="Sweep results to print")
+    parser.add_argument('-o', '--output', help="Write the full results as JSON")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    from colorama import Fore, Style
+    import indicators
+
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+    bars = indicators.load_bars(args.tickers, period=args.period)
+    started = time.perf_counter()
+
+    if args.grid:
+        grid = {name: [value] for name, value in params.items()}
+        grid.update(_parse_grid(args.grid))
+        results = sweep(bars, grid, processes=args.processes)
+        print(f"\n{Fore.CYAN}Top {min(args.top, len(results))} of {len(results)} parameter sets "
+              f"({len(bars.symbols)} symbols, {len(bars)} bars){Style.RESET_ALL}")
+        varied = [name for name in sorted(grid) if len(grid[name]) > 1]
+        for result in results[:args.top]:
+            label = ", ".join(f"{name}={result['params'][name]}" for name in varied)
+            print(f"{Fore.GREEN}{label}{Style.RESET_ALL}  P/L ${result['total_pnl']:,.0f}  "
+                  f"ROI {result['roi']:.2f}%  Sharpe {result['sharpe_ratio']:.2f}  "
+                  f"MaxDD {result['max_drawdown']:.2f}%  Trades {result['trades']}  Hit {result['hit_rate']:.1f}%")
+    else:
+        results = run_backtest(bars, engine=args.engine, **params)
+        for symbol, summary in results['symbols'].items():
+            _print_summary(f"{symbol} Breakout Alert Strategy", summary)
+        _print_summary("Portfolio", results['portfolio'])
+
+        sizing = sizing_backtest(bars, params['account_size'], params['risk_percentage'], params['vol_window'])
+        _print_summary("Always-Invested Position Sizing Rule", sizing['portfolio'])
+        print(f"\n{Fore.CYAN}Next-day alert hit rates{Style.RESET_ALL}")
+        for threshold, rates in alert_hit_rates(bars).items():
+            print(f"{Fore.YELLOW}±{threshold * 100:.0f}%: above {rates['above']:.1f}% | below {rates['below']:.1f}%{Style.RESET_ALL}")
+        results['sizing'] = sizing
+
+    print(f"\n{Fore.YELLOW}Finished in {time.perf_counter() - started:.2f}s{Style.RESET_ALL}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=float)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
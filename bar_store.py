@@ -0,0 +1,174 @@
+import os
+import threading
+
+import numpy as np
+
+from config import CACHE_DIR
+
+BAR_DTYPE = np.dtype([
+    ('time', '<M8[ns]'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('dividends', '<f8'),
+    ('splits', '<f8')
+])
+FRAME_COLUMNS = {
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume',
+    'dividends': 'Dividends',
+    'splits': 'Stock Splits'
+}
+
+
+def empty():
+    return np.empty(0, dtype=BAR_DTYPE)
+
+
+def from_frame(frame):
+    if frame is None or frame.empty:
+        return empty()
+    index = frame.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    records = np.empty(len(frame), dtype=BAR_DTYPE)
+    records['time'] = index.to_numpy(dtype='datetime64[ns]')
+    for field, column in FRAME_COLUMNS.items():
+        if column in frame.columns:
+            records[field] = frame[column].to_numpy(dtype=float)
+        else:
+            records[field] = 0.0 if field in ('dividends', 'splits') else np.nan
+    return records
+
+
+def to_frame(records, tz=None):
+    import pandas as pd
+
+    index = pd.DatetimeIndex(records['time'])
+    if tz:
+        # Times are stored as exchange wall-clock time; an hour repeated by a
+        # DST change is read as standard time.
+        index = index.tz_localize(tz, ambiguous=np.zeros(len(index), dtype=bool), nonexistent='shift_forward')
+    return pd.DataFrame({column: records[field] for field, column in FRAME_COLUMNS.items()}, index=index)
+
+
+def _normalize(records):
+    records = np.asarray(records, dtype=BAR_DTYPE)
+    records = records[~np.isnat(records['time'])]
+    order = np.argsort(records['time'], kind='stable')
+    records = records[order]
+    # The later of two bars with the same timestamp wins.
+    keep = np.ones(records.size, dtype=bool)
+    keep[:-1] = records['time'][1:] != records['time'][:-1]
+    return records[keep]
+
+
+class BarStore:
+    """Fixed-width OHLCV records, one memory-mapped file per symbol and interval.
+
+    `read` and `slice` return live views of the file, not copies. Bars
+    appended later are not visible through an earlier view, but a restated
+    bar rewritten in place is; callers that need a stable snapshot copy it.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(CACHE_DIR, 'bars')
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, interval, f"{symbol.upper()}.bin")
+
+    def read(self, symbol, interval):
+        path = self.path(symbol, interval)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return empty()
+        key = (stat.st_ino, stat.st_size)
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        count = stat.st_size // BAR_DTYPE.itemsize
+        records = np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,)) if count else empty()
+        self._maps[path] = (key, records)
+        return records
+
+    def slice(self, symbol, interval, start=None, end=None, tail=None):
+        records = self.read(symbol, interval)
+        times = records['time']
+        lo = np.searchsorted(times, np.datetime64(start, 'ns')) if start is not None else 0
+        hi = np.searchsorted(times, np.datetime64(end, 'ns')) if end is not None else records.size
+        if tail is not None:
+            lo = max(lo, hi - tail)
+        return records[lo:hi]
+
+    def write(self, symbol, interval, records):
+        records = _normalize(records)
+        if not records.size:
+            return self.read(symbol, interval)
+        path = self.path(symbol, interval)
+
+        with self._lock:
+            existing = self.read(symbol, interval)
+            times = existing['time']
+            position = int(np.searchsorted(times, records['time'][0]))
+            overlap = existing.size - position
+            if overlap <= records.size and np.array_equal(times[position:], records['time'][:overlap]):
+                # New bars only extend (or restate the tail of) the file, so
+                # write them in place instead of rewriting the whole history.
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                    f.seek(position * BAR_DTYPE.itemsize)
+                    f.write(records.tobytes())
+            else:
+                merged = _normalize(np.concatenate([existing, records]))
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(merged.tobytes())
+                # Windows cannot replace a file that is still mapped; the
+                # cached map is dropped first, but views held by callers can
+                # still make this raise.
+                self._maps.pop(path, None)
+                del existing, times
+                try:
+                    os.replace(tmp_path, path)
+                except OSError:
+                    os.remove(tmp_path)
+                    raise
+        return self.read(symbol, interval)
+
+    def delete(self, symbol, interval):
+        path = self.path(symbol, interval)
+        with self._lock:
+            self._maps.pop(path, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def symbols(self, interval):
+        try:
+            names = os.listdir(os.path.join(self.root, interval))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith('.bin'))
+
+    def clear(self):
+        self._maps.clear()
+
+
+_store = None
+
+
+def get_bar_store():
+    global _store
+    if _store is None:
+        _store = BarStore()
+    return _store
@@ -0,0 +1,170 @@
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import market_data
+import telemetry
+from gather_yahoo_finance import fetch_yahoo_finance
+from json_utils import json_safe, json_default
+from market_sentiment import analyze_news_sentiment, analyze_news_sentiment_batch
+
+FINANCIAL_FIELDS = [
+    "Company Name", "Current Price", "52 Week High", "52 Week Low", "Market Cap",
+    "Volume", "Average Volume", "PE Ratio", "EPS", "Dividend Yield", "1 Month Return"
+]
+
+CSV_FIELDS = (
+    ["symbol", "status", "error"] + FINANCIAL_FIELDS +
+    ["news_count", "sentiment_score", "interpretation",
+     "summary_seconds", "sentiment_seconds", "total_seconds"]
+)
+
+
+def read_tickers(path):
+    with open(path) as f:
+        tickers = []
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(part.strip().upper() for part in line.replace(',', ' ').split())
+    return tickers
+
+
+def analyze_ticker(ticker, include_sentiment=True):
+    started = time.perf_counter()
+    result = {'symbol': ticker, 'status': 'ok', 'error': None, 'timings': {}}
+
+    stage_start = time.perf_counter()
+    try:
+        data = fetch_yahoo_finance(ticker)
+    except Exception as e:
+        result.update({'status': 'error', 'error': str(e)})
+    else:
+        result['financial_data'] = data['financial_data'].iloc[0].to_dict()
+        result['news'] = data['news_data'].to_dict('records')
+    result['timings']['summary'] = time.perf_counter() - stage_start
+
+    if include_sentiment and result['status'] == 'ok':
+        stage_start = time.perf_counter()
+        try:
+            result['sentiment'] = analyze_news_sentiment(ticker)
+        except Exception as e:
+            result['sentiment'] = None
+            result['error'] = f"Sentiment analysis failed: {str(e)}"
+        result['timings']['sentiment'] = time.perf_counter() - stage_start
+
+    result['timings']['total'] = time.perf_counter() - started
+    return result
+
+
+def iter_batch(tickers, period='1mo', concurrency=8, include_sentiment=True, processes=None, stage_timings=None):
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    stage_timings = stage_timings if stage_timings is not None else {}
+
+    stage_start = time.perf_counter()
+    prefetch_errors = market_data.prefetch(
+        tickers, period=period, include_news=True, max_workers=concurrency
+    )
+    stage_timings['prefetch'] = time.perf_counter() - stage_start
+
+    if include_sentiment:
+        stage_start = time.perf_counter()
+        try:
+            analyze_news_sentiment_batch(tickers, processes=processes)
+        except Exception as e:
+            print(f"Batch sentiment scoring failed, falling back to per-ticker scoring: {str(e)}", file=sys.stderr)
+        stage_timings['sentiment'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(analyze_ticker, ticker, include_sentiment): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'symbol': ticker, 'status': 'error', 'error': str(e), 'timings': {}}
+            if result['status'] == 'error' and ticker in prefetch_errors:
+                result['error'] = f"{result['error']} ({prefetch_errors[ticker]})"
+            yield result
+    stage_timings['analysis'] = time.perf_counter() - stage_start
+
+
+def _csv_row(result):
+    row = {
+        'symbol': result['symbol'],
+        'status': result['status'],
+        'error': result.get('error'),
+        'news_count': len(result.get('news', [])),
+        'summary_seconds': result['timings'].get('summary'),
+        'sentiment_seconds': result['timings'].get('sentiment'),
+        'total_seconds': result['timings'].get('total')
+    }
+    row.update(result.get('financial_data', {}))
+    sentiment = result.get('sentiment') or {}
+    row['sentiment_score'] = sentiment.get('sentiment_score')
+    row['interpretation'] = sentiment.get('interpretation')
+    return row
+
+
+def run_batch(tickers, output=sys.stdout, output_format='jsonl', **kwargs):
+    stage_timings = {}
+    writer = None
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+
+    started = time.perf_counter()
+    completed = failed = 0
+    for result in iter_batch(tickers, stage_timings=stage_timings, **kwargs):
+        if writer is not None:
+            writer.writerow(_csv_row(result))
+        else:
+            output.write(json.dumps(json_safe(result), default=json_default, allow_nan=False) + "\n")
+        output.flush()
+        completed += 1
+        failed += result['status'] == 'error'
+
+    stage_timings['total'] = time.perf_counter() - started
+    return {'completed': completed, 'failed': failed, 'timings': stage_timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many tickers without interactive prompts.")
+    parser.add_argument('tickers', nargs='*', help="Ticker symbols, e.g. AAPL MSFT")
+    parser.add_argument('-f', '--file', help="File with ticker symbols (whitespace or comma separated)")
+    parser.add_argument('-o', '--output', help="Output file (defaults to stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--period', default='1mo', help="History period to prefetch")
+    parser.add_argument('--no-sentiment', action='store_true', help="Skip news sentiment analysis")
+    parser.add_argument('-p', '--processes', type=int, help="Worker processes for headline scoring")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    tickers = list(args.tickers)
+    if args.file:
+        tickers.extend(read_tickers(args.file))
+    if not tickers:
+        parser.error("provide ticker symbols or --file")
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        summary = run_batch(
+            tickers, output=output, output_format=args.format, period=args.period,
+            concurrency=max(1, args.concurrency), include_sentiment=not args.no_sentiment,
+            processes=args.processes
+        )
+    finally:
+        if args.output:
+            output.close()
+
+    timings = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in summary['timings'].items())
+    print(f"Processed {summary['completed']} tickers ({summary['failed']} failed): {timings}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
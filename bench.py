@@ -0,0 +1,765 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import cProfile
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import tracemalloc
+
+DEFAULT_TICKER_COUNTS = [1, 10, 100]
+DEFAULT_PERIODS = ['1mo', '1y', '5y']
+
+TRACK_MEMORY = True
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(name, fn, repeat=3, setup=None, items=1, profile_dir=None, track_memory=None, **tags):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        timings.append(time.perf_counter() - started)
+
+    # tracemalloc slows allocation-heavy code a lot, so memory is measured
+    # in a separate run rather than alongside the timings.
+    peak_memory = None
+    if TRACK_MEMORY if track_memory is None else track_memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    if profile_dir:
+        if setup is not None:
+            setup()
+        profiler = cProfile.Profile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiler.runcall(fn)
+        safe_name = "".join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+        profiler.dump_stats(os.path.join(profile_dir, f"{safe_name}.prof"))
+
+    p50 = statistics.median(timings)
+    result = {
+        'name': name,
+        'repeat': repeat,
+        'items': items,
+        'mean_seconds': statistics.fmean(timings),
+        'p50_seconds': p50,
+        'p95_seconds': _percentile(timings, 95),
+        'min_seconds': min(timings),
+        'max_seconds': max(timings),
+        'throughput_per_second': items / p50 if p50 else None,
+        'peak_memory_kb': peak_memory / 1024 if peak_memory is not None else None
+    }
+    result.update(tags)
+    memory = f"{result['peak_memory_kb']:9.0f}KB" if peak_memory is not None else "        -"
+    print(f"{name:<55} p50={p50 * 1000:9.2f}ms  peak={memory}", file=sys.stderr)
+    return result
+
+
+def reset_state(disk=True):
+    import market_data
+    import llm_client
+    import market_sentiment
+    import news_store
+    import risk_engine
+    import real_time_alerts
+
+    market_data.clear_cache(disk=disk)
+    llm_client.set_client(None)
+    market_sentiment._cache = None
+    if news_store._store is not None:
+        news_store._store.close()
+        news_store._store = None
+    market_sentiment._aggregates.clear()
+    risk_engine._engine = None
+    if real_time_alerts._engine is not None:
+        real_time_alerts._engine.stop(timeout=1)
+        real_time_alerts._engine = None
+
+
+def single_ticker_benchmarks(symbol, repeat, profile_dir):
+    from stock_analysis import analyze_stock, stream_analysis
+    from gather_yahoo_finance import gather_yahoo_finance
+    from risk_management import calculate_position_size
+    from real_time_alerts import set_price_alert
+
+    stages = {
+        'gather_yahoo_finance': lambda: gather_yahoo_finance(symbol),
+        'analyze_stock': lambda: analyze_stock(symbol, 'n', True),
+        'stream_analysis_first_output': lambda: next(iter(stream_analysis(symbol, 'y', True))),
+        'calculate_position_size': lambda: calculate_position_size(symbol, 100000, 2),
+        'set_price_alert': lambda: set_price_alert(symbol, 1e9)
+    }
+    results = []
+    for stage, fn in stages.items():
+        results.append(measure(f"{stage}[cold]", fn, repeat, setup=reset_state, profile_dir=profile_dir,
+                               stage=stage, cache='cold'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        results.append(measure(f"{stage}[warm]", fn, repeat, profile_dir=profile_dir, stage=stage, cache='warm'))
+    reset_state()
+    return results
+
+
+def graph_benchmarks(symbol, periods, repeat, profile_dir):
+    from get_graph import get_graph
+
+    results = []
+    for period in periods:
+        fn = lambda: get_graph(symbol, period, width=100)
+        results.append(measure(f"get_graph[{period},cold]", fn, repeat, setup=reset_state,
+                               profile_dir=profile_dir, stage='get_graph', period=period, cache='cold'))
+        results.append(measure(f"get_graph[{period},warm]", fn, repeat, profile_dir=profile_dir,
+                               stage='get_graph', period=period, cache='warm'))
+    return results
+
+
+def batch_benchmarks(symbols, ticker_counts, repeat, profile_dir):
+    from batch import run_batch
+
+    results = []
+    for count in ticker_counts:
+        tickers = symbols[:count]
+        fn = lambda: run_batch(tickers, output=io.StringIO(), concurrency=16, processes=1)
+        results.append(measure(f"batch[{count} tickers,cold]", fn, repeat, setup=reset_state, items=count,
+                               profile_dir=profile_dir, stage='batch', tickers=count, cache='cold'))
+    return results
+
+
+def legacy_analysis_prompt(ticker, include_sentiment=True, truncate=True):
+    import pandas as pd
+    from gather_yahoo_finance import gather_yahoo_finance
+    from market_sentiment import analyze_news_sentiment
+
+    financial_data = gather_yahoo_finance(ticker)
+    sentiment_data = ""
+    if include_sentiment:
+        sentiment_result = analyze_news_sentiment(ticker)
+        sentiment_data = f"\nMarket Sentiment: {sentiment_result['interpretation']} (Score: {sentiment_result['sentiment_score']:.2f})"
+    # pandas elides most columns of the old DataFrame reprs; the untruncated
+    # variant is what it costs to actually send all of that data.
+    options = () if truncate else ('display.max_columns', None, 'display.width', None, 'display.max_colwidth', None)
+    with pd.option_context(*options) if options else contextlib.nullcontext():
+        return f"Based on the following financial data for {ticker}:\n{financial_data}\n{sentiment_data}"
+
+
+def compact_analysis_prompt(ticker, include_sentiment=True):
+    from prompts import build_prompt, stock_sections
+
+    return build_prompt(f"Data for {ticker} (compact key=value; % values are percents):",
+                        stock_sections(ticker, include_sentiment), "")
+
+
+def prompt_benchmarks(symbols, repeat, profile_dir, market=None, token_latency=0.0002):
+    import llm_client
+    import offline_backend
+    from prompts import prompt_stats
+    from stock_analysis import ANALYSIS_SYSTEM
+
+    # Both variants share the same instructions, so only the data part is compared.
+    builders = {
+        'legacy': legacy_analysis_prompt,
+        'legacy_full': lambda symbol: legacy_analysis_prompt(symbol, truncate=False),
+        'compact': compact_analysis_prompt
+    }
+    original = sys.modules.get('openai')
+    if market is not None:
+        sys.modules['openai'] = offline_backend._chat_module(market, 0.0, token_latency=token_latency)
+        llm_client.set_client(None)
+
+    results = []
+    tokens = {}
+    try:
+        for variant, builder in builders.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                prompts = [builder(symbol) for symbol in symbols]
+            stats = [prompt_stats(prompt) for prompt in prompts]
+            tags = {
+                'stage': 'prompt', 'variant': variant, 'tickers': len(symbols),
+                'prompt_chars': statistics.fmean(stat['chars'] for stat in stats),
+                'prompt_tokens': statistics.fmean(stat['tokens'] for stat in stats)
+            }
+            tokens[variant] = tags['prompt_tokens']
+            if variant == 'compact':
+                # The compact prompt has to stay smaller than the old one with
+                # all of its data, not the copy pandas elided.
+                tags['token_budget'] = tokens['legacy_full']
+            print(f"{variant:<12} prompt: {tags['prompt_chars']:8.0f} chars {tags['prompt_tokens']:7.0f} tokens",
+                  file=sys.stderr)
+            results.append(measure(f"prompt_build[{variant},{len(symbols)} tickers]",
+                                   lambda: [builder(symbol) for symbol in symbols], repeat,
+                                   items=len(symbols), profile_dir=profile_dir, **tags))
+            results.append(measure(f"prompt_llm[{variant},{len(symbols)} tickers]",
+                                   lambda: [llm_client.chat(ANALYSIS_SYSTEM, prompt, use_cache=False) for prompt in prompts],
+                                   repeat, items=len(symbols), profile_dir=profile_dir, **tags))
+    finally:
+        if market is not None:
+            sys.modules['openai'] = original
+            llm_client.set_client(None)
+    return results
+
+
+INDICATOR_SPECS = ('sma20', 'sma50', 'ema20', 'rsi14', 'macd', 'atr14', 'bb20', 'vwap20', 'obv', 'beta60', 'corr60')
+
+
+def pandas_indicators(close, high, low, volume, benchmark):
+    import numpy as np
+    import pandas as pd
+
+    close, high, low, volume = (pd.DataFrame(values) for values in (close, high, low, volume))
+    benchmark_returns = pd.Series(benchmark).pct_change()
+    returns = close.pct_change()
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+    previous = close.shift()
+    true_range = pd.concat([high - low, (high - previous).abs(), (low - previous).abs()]).groupby(level=0).max()
+    middle, deviation = close.rolling(20).mean(), close.rolling(20).std()
+    typical = (high + low + close) / 3
+    return {
+        'sma20': close.rolling(20).mean(),
+        'sma50': close.rolling(50).mean(),
+        'ema20': close.ewm(span=20, adjust=False, min_periods=20).mean(),
+        'rsi14': (100 - 100 / (1 + gain / loss)).where(change.notna().cumsum() >= 14),
+        'macd': line.where(close.notna().cumsum() >= 26),
+        'macd_signal': signal.where(close.notna().cumsum() >= 34),
+        'macd_hist': (line - signal).where(close.notna().cumsum() >= 34),
+        'atr14': true_range.where(previous.notna(), high - low).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean(),
+        'bb20_lower': middle - 2 * deviation,
+        'bb20_middle': middle,
+        'bb20_upper': middle + 2 * deviation,
+        'vwap20': (typical * volume).rolling(20).sum() / volume.rolling(20).sum(),
+        'obv': (np.sign(change) * volume).fillna(0).cumsum(),
+        'beta60': returns.apply(lambda column: column.rolling(60).cov(benchmark_returns)).div(
+            benchmark_returns.rolling(60).var(), axis=0),
+        'corr60': returns.apply(lambda column: column.rolling(60).corr(benchmark_returns))
+    }
+
+
+def indicator_benchmarks(ticker_counts, repeat, profile_dir, bars_per_ticker=2520):
+    import numpy as np
+    import indicators
+
+    results = []
+    for count in ticker_counts:
+        rng = np.random.default_rng(count)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars_per_ticker, count)), axis=0))
+        high, low = close * 1.01, close * 0.99
+        volume = rng.integers(100_000, 1_000_000, (bars_per_ticker, count)).astype(float)
+        benchmark = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars_per_ticker)))
+        bars = indicators.Bars(np.arange(bars_per_ticker), [f"SYM{i}" for i in range(count)],
+                               close, high, low, close, volume, benchmark)
+
+        vectorized = indicators.compute(bars, INDICATOR_SPECS)
+        reference = pandas_indicators(close, high, low, volume, benchmark)
+        max_error = max(float(np.nanmax(np.abs(vectorized[name] - reference[name].to_numpy()))) for name in reference)
+
+        tags = {'stage': 'indicators', 'tickers': count, 'bars': bars_per_ticker, 'max_abs_error': max_error}
+        results.append(measure(f"indicators_numpy[{count} tickers]", lambda: indicators.compute(bars, INDICATOR_SPECS),
+                               repeat, items=count, profile_dir=profile_dir, **tags))
+        results.append(measure(f"indicators_pandas[{count} tickers]",
+                               lambda: pandas_indicators(close, high, low, volume, benchmark),
+                               repeat, items=count, profile_dir=profile_dir, **tags))
+
+        stream = indicators.StreamingIndicators(bars.symbols, INDICATOR_SPECS)
+        stream.seed(bars)
+        row = bars_per_ticker - 1
+        results.append(measure(f"indicators_update[{count} tickers,1 bar]",
+                               lambda: stream.update(close[row], high[row], low[row], close[row], volume[row], benchmark[row]),
+                               repeat, items=count, profile_dir=profile_dir, stage='indicators', tickers=count))
+    return results
+
+
+def history_benchmarks(symbols, ticker_counts, repeat, profile_dir, period='10y'):
+    import numpy as np
+    import market_data
+    import indicators
+    from bar_store import get_bar_store
+
+    results = []
+    for count in ticker_counts:
+        tickers = symbols[:count]
+        market_data.prefetch(tickers, period=period, include_info=False, include_news=False)
+        tags = {'stage': 'history', 'tickers': count, 'period': period}
+
+        def frames():
+            return indicators.Bars.from_frames({symbol: market_data.get_history(symbol, period=period)
+                                                for symbol in tickers})
+
+        results.append(measure(f"history_frames[{count} tickers,{period}]", frames, repeat, items=count,
+                               profile_dir=profile_dir, **tags))
+        results.append(measure(f"history_bars[{count} tickers,{period}]",
+                               lambda: indicators.load_bars(tickers, period=period), repeat, items=count,
+                               profile_dir=profile_dir, **tags))
+        results.append(measure(f"history_views[{count} tickers,{period}]",
+                               lambda: [market_data.get_bars(symbol, period=period)['close'] for symbol in tickers],
+                               repeat, items=count, profile_dir=profile_dir, **tags))
+
+        store = get_bar_store()
+        last = {symbol: store.read(symbol, '1d')[-1:].copy() for symbol in tickers}
+
+        def append():
+            for symbol, bar in last.items():
+                bar['time'] += np.timedelta64(1, 'D')
+                store.write(symbol, '1d', bar)
+
+        results.append(measure(f"history_append[{count} tickers,1 bar]", append, repeat, items=count,
+                               profile_dir=profile_dir, track_memory=False, **tags))
+    return results
+
+
+def screener_benchmarks(repeat, profile_dir, universe=5000):
+    import numpy as np
+    import screener
+
+    rng = np.random.default_rng(universe)
+    price = rng.uniform(5, 500, universe)
+    low = price * rng.uniform(0.5, 1.0, universe)
+    columns = {name: rng.lognormal(3, 1, universe) for name in screener.NUMERIC_FIELDS}
+    columns.update({
+        'price': price, 'low_52w': low, 'from_low': (price / low - 1) * 100,
+        'pe': np.where(rng.random(universe) < 0.1, np.nan, rng.uniform(-20, 80, universe)),
+        'market_cap': rng.lognormal(22, 2, universe)
+    })
+    sectors = np.array(['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Industrials'])
+    text = {'name': [f"SYM{i}" for i in range(universe)], 'sector': sectors[rng.integers(0, 5, universe)],
+            'industry': [''] * universe}
+    snapshot = screener.Snapshot([f"SYM{i:05d}" for i in range(universe)], columns, text)
+    conditions = screener.parse_query("pe < 15 and market_cap > 10B and from_low <= 5")
+    frame = snapshot.to_frame()
+
+    indexed = snapshot.where(conditions)
+    scanned = frame[(frame['pe'] < 15) & (frame['market_cap'] > 10e9) & (frame['from_low'] <= 5)]
+    tags = {'stage': 'screener', 'tickers': universe, 'matches': int(indexed.size),
+            'consistent': set(snapshot.symbols[indexed]) == set(scanned.index)}
+    results = [
+        measure(f"screener_index[{universe} tickers]", lambda: snapshot.where(conditions), repeat,
+                profile_dir=profile_dir, **tags),
+        measure(f"screener_pandas[{universe} tickers]",
+                lambda: frame[(frame['pe'] < 15) & (frame['market_cap'] > 10e9) & (frame['from_low'] <= 5)],
+                repeat, profile_dir=profile_dir, **tags)
+    ]
+    return results
+
+
+def optimizer_benchmarks(repeat, profile_dir, asset_counts=(100, 500), observations=252, sectors=10):
+    import numpy as np
+    import optimizer
+
+    results = []
+    for count in asset_counts:
+        rng = np.random.default_rng(count)
+        factors = rng.normal(0, 0.01, (observations, 3))
+        returns = factors @ rng.normal(1, 0.3, (count, 3)).T + rng.normal(0, 0.02, (observations, count))
+        symbols = [f"SYM{i:04d}" for i in range(count)]
+        names = [f"Sector{i % sectors}" for i in range(count)]
+        model = optimizer.RiskModel.from_returns(symbols, returns)
+        tags = {'stage': 'optimizer', 'assets': count, 'observations': observations,
+                'shrinkage': model.shrinkage}
+
+        results.append(measure(f"optimizer_covariance[{count} assets]",
+                               lambda: optimizer.RiskModel.from_returns(symbols, returns), repeat,
+                               profile_dir=profile_dir, **tags))
+        results.append(measure(f"optimizer_eigen[{count} assets]", lambda: model.eigen, repeat,
+                               setup=lambda: setattr(model, '_eigen', None), profile_dir=profile_dir, **tags))
+        for method in optimizer.METHODS:
+            weights = optimizer.optimize(model, method, names, max_weight=5, max_sector=15)['weights']
+            results.append(measure(f"optimizer_{method}[{count} assets]",
+                                   lambda: optimizer.optimize(model, method, names, max_weight=5, max_sector=15),
+                                   repeat, profile_dir=profile_dir, max_weight=float(weights.max()), **tags))
+        # What-if runs: tighter caps over the cached model and eigendecomposition.
+        caps = [12, 15, 20, 25, 30]
+        results.append(measure(f"optimizer_what_if[{count} assets,{len(caps)} caps]",
+                               lambda: [optimizer.optimize(model, 'mean_variance', names, max_sector=cap) for cap in caps],
+                               repeat, items=len(caps), profile_dir=profile_dir, **tags))
+        current = rng.uniform(0, 1000, count)
+        target = optimizer.optimize(model, 'min_variance', names, max_weight=5)['weights'].to_numpy()
+        prices = rng.uniform(10, 500, count)
+        results.append(measure(f"optimizer_rebalance[{count} assets]",
+                               lambda: optimizer.rebalance(symbols, current, target, prices), repeat,
+                               profile_dir=profile_dir, **tags))
+    return results
+
+
+def backtest_benchmarks(ticker_counts, repeat, profile_dir, bars_per_ticker=2520):
+    import numpy as np
+    import indicators
+    import backtest
+
+    grid = {'entry': [0.01, 0.02, 0.03], 'stop': [0.03, 0.05], 'take': [0.05, 0.10]}
+    results = []
+    for count in ticker_counts:
+        rng = np.random.default_rng(count)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (bars_per_ticker, count)), axis=0))
+        open = close * np.exp(rng.normal(0, 0.01, close.shape))
+        high = np.maximum(open, close) * np.exp(np.abs(rng.normal(0, 0.01, close.shape)))
+        low = np.minimum(open, close) * np.exp(-np.abs(rng.normal(0, 0.01, close.shape)))
+        bars = indicators.Bars(np.arange(bars_per_ticker), [f"SYM{i}" for i in range(count)],
+                               open, high, low, close, np.ones(close.shape))
+
+        vector = backtest.run_backtest(bars)['portfolio']
+        tags = {'stage': 'backtest', 'tickers': count, 'bars': bars_per_ticker}
+        results.append(measure(f"backtest_vector[{count} tickers]", lambda: backtest.run_backtest(bars),
+                               repeat, items=count, profile_dir=profile_dir, **tags))
+        if count <= 10:
+            event = backtest.run_backtest(bars, engine='event')['portfolio']
+            results.append(measure(f"backtest_event[{count} tickers]",
+                                   lambda: backtest.run_backtest(bars, engine='event'),
+                                   repeat, items=count, profile_dir=profile_dir,
+                                   pnl_difference=abs(event['total_pnl'] - vector['total_pnl']), **tags))
+        combos = len(backtest.parameter_grid(grid))
+        results.append(measure(f"backtest_sweep[{count} tickers,{combos} params]",
+                               lambda: backtest.sweep(bars, grid, processes=1),
+                               repeat, items=count * combos, profile_dir=profile_dir, **tags))
+    return results
+
+
+def news_benchmarks(ticker_counts, repeat, profile_dir, articles_per_ticker=40, wire_stories=200):
+    import random
+    import tempfile
+    import news_store
+
+    words = ["earnings", "guidance", "upgrade", "downgrade", "lawsuit", "merger", "dividend", "buyback",
+             "inflation", "rates", "tariffs", "chips", "cloud", "recall", "layoffs", "outlook"]
+    results = []
+    for count in ticker_counts:
+        rng = random.Random(count)
+        now = time.time()
+        symbols = [f"SYM{i:04d}" for i in range(count)]
+        wire = [{'title': f"Markets {' '.join(rng.sample(words, 3))} story {i}", 'link': f"https://example.com/wire/{i}",
+                 'providerPublishTime': now - rng.uniform(0, 7 * 86400)} for i in range(wire_stories)]
+        news = {
+            symbol: [{'title': f"{symbol} {' '.join(rng.sample(words, 4))} {i}", 'link': f"https://example.com/{symbol}/{i}",
+                      'providerPublishTime': now - rng.uniform(0, 7 * 86400)} for i in range(articles_per_ticker // 2)]
+            + rng.sample(wire, articles_per_ticker // 2)
+            for symbol in symbols
+        }
+        portfolio = symbols[:max(1, count // 2)]
+        since = now - 24 * 3600
+
+        def scan():
+            seen, found = set(), []
+            for symbol in portfolio:
+                for article in news[symbol]:
+                    title = article['title'].lower()
+                    if article['providerPublishTime'] >= since and 'rates' in title.split() and title not in seen:
+                        seen.add(title)
+                        found.append(article)
+            return sorted(found, key=lambda article: -article['providerPublishTime'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            stores = []
+
+            def fresh_store():
+                stores.append(news_store.NewsStore(os.path.join(tmp, f"news{len(stores)}.db")))
+
+            tags = {'stage': 'news', 'tickers': count, 'articles_per_ticker': articles_per_ticker}
+            results.append(measure(f"news_ingest[{count} tickers]", lambda: stores[-1].ingest(news), repeat,
+                                   setup=fresh_store, items=count * articles_per_ticker, profile_dir=profile_dir,
+                                   track_memory=False, **tags))
+            store = stores[-1]
+            indexed = store.query(tickers=portfolio, text='rates', since=since)
+            tags.update(stored=store.stats()['articles'], matches=len(indexed),
+                        consistent=[a['title'] for a in indexed] == [a['title'] for a in scan()])
+            results.append(measure(f"news_query_index[{len(portfolio)} tickers,24h]",
+                                   lambda: store.query(tickers=portfolio, text='rates', since=since), repeat,
+                                   profile_dir=profile_dir, **tags))
+            results.append(measure(f"news_query_scan[{len(portfolio)} tickers,24h]", scan, repeat,
+                                   profile_dir=profile_dir, **tags))
+            for opened in stores:
+                opened.close()
+    return results
+
+
+def telemetry_benchmarks(symbol, repeat, profile_dir, calls=10000):
+    import market_data
+    import telemetry
+
+    market_data.get_info(symbol)
+    market_data.get_news(symbol)
+
+    def lookups():
+        for _ in range(calls):
+            market_data.get_info(symbol)
+            market_data.get_news(symbol)
+
+    results = []
+    was_enabled = telemetry.enabled()
+    try:
+        for enabled in (False, True):
+            telemetry.enable(enabled)
+            results.append(measure(f"telemetry_{'on' if enabled else 'off'}[{calls} cached lookups]", lookups,
+                                   repeat, items=calls * 2, profile_dir=profile_dir, track_memory=False,
+                                   stage='telemetry', enabled=enabled))
+    finally:
+        telemetry.enable(was_enabled)
+        telemetry.reset()
+    return results
+
+
+def alert_benchmarks(symbols, ticker_counts, repeat, profile_dir, alerts_per_symbol=100, ticks=200):
+    import random
+    from alert_engine import AlertEngine
+
+    results = []
+    for count in ticker_counts:
+        rng = random.Random(count)
+        tickers = symbols[:count]
+        stream = [(t, symbol, 100 + rng.gauss(0, 5)) for t in range(ticks) for symbol in tickers]
+
+        def run():
+            engine = AlertEngine()
+            for symbol in tickers:
+                for _ in range(alerts_per_symbol):
+                    engine.add_alert(symbol, rng.uniform(80, 120), rng.choice(['above', 'below']))
+            for timestamp, symbol, price in stream:
+                engine.process_tick(symbol, price, timestamp)
+
+        results.append(measure(f"alert_engine[{count * alerts_per_symbol} alerts,{len(stream)} ticks]", run,
+                               repeat, items=len(stream), profile_dir=profile_dir, stage='alert_engine',
+                               tickers=count, alerts=count * alerts_per_symbol))
+    return results
+
+
+def import_time(module, runs=5):
+    cumulative = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                                   capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'),
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        for line in completed.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative.append(int(fields[1]) / 1e6)
+    return cumulative
+
+
+MENU_PROMPT = b'Enter your choice'
+
+
+def launch_time(runs=5):
+    # Wall time from starting `python main.py` to its menu prompt.
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, 'main.py'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)))
+        output = b''
+        while MENU_PROMPT not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                break
+            output += chunk
+        elapsed = time.perf_counter() - started
+        process.communicate(b'6\n', timeout=30)
+        if MENU_PROMPT not in output:
+            raise RuntimeError(f"main.py exited before showing its menu: {output.decode(errors='replace')}")
+        timings.append(elapsed)
+    return timings
+
+
+def _startup_result(name, timings):
+    return {
+        'name': name,
+        'repeat': len(timings),
+        'items': 1,
+        'mean_seconds': statistics.fmean(timings),
+        'p50_seconds': statistics.median(timings),
+        'p95_seconds': _percentile(timings, 95),
+        'min_seconds': min(timings),
+        'max_seconds': max(timings),
+        'throughput_per_second': None,
+        'peak_memory_kb': None,
+        'stage': 'startup'
+    }
+
+
+def startup_benchmarks(budget_ms, runs=5):
+    result = _startup_result('launch[main]', launch_time(runs))
+    result['budget_seconds'] = budget_ms / 1000
+    print(f"{result['name']:<55} p50={result['p50_seconds'] * 1000:9.2f}ms", file=sys.stderr)
+    results = [result]
+    for module in ['main', 'batch', 'bench']:
+        timings = import_time(module, runs)
+        if not timings:
+            continue
+        result = _startup_result(f"import[{module}]", timings)
+        print(f"{result['name']:<55} p50={result['p50_seconds'] * 1000:9.2f}ms", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['name'])
+        if previous and result['p50_seconds'] > previous['p50_seconds'] * threshold:
+            regressions.append({
+                'name': result['name'],
+                'baseline_p50_seconds': previous['p50_seconds'],
+                'p50_seconds': result['p50_seconds'],
+                'ratio': result['p50_seconds'] / previous['p50_seconds']
+            })
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the advisor pipeline against offline market data.")
+    parser.add_argument('--tickers', default=",".join(map(str, DEFAULT_TICKER_COUNTS)),
+                        help="Comma-separated ticker counts for batch/alert stages")
+    parser.add_argument('--periods', default=",".join(DEFAULT_PERIODS),
+                        help="Comma-separated history periods for chart stages")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated Yahoo latency per call (seconds)")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Simulated OpenAI latency per call (seconds)")
+    parser.add_argument('--llm-token-latency', type=float, default=0.0002,
+                        help="Simulated OpenAI time per prompt token in the prompt stage (seconds)")
+    parser.add_argument('--data-dir', help="Directory of recorded market data (see offline_backend.py)")
+    parser.add_argument('--live', action='store_true', help="Use real Yahoo Finance and OpenAI instead of the offline backend")
+    parser.add_argument('--stages', default='startup,single,graph,prompt,indicators,history,backtest,screener,optimizer,news,telemetry,batch,alerts')
+    parser.add_argument('-o', '--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="Previous results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Allowed p50 slowdown ratio vs baseline")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc peak-memory runs")
+    parser.add_argument('--profile', metavar='DIR', help="Dump a cProfile .prof file per stage into DIR")
+    parser.add_argument('--startup-budget', type=float, help="Fail if main.py takes longer to show its menu (ms)")
+    parser.add_argument('--py-spy', metavar='FILE', help="Record a py-spy flame graph of the whole run into FILE")
+    args = parser.parse_args(argv)
+
+    global TRACK_MEMORY
+    TRACK_MEMORY = not args.no_memory
+
+    if args.py_spy and not os.environ.get('STOCK_ADVISOR_UNDER_PY_SPY'):
+        if shutil.which('py-spy') is None:
+            parser.error("py-spy is not installed (pip install py-spy)")
+        argv = list(sys.argv[1:] if argv is None else argv)
+        env = dict(os.environ, STOCK_ADVISOR_UNDER_PY_SPY='1')
+        command = ['py-spy', 'record', '-o', args.py_spy, '--', sys.executable, os.path.abspath(__file__)] + argv
+        return subprocess.call(command, env=env)
+
+    workdir = tempfile.mkdtemp(prefix='stock-advisor-bench-')
+    os.environ['STOCK_ADVISOR_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.environ['STOCK_ADVISOR_PORTFOLIO_DB'] = os.path.join(workdir, 'portfolio.db')
+    market = None
+    if not args.live:
+        import offline_backend
+        market = offline_backend.install(data_dir=args.data_dir, latency=args.latency, llm_latency=args.llm_latency)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    ticker_counts = [int(count) for count in args.tickers.split(',') if count]
+    periods = [period for period in args.periods.split(',') if period]
+    stages = set(args.stages.split(','))
+    symbols = [f"SYM{i:04d}" for i in range(max(ticker_counts))] if not args.live else []
+    if args.live:
+        symbols = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'JPM', 'V', 'XOM'][:max(ticker_counts)]
+    primary = symbols[0] if symbols else 'AAPL'
+
+    started = time.perf_counter()
+    results = []
+    try:
+        if 'startup' in stages:
+            import config
+            budget_ms = args.startup_budget if args.startup_budget is not None else config.STARTUP_BUDGET_MS
+            results += startup_benchmarks(budget_ms)
+        if 'single' in stages:
+            results += single_ticker_benchmarks(primary, args.repeat, args.profile)
+        if 'graph' in stages:
+            results += graph_benchmarks(primary, periods, args.repeat, args.profile)
+        if 'prompt' in stages:
+            results += prompt_benchmarks(symbols[:10] or [primary], args.repeat, args.profile, market,
+                                         args.llm_token_latency)
+        if 'indicators' in stages:
+            results += indicator_benchmarks(ticker_counts, args.repeat, args.profile)
+        if 'history' in stages:
+            results += history_benchmarks(symbols, ticker_counts, args.repeat, args.profile)
+        if 'backtest' in stages:
+            results += backtest_benchmarks(ticker_counts, args.repeat, args.profile)
+        if 'screener' in stages:
+            results += screener_benchmarks(args.repeat, args.profile)
+        if 'optimizer' in stages:
+            results += optimizer_benchmarks(args.repeat, args.profile)
+        if 'news' in stages:
+            results += news_benchmarks(ticker_counts, args.repeat, args.profile)
+        if 'telemetry' in stages:
+            results += telemetry_benchmarks(primary, args.repeat, args.profile)
+        if 'batch' in stages:
+            results += batch_benchmarks(symbols, ticker_counts, args.repeat, args.profile)
+        if 'alerts' in stages:
+            results += alert_benchmarks(symbols, ticker_counts, args.repeat, args.profile)
+    finally:
+        reset_state()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': 'live' if args.live else 'offline',
+        'settings': {
+            'repeat': args.repeat, 'latency': args.latency, 'llm_latency': args.llm_latency,
+            'llm_token_latency': args.llm_token_latency,
+            'ticker_counts': ticker_counts, 'periods': periods
+        },
+        'total_seconds': time.perf_counter() - started,
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        report['regressions'] = compare(results, args.baseline, args.threshold)
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression['name']}: {regression['baseline_p50_seconds'] * 1000:.2f}ms -> "
+                  f"{regression['p50_seconds'] * 1000:.2f}ms ({regression['ratio']:.2f}x)", file=sys.stderr)
+        exit_code = 1 if report['regressions'] else 0
+
+    for result in results:
+        if result.get('budget_seconds') and result['p50_seconds'] > result['budget_seconds']:
+            print(f"OVER BUDGET {result['name']}: {result['p50_seconds'] * 1000:.2f}ms > "
+                  f"{result['budget_seconds'] * 1000:.0f}ms", file=sys.stderr)
+            exit_code = 1
+        if result.get('token_budget') and result['prompt_tokens'] >= result['token_budget']:
+            print(f"OVER BUDGET {result['name']}: {result['prompt_tokens']:.0f} prompt tokens >= "
+                  f"{result['token_budget']:.0f}", file=sys.stderr)
+            exit_code = 1
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import re
+import shutil
+
+import numpy as np
+
+LABEL_WIDTH = 12
+SERIES_COLORS = ['cyan', 'yellow', 'magenta', 'green', 'red', 'blue', 'white']
+
+
+def lttb_indices(values, threshold):
+    values = np.asarray(values, dtype=float)
+    n = values.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    bounds = np.append((np.floor(np.arange(threshold - 1) * every) + 1).astype(int)[:-1], n - 1)
+    missing = np.isnan(values)
+    filled = np.where(missing, np.nanmean(values) if not missing.all() else 0.0, values)
+    counts = np.diff(np.append(bounds, n))
+    avg_x = np.add.reduceat(x, bounds) / counts
+    avg_y = np.add.reduceat(filled, bounds) / counts
+
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        # Keep the point forming the largest triangle with the previous pick
+        # and the average of the next bucket.
+        areas = np.abs(
+            (x[selected] - avg_x[bucket + 1]) * (filled[start:end] - filled[selected]) -
+            (x[selected] - x[start:end]) * (avg_y[bucket + 1] - filled[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def minmax_indices(values, threshold):
+    values = np.asarray(values, dtype=float)
+    n = values.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Equal buckets, with the remainder going to the last one; buckets with
+    # no data at all (a halted symbol) contribute no points. One slot is
+    # left for the last point so the result never exceeds `threshold`.
+    buckets = (threshold - 1) // 2
+    size = n // buckets
+    head = (buckets - 1) * size
+    offsets = np.arange(buckets) * size
+    missing = np.isnan(values)
+    lows = np.where(missing, np.inf, values)
+    highs = np.where(missing, -np.inf, values)
+    low = np.append(lows[:head].reshape(-1, size).argmin(axis=1), lows[head:].argmin()) + offsets
+    high = np.append(highs[:head].reshape(-1, size).argmax(axis=1), highs[head:].argmax()) + offsets
+    has_data = np.logical_or.reduceat(~missing, offsets)
+    return np.unique(np.concatenate([low[has_data], high[has_data], [n - 1]]))
+
+
+def downsample(values, threshold, method='lttb'):
+    if method == 'minmax':
+        return minmax_indices(values, threshold)
+    return lttb_indices(values, threshold)
+
+
+def overlay_series(values, overlays, high=None, low=None, volume=None):
+    import indicators
+
+    series = {}
+    for overlay in overlays or []:
+        match = re.fullmatch(r'(sma|ema|bb|vwap)(\d+)', overlay.lower())
+        if not match:
+            raise ValueError(f"Unknown overlay '{overlay}'. Use e.g. sma20, ema50, bb20 or vwap20.")
+        kind, window = match.group(1), int(match.group(2))
+        if kind == 'sma':
+            series[f"SMA{window}"] = indicators.sma(values, window)
+        elif kind == 'ema':
+            series[f"EMA{window}"] = indicators.ema(values, window)
+        elif kind == 'vwap':
+            if volume is None:
+                raise ValueError("The vwap overlay needs volume data.")
+            series[f"VWAP{window}"] = indicators.vwap(
+                values if high is None else high, values if low is None else low, values, volume, window
+            )
+        else:
+            lower, _, upper = indicators.bollinger(values, window)
+            series[f"BB{window} lower"] = lower
+            series[f"BB{window} upper"] = upper
+    return series
+
+
+def chart_width():
+    return max(20, shutil.get_terminal_size((80, 24)).columns - LABEL_WIDTH)
+
+
+def prepare_series(series, width=None, method='lttb'):
+    width = width or chart_width()
+    names = list(series)
+    primary = np.asarray(series[names[0]], dtype=float)
+    indices = downsample(primary, width, method)
+    return {name: np.asarray(values, dtype=float)[indices] for name, values in series.items()}
+
+
+def render(series, width=None, height=12, method='lttb', value_format='{:8.2f}'):
+    import asciichartpy
+
+    sampled = prepare_series(series, width, method)
+    colors = [getattr(asciichartpy, SERIES_COLORS[i % len(SERIES_COLORS)]) for i in range(len(sampled))]
+    config = {
+        'height': height,
+        'format': value_format,
+        'colors': colors
+    }
+    data = [[float(value) for value in values] for values in sampled.values()]
+    return asciichartpy.plot(data if len(data) > 1 else data[0], config)
+
+
+def legend(names):
+    from colorama import Fore, Style
+
+    palette = {
+        'cyan': Fore.CYAN, 'yellow': Fore.YELLOW, 'magenta': Fore.MAGENTA, 'green': Fore.GREEN,
+        'red': Fore.RED, 'blue': Fore.BLUE, 'white': Fore.WHITE
+    }
+    return "  ".join(
+        f"{palette[SERIES_COLORS[i % len(SERIES_COLORS)]]}─ {name}{Style.RESET_ALL}"
+        for i, name in enumerate(names)
+    )
@@ -0,0 +1,23 @@
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+if load_dotenv is not None:
+    load_dotenv()
+
+DATA_DIR = os.getenv("STOCK_ADVISOR_DATA_DIR", os.path.join(os.path.expanduser("~"), ".stock_advisor"))
+CACHE_DIR = os.getenv("STOCK_ADVISOR_CACHE_DIR", os.path.join(DATA_DIR, "cache"))
+PORTFOLIO_DB = os.getenv("STOCK_ADVISOR_PORTFOLIO_DB", os.path.join(DATA_DIR, "portfolio.db"))
+
+STARTUP_BUDGET_MS = float(os.getenv("STOCK_ADVISOR_STARTUP_BUDGET_MS", "150"))
+
+
+def get(name, default=None):
+    return os.getenv(name, default)
+
+
+def openai_api_key():
+    return os.getenv("OPENAI_API_KEY")
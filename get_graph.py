@@ -1,24 +1,48 @@
-def get_graph(ticker_symbol, period='1y'):
-    import yfinance as yf
-    from asciichartpy import plot
+INTRADAY_PERIODS = {'1d': '5m', '5d': '30m'}
+
+
+def get_graph_data(ticker_symbol, period='1y'):
+    import market_data
+
+    return market_data.get_bars(ticker_symbol, period=period, interval=INTRADAY_PERIODS.get(period, '1d'))
+
+
+def get_graph(ticker_symbol, period='1y', overlays=None, compare=None, width=None, height=12):
+    import market_data
+    import charts
     from colorama import Fore, Style
-    
-    stock = yf.Ticker(ticker_symbol)
-    hist = stock.history(period=period)
-    
-    prices = hist['Close'].tolist()
-    sampled_prices = prices[::5]
-    
-    config = {
-        'height': 12,
-        'format': '{:6.2f}'
-    }
-    
-    print(f"\n{Fore.CYAN}{ticker_symbol} Price History ({period}){Style.RESET_ALL}")
+
+    from bar_store import to_frame
+
+    interval = INTRADAY_PERIODS.get(period, '1d')
+    bars = get_graph_data(ticker_symbol, period)
+    if not bars.size:
+        print(f"{Fore.RED}No price data for {ticker_symbol} ({period}).{Style.RESET_ALL}")
+        return None
+
+    prices = bars['close']
+    series = {ticker_symbol: prices}
+
+    if compare:
+        closes = market_data.get_close_matrix([ticker_symbol] + list(compare), period=period, interval=interval)
+        closes = closes.ffill().dropna()
+        series = {
+            symbol: (closes[symbol].to_numpy(dtype=float) / closes[symbol].iloc[0] - 1) * 100
+            for symbol in closes.columns
+        }
+    else:
+        series.update(charts.overlay_series(
+            prices, overlays, bars['high'], bars['low'], bars['volume']
+        ))
+
+    title = f"{ticker_symbol} Price History ({period})" if not compare else f"Return Comparison % ({period})"
+    print(f"\n{Fore.CYAN}{title}{Style.RESET_ALL}")
     print("-" * 50)
-    
-    print(plot(sampled_prices, config))
-    
+
+    print(charts.render(series, width=width, height=height))
+    if len(series) > 1:
+        print(charts.legend(series))
+
     print(f"\n{Fore.YELLOW}Start: ${prices[0]:.2f} | End: ${prices[-1]:.2f}{Style.RESET_ALL}\n")
-    
-    return hist
+
+    return to_frame(bars, market_data.history_timezone(ticker_symbol, interval))
@@ -0,0 +1,558 @@
+import re
+
+import numpy as np
+
+DEFAULT_SPECS = ('sma20', 'sma50', 'ema20', 'rsi14', 'macd', 'atr14', 'bb20', 'vwap20', 'obv')
+DEFAULT_WINDOWS = {'rsi': 14, 'atr': 14, 'bb': 20, 'beta': 60, 'corr': 60}
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+_SPEC_PATTERN = re.compile(r'(sma|ema|rsi|atr|bb|vwap|beta|corr|macd|obv)(\d*)')
+
+
+def parse_spec(spec):
+    match = _SPEC_PATTERN.fullmatch(spec.lower().strip())
+    if not match:
+        raise ValueError(f"Unknown indicator '{spec}'. Use e.g. sma20, ema50, rsi14, macd, atr14, bb20, vwap20, obv, beta60 or corr60.")
+    kind, window = match.group(1), match.group(2)
+    if kind in ('macd', 'obv'):
+        if window:
+            raise ValueError(f"Indicator '{kind}' does not take a window")
+        return kind, None
+    if window:
+        window = int(window)
+        if window < 1:
+            raise ValueError(f"Indicator window must be positive: '{spec}'")
+        return kind, window
+    if kind in DEFAULT_WINDOWS:
+        return kind, DEFAULT_WINDOWS[kind]
+    if kind == 'vwap':
+        return kind, None
+    raise ValueError(f"Indicator '{kind}' needs a window, e.g. {kind}20")
+
+
+def output_names(spec):
+    kind, window = parse_spec(spec)
+    name = f"{kind}{window or ''}"
+    if kind == 'macd':
+        return ['macd', 'macd_signal', 'macd_hist']
+    if kind == 'bb':
+        return [f"{name}_lower", f"{name}_middle", f"{name}_upper"]
+    return [name]
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return values[:, None], True
+    return values, False
+
+
+def _restore(result, flat):
+    return result[:, 0] if flat else result
+
+
+def _fill(values):
+    # Forward fill gaps and back fill each column's leading NaNs with its
+    # first value; returns the filled copy and the first valid row per column.
+    n, k = values.shape
+    finite = np.isfinite(values)
+    start = np.where(finite.any(axis=0), finite.argmax(axis=0), n)
+    if finite.all():
+        return np.ascontiguousarray(values), start
+    rows = np.where(finite, np.arange(n)[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    rows = np.maximum(rows, np.minimum(start, n - 1)[None, :]) if n else rows
+    filled = np.take_along_axis(values, rows, axis=0) if n else values.copy()
+    return np.nan_to_num(filled, nan=0.0), start
+
+
+def _mask(result, start, warmup):
+    rows = np.arange(result.shape[0])[:, None]
+    result[rows < (start + warmup)[None, :]] = np.nan
+    return result
+
+
+def _rolling_sum(values, window):
+    n = values.shape[0]
+    result = np.full(values.shape, np.nan)
+    if n >= window:
+        cumulative = np.cumsum(values, axis=0)
+        result[window - 1] = cumulative[window - 1]
+        result[window:] = cumulative[window:] - cumulative[:-window]
+    return result
+
+
+def _ewm(values, alpha, start=None):
+    values = np.array(values, dtype=float)
+    n, k = values.shape
+    if n == 0:
+        return values
+    if start is not None:
+        # Seeding at each column's own start is the same as back filling
+        # the earlier rows with that first value.
+        first = np.minimum(start, n - 1)
+        rows = np.maximum(np.arange(n)[:, None], first[None, :])
+        values = np.take_along_axis(values, rows, axis=0)
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return values
+
+    # y[t] = decay^(t+1) * (y[-1] + alpha * sum(x[j] / decay^(j+1))), evaluated
+    # in blocks short enough that decay^-block stays well inside float range.
+    block = max(1, min(n, int(-18.0 / np.log(decay))))
+    powers = decay ** np.arange(1, block + 1, dtype=float)[:, None]
+    result = np.empty_like(values)
+    previous = values[0].copy()
+    for begin in range(0, n, block):
+        chunk = values[begin:begin + block]
+        scale = powers[:chunk.shape[0]]
+        chunk_result = scale * (previous + alpha * np.cumsum(chunk / scale, axis=0))
+        result[begin:begin + chunk.shape[0]] = chunk_result
+        previous = chunk_result[-1]
+    return result
+
+
+def sma(values, window):
+    values, flat = _as_2d(values)
+    filled, start = _fill(values)
+    return _restore(_mask(_rolling_sum(filled, window) / window, start, window - 1), flat)
+
+
+def ema(values, window):
+    values, flat = _as_2d(values)
+    filled, start = _fill(values)
+    return _restore(_mask(_ewm(filled, 2.0 / (window + 1)), start, window - 1), flat)
+
+
+def rolling_std(values, window, ddof=1):
+    values, flat = _as_2d(values)
+    filled, start = _fill(values)
+    return _restore(_mask(_rolling_std(filled, window, ddof), start, window - 1), flat)
+
+
+def _rolling_std(filled, window, ddof=1):
+    # Centre on the column mean first so the running sums stay small.
+    centred = filled - filled.mean(axis=0) if filled.size else filled
+    total = _rolling_sum(centred, window)
+    squares = _rolling_sum(centred * centred, window)
+    variance = (squares - total * total / window) / max(window - ddof, 1)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def bollinger(values, window=20, width=2.0):
+    values, flat = _as_2d(values)
+    filled, start = _fill(values)
+    middle = _rolling_sum(filled, window) / window
+    deviation = _rolling_std(filled, window)
+    bands = [middle - width * deviation, middle, middle + width * deviation]
+    return tuple(_restore(_mask(band, start, window - 1), flat) for band in bands)
+
+
+def _changes(filled):
+    change = np.zeros_like(filled)
+    change[1:] = filled[1:] - filled[:-1]
+    return change
+
+
+def rsi(close, window=14):
+    close, flat = _as_2d(close)
+    filled, start = _fill(close)
+    change = _changes(filled)
+    alpha = 1.0 / window
+    gain = _ewm(np.maximum(change, 0.0), alpha, start + 1)
+    loss = _ewm(np.maximum(-change, 0.0), alpha, start + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+    return _restore(_mask(result, start, window), flat)
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    close, flat = _as_2d(close)
+    filled, start = _fill(close)
+    line = _ewm(filled, 2.0 / (fast + 1)) - _ewm(filled, 2.0 / (slow + 1))
+    signal_line = _ewm(line, 2.0 / (signal + 1), start)
+    histogram = line - signal_line
+    return (
+        _restore(_mask(line, start, slow - 1), flat),
+        _restore(_mask(signal_line, start, slow + signal - 2), flat),
+        _restore(_mask(histogram, start, slow + signal - 2), flat)
+    )
+
+
+def true_range(high, low, close):
+    high, flat = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    high, _ = _fill(high)
+    low, _ = _fill(low)
+    filled, start = _fill(close)
+    return _restore(_true_range(high, low, filled, start), flat)
+
+
+def _true_range(high, low, close, start):
+    previous = np.empty_like(close)
+    previous[0] = close[0]
+    previous[1:] = close[:-1]
+    result = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+    # A column's first bar has no previous close.
+    rows = np.arange(close.shape[0])[:, None]
+    return np.where(rows == start[None, :], high - low, result)
+
+
+def atr(high, low, close, window=14):
+    high, flat = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    filled, start = _fill(close)
+    ranges = _true_range(_fill(high)[0], _fill(low)[0], filled, start)
+    return _restore(_mask(_ewm(ranges, 1.0 / window, start), start, window - 1), flat)
+
+
+def vwap(high, low, close, volume, window=None):
+    high, flat = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    volume, _ = _as_2d(volume)
+    filled, start = _fill(close)
+    volume = _pre_start_zero(np.nan_to_num(volume), start)
+    price_volume = (_fill(high)[0] + _fill(low)[0] + filled) / 3.0 * volume
+    if window:
+        totals, volumes = _rolling_sum(price_volume, window), _rolling_sum(volume, window)
+    else:
+        totals, volumes = np.cumsum(price_volume, axis=0), np.cumsum(volume, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(volumes > 0, totals / volumes, np.nan)
+    return _restore(_mask(result, start, (window or 1) - 1), flat)
+
+
+def _pre_start_zero(values, start):
+    rows = np.arange(values.shape[0])[:, None]
+    return np.where(rows < start[None, :], 0.0, values)
+
+
+def obv(close, volume):
+    close, flat = _as_2d(close)
+    volume, _ = _as_2d(volume)
+    filled, start = _fill(close)
+    flow = np.sign(_changes(filled)) * np.nan_to_num(volume)
+    return _restore(_mask(np.cumsum(flow, axis=0), start, 0), flat)
+
+
+def returns(close):
+    close, flat = _as_2d(close)
+    filled, start = _fill(close)
+    result = np.zeros_like(filled)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = filled[1:] / filled[:-1] - 1.0
+    return _restore(_mask(np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0), start, 1), flat)
+
+
+def _co_moments(close, benchmark, window):
+    close, flat = _as_2d(close)
+    filled, start = _fill(close)
+    bench_filled, bench_start = _fill(np.asarray(benchmark, dtype=float).reshape(-1, 1))
+    start = np.maximum(start, bench_start[0])
+
+    def simple_returns(values):
+        result = np.zeros_like(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[1:] = values[1:] / values[:-1] - 1.0
+        return np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
+
+    x = simple_returns(filled)
+    y = np.broadcast_to(simple_returns(bench_filled), x.shape)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    sxx, syy, sxy = _rolling_sum(x * x, window), _rolling_sum(y * y, window), _rolling_sum(x * y, window)
+    covariance = (sxy - sx * sy / window) / max(window - 1, 1)
+    var_x = np.maximum((sxx - sx * sx / window) / max(window - 1, 1), 0.0)
+    var_y = np.maximum((syy - sy * sy / window) / max(window - 1, 1), 0.0)
+    return covariance, var_x, var_y, start, flat
+
+
+def rolling_beta(close, benchmark, window=60):
+    covariance, _, var_y, start, flat = _co_moments(close, benchmark, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(var_y > 0, covariance / var_y, np.nan)
+    return _restore(_mask(result, start, window), flat)
+
+
+def rolling_correlation(close, benchmark, window=60):
+    covariance, var_x, var_y, start, flat = _co_moments(close, benchmark, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where((var_x > 0) & (var_y > 0), covariance / np.sqrt(var_x * var_y), np.nan)
+    return _restore(_mask(result, start, window), flat)
+
+
+class Bars:
+    def __init__(self, dates, symbols, open, high, low, close, volume, benchmark=None):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.open = np.ascontiguousarray(open, dtype=float)
+        self.high = np.ascontiguousarray(high, dtype=float)
+        self.low = np.ascontiguousarray(low, dtype=float)
+        self.close = np.ascontiguousarray(close, dtype=float)
+        self.volume = np.ascontiguousarray(volume, dtype=float)
+        self.benchmark = None if benchmark is None else np.ascontiguousarray(benchmark, dtype=float)
+
+    def __len__(self):
+        return self.close.shape[0]
+
+    def column(self, symbol):
+        return self.symbols.index(symbol.upper())
+
+    @classmethod
+    def from_frames(cls, frames, benchmark=None):
+        import pandas as pd
+
+        frames = {symbol.upper(): frame for symbol, frame in frames.items() if frame is not None and not frame.empty}
+        index = pd.DatetimeIndex([])
+        for frame in frames.values():
+            index = index.union(_day_index(frame))
+        symbols = list(frames)
+
+        def field(name):
+            matrix = np.full((len(index), len(symbols)), np.nan)
+            for i, frame in enumerate(frames.values()):
+                series = pd.Series(frame[name.capitalize()].to_numpy(dtype=float), index=_day_index(frame))
+                series = series[~series.index.duplicated(keep='last')]
+                matrix[:, i] = series.reindex(index).to_numpy()
+            return matrix
+
+        benchmark_close = None
+        if benchmark is not None and not benchmark.empty:
+            series = pd.Series(benchmark['Close'].to_numpy(dtype=float), index=_day_index(benchmark))
+            benchmark_close = series[~series.index.duplicated(keep='last')].reindex(index).ffill().to_numpy()
+        return cls(index, symbols, *(field(name) for name in FIELDS), benchmark=benchmark_close)
+
+    @classmethod
+    def from_records(cls, records, benchmark=None):
+        # Aligns bar-store record arrays on the union of their timestamps
+        # without building a DataFrame per symbol.
+        import pandas as pd
+
+        records = {symbol.upper(): bars for symbol, bars in records.items() if bars.size}
+        symbols = list(records)
+        times = {symbol: _day_times(bars['time']) for symbol, bars in records.items()}
+        index = np.unique(np.concatenate(list(times.values()))) if times else np.array([], dtype='datetime64[ns]')
+
+        fields = {name: np.full((index.size, len(symbols)), np.nan) for name in FIELDS}
+        for i, symbol in enumerate(symbols):
+            rows = np.searchsorted(index, times[symbol])
+            for name in FIELDS:
+                fields[name][rows, i] = records[symbol][name]
+
+        benchmark_close = None
+        if benchmark is not None and benchmark.size:
+            bench_times = _day_times(benchmark['time'])
+            rows = np.searchsorted(bench_times, index, side='right') - 1
+            benchmark_close = np.where(rows >= 0, benchmark['close'][np.maximum(rows, 0)], np.nan)
+        return cls(pd.DatetimeIndex(index), symbols, *(fields[name] for name in FIELDS), benchmark=benchmark_close)
+
+
+def _day_times(times):
+    days = times.astype('datetime64[D]').astype(times.dtype)
+    return days if np.array_equal(days, times) else times
+
+
+def _day_index(frame):
+    index = frame.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.normalize() if (index == index.normalize()).all() else index
+
+
+def load_bars(symbols, period='1y', interval='1d', benchmark=None):
+    import market_data
+
+    symbols = [symbol.upper() for symbol in symbols]
+    market_data.prefetch(symbols + ([benchmark] if benchmark else []), period=period, interval=interval,
+                         include_info=False, include_news=False)
+    records = {symbol: market_data.get_bars(symbol, period=period, interval=interval) for symbol in symbols}
+    benchmark_records = market_data.get_bars(benchmark, period=period, interval=interval) if benchmark else None
+    return Bars.from_records(records, benchmark_records)
+
+
+def compute(bars, specs=DEFAULT_SPECS):
+    results = {}
+    for spec in specs:
+        kind, window = parse_spec(spec)
+        name = f"{kind}{window or ''}"
+        if kind == 'sma':
+            results[name] = sma(bars.close, window)
+        elif kind == 'ema':
+            results[name] = ema(bars.close, window)
+        elif kind == 'rsi':
+            results[name] = rsi(bars.close, window)
+        elif kind == 'macd':
+            results['macd'], results['macd_signal'], results['macd_hist'] = macd(bars.close)
+        elif kind == 'atr':
+            results[name] = atr(bars.high, bars.low, bars.close, window)
+        elif kind == 'bb':
+            lower, middle, upper = bollinger(bars.close, window)
+            results.update({f"{name}_lower": lower, f"{name}_middle": middle, f"{name}_upper": upper})
+        elif kind == 'vwap':
+            results[name] = vwap(bars.high, bars.low, bars.close, bars.volume, window)
+        elif kind == 'obv':
+            results[name] = obv(bars.close, bars.volume)
+        else:
+            if bars.benchmark is None:
+                raise ValueError(f"Indicator '{spec}' needs benchmark prices")
+            kernel = rolling_beta if kind == 'beta' else rolling_correlation
+            results[name] = kernel(bars.close, bars.benchmark, window)
+    return results
+
+
+def latest(results, column=0):
+    snapshot = {}
+    for name, values in results.items():
+        values = values[:, column] if values.ndim == 2 else values
+        snapshot[name] = float(values[-1]) if values.size else float('nan')
+    return snapshot
+
+
+class _Ring:
+    def __init__(self, window, width):
+        self.window = window
+        self.values = np.zeros((window, width))
+        self.total = np.zeros(width)
+        self.position = 0
+
+    def push(self, values):
+        self.total += values - self.values[self.position]
+        self.values[self.position] = values
+        self.position = (self.position + 1) % self.window
+        return self.total
+
+
+class StreamingIndicators:
+    """Keeps the same indicators as compute() up to date one bar at a time."""
+
+    def __init__(self, symbols, specs=DEFAULT_SPECS):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.specs = [parse_spec(spec) for spec in specs]
+        width = len(self.symbols)
+        self.count = np.zeros(width, dtype=int)
+        self.last = {name: np.full(width, np.nan) for name in FIELDS}
+        self.benchmark = np.nan
+        self.values = {}
+        self._state = {}
+        for kind, window in self.specs:
+            key = (kind, window)
+            if kind in ('sma', 'vwap') and window:
+                self._state[key] = [_Ring(window, width) for _ in range(2 if kind == 'vwap' else 1)]
+            elif kind == 'bb':
+                self._state[key] = [_Ring(window, width), _Ring(window, width)]
+            elif kind in ('beta', 'corr'):
+                self._state[key] = [_Ring(window, width) for _ in range(5)]
+            else:
+                self._state[key] = {}
+
+    def seed(self, bars):
+        for row in range(len(bars)):
+            benchmark = bars.benchmark[row] if bars.benchmark is not None else None
+            self.update(bars.open[row], bars.high[row], bars.low[row], bars.close[row], bars.volume[row], benchmark)
+        return self.values
+
+    def _ewm(self, state, name, values, alpha, seed):
+        previous = state.get(name)
+        value = values if previous is None else np.where(seed, values, alpha * values + (1 - alpha) * previous)
+        state[name] = value
+        return value
+
+    def update(self, open, high, low, close, volume, benchmark=None):
+        bar = {}
+        for name, values in zip(FIELDS, (open, high, low, close, volume)):
+            values = np.asarray(values, dtype=float).reshape(-1)
+            bar[name] = np.where(np.isfinite(values), values, self.last[name])
+        previous_close = self.last['close']
+        started = np.isfinite(bar['close'])
+        self.count += started
+        count = self.count
+        first, second = count == 1, count == 2
+
+        close = np.where(started, bar['close'], 0.0)
+        high = np.where(started, np.nan_to_num(bar['high'], nan=close), 0.0)
+        low = np.where(started, np.nan_to_num(bar['low'], nan=close), 0.0)
+        volume = np.where(started, np.nan_to_num(bar['volume']), 0.0)
+        change = np.where(count >= 2, close - np.nan_to_num(previous_close), 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = np.where(count >= 2, close / previous_close - 1.0, 0.0)
+        ret = np.nan_to_num(ret, nan=0.0, posinf=0.0, neginf=0.0)
+
+        previous_benchmark = self.benchmark
+        if benchmark is not None and np.isfinite(benchmark):
+            self.benchmark = float(benchmark)
+        benchmark_ret = 0.0
+        if np.isfinite(previous_benchmark) and previous_benchmark:
+            benchmark_ret = self.benchmark / previous_benchmark - 1.0
+
+        values = {}
+        nan = np.full(count.shape, np.nan)
+        for (kind, window), state in self._state.items():
+            name = f"{kind}{window or ''}"
+            if kind == 'sma':
+                values[name] = np.where(count >= window, state[0].push(close) / window, nan)
+            elif kind == 'ema':
+                result = self._ewm(state, 'ema', close, 2.0 / (window + 1), first)
+                values[name] = np.where(count >= window, result, nan)
+            elif kind == 'bb':
+                total, squares = state[0].push(close), state[1].push(close * close)
+                middle = total / window
+                deviation = np.sqrt(np.maximum((squares - total * middle) / max(window - 1, 1), 0.0))
+                ready = count >= window
+                values[f"{name}_lower"] = np.where(ready, middle - 2.0 * deviation, nan)
+                values[f"{name}_middle"] = np.where(ready, middle, nan)
+                values[f"{name}_upper"] = np.where(ready, middle + 2.0 * deviation, nan)
+            elif kind == 'rsi':
+                gain = self._ewm(state, 'gain', np.maximum(change, 0.0), 1.0 / window, second | first)
+                loss = self._ewm(state, 'loss', np.maximum(-change, 0.0), 1.0 / window, second | first)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    result = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+                values[name] = np.where(count > window, result, nan)
+            elif kind == 'macd':
+                fast = self._ewm(state, 'fast', close, 2.0 / (MACD_FAST + 1), first)
+                slow = self._ewm(state, 'slow', close, 2.0 / (MACD_SLOW + 1), first)
+                line = fast - slow
+                signal = self._ewm(state, 'signal', line, 2.0 / (MACD_SIGNAL + 1), first)
+                ready = count >= MACD_SLOW + MACD_SIGNAL - 1
+                values['macd'] = np.where(count >= MACD_SLOW, line, nan)
+                values['macd_signal'] = np.where(ready, signal, nan)
+                values['macd_hist'] = np.where(ready, line - signal, nan)
+            elif kind == 'atr':
+                previous = np.nan_to_num(previous_close)
+                ranges = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+                ranges = np.where(first, high - low, ranges)
+                result = self._ewm(state, 'atr', ranges, 1.0 / window, first)
+                values[name] = np.where(count >= window, result, nan)
+            elif kind == 'vwap':
+                price_volume = (high + low + close) / 3.0 * volume
+                if window:
+                    totals, volumes = state[0].push(price_volume), state[1].push(volume)
+                else:
+                    totals = state['price_volume'] = state.get('price_volume', 0.0) + price_volume
+                    volumes = state['volume'] = state.get('volume', 0.0) + volume
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    result = np.where(volumes > 0, totals / volumes, nan)
+                values[name] = np.where(count >= (window or 1), result, nan)
+            elif kind == 'obv':
+                state['obv'] = state.get('obv', 0.0) + np.sign(change) * volume
+                values[name] = np.where(count >= 1, state['obv'], nan)
+            else:
+                y = np.where(count >= 2, benchmark_ret, 0.0)
+                sx, sy = state[0].push(ret), state[1].push(y)
+                sxx, syy, sxy = state[2].push(ret * ret), state[3].push(y * y), state[4].push(ret * y)
+                covariance = (sxy - sx * sy / window) / max(window - 1, 1)
+                var_x = np.maximum((sxx - sx * sx / window) / max(window - 1, 1), 0.0)
+                var_y = np.maximum((syy - sy * sy / window) / max(window - 1, 1), 0.0)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    if kind == 'beta':
+                        result = np.where(var_y > 0, covariance / var_y, nan)
+                    else:
+                        result = np.where((var_x > 0) & (var_y > 0), covariance / np.sqrt(var_x * var_y), nan)
+                values[name] = np.where(count > window, result, nan)
+
+        for name in FIELDS:
+            self.last[name] = bar[name]
+        self.values = values
+        return values
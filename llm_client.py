@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import telemetry
+from cache import TTLCache
+import config
+
+DEFAULT_MODEL = "gpt-4"
+
+RETRYABLE_ERRORS = {
+    'RateLimitError', 'APIError', 'Timeout', 'TimeoutError', 'ServiceUnavailableError',
+    'APIConnectionError', 'ConnectionError', 'TryAgain'
+}
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        # A rate of 0 (or less) means no limit.
+        self.unlimited = rate_per_minute <= 0
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, float(rate_per_minute))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1.0):
+        if self.unlimited:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= seconds * self.rate
+
+
+class OpenAIBackend:
+    def __init__(self, api_key=None, api_base=None, timeout=60):
+        self.api_key = api_key
+        self.api_base = api_base or config.get("OPENAI_API_BASE")
+        self.timeout = timeout
+
+    def __call__(self, model, messages, temperature):
+        import openai
+
+        kwargs = {'api_key': self.api_key or config.openai_api_key()}
+        if self.api_base:
+            kwargs['api_base'] = self.api_base
+        chat_completion = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            request_timeout=self.timeout,
+            **kwargs
+        )
+        return {
+            'content': chat_completion.choices[0].message['content'],
+            'usage': dict(chat_completion.get('usage') or {})
+        }
+
+    def stream(self, model, messages, temperature):
+        import openai
+
+        kwargs = {'api_key': self.api_key or config.openai_api_key()}
+        if self.api_base:
+            kwargs['api_base'] = self.api_base
+        for chunk in openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            request_timeout=self.timeout,
+            stream=True,
+            **kwargs
+        ):
+            content = chunk.choices[0].delta.get('content') if chunk.choices else None
+            if content:
+                yield content
+
+
+class StubBackend:
+    def __init__(self, responder=None, latency=0.0):
+        self.responder = responder
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, model, messages, temperature):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]['content']
+        if self.responder is not None:
+            content = self.responder(model, messages, temperature)
+        else:
+            digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+            content = f"[{model} stub response {digest}] Hold. The data provided shows no significant change."
+        return {
+            'content': content,
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4}
+        }
+
+    def stream(self, model, messages, temperature):
+        words = self(model, messages, temperature)['content'].split(' ')
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + ' '
+
+
+class SharedStream:
+    """Chunks of one upstream stream, replayed to every reader that joins it."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def append(self, chunk):
+        with self._condition:
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def __iter__(self):
+        sent = 0
+        while True:
+            with self._condition:
+                while sent == len(self.chunks) and not self.done:
+                    self._condition.wait()
+                chunks = self.chunks[sent:]
+                done, error = self.done, self.error
+            yield from chunks
+            sent += len(chunks)
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+def request_key(model, messages, temperature):
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'temperature': temperature},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _is_retryable(error):
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _record_tokens(model, messages, content, usage=None):
+    if not telemetry.enabled():
+        return
+    from prompts import count_tokens
+
+    # Streamed responses carry no usage, so those are counted locally.
+    usage = usage or {}
+    prompt = usage.get('prompt_tokens') or sum(count_tokens(message['content'], model) for message in messages)
+    completion = usage.get('completion_tokens') or count_tokens(content, model)
+    telemetry.inc('llm_tokens_total', prompt, model=model, kind='prompt')
+    telemetry.inc('llm_tokens_total', completion, model=model, kind='completion')
+
+
+class LLMClient:
+    def __init__(self, backend=None, max_concurrency=4, requests_per_minute=60, max_retries=3,
+                 backoff=1.0, cache_ttl=6 * 60 * 60, cache_dir=None):
+        self.backend = backend or OpenAIBackend()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache_ttl = cache_ttl
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(config.CACHE_DIR, 'llm')
+        self._bucket = TokenBucket(requests_per_minute)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._cache = TTLCache(maxsize=1024, ttl=cache_ttl)
+        self._inflight = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _cached(self, key):
+        content = self._cache.get(key)
+        if content is not None or not self.cache_dir:
+            return content
+        try:
+            with open(self._cache_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        remaining = entry['created_at'] + self.cache_ttl - time.time()
+        if remaining <= 0:
+            return None
+        self._cache.set(key, entry['content'], ttl=remaining)
+        return entry['content']
+
+    def _store(self, key, content):
+        self._cache.set(key, content)
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump({'created_at': time.time(), 'content': content}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError:
+            pass
+
+    def _backoff(self, attempt, error, operation):
+        telemetry.inc('upstream_retries_total', service='llm', operation=operation)
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if type(error).__name__ == 'RateLimitError':
+            self._bucket.penalize(delay)
+        time.sleep(delay)
+
+    def _call(self, model, messages, temperature):
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            try:
+                with telemetry.track('llm', 'chat'):
+                    response = self.backend(model, messages, temperature)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                self._backoff(attempt, e, 'chat')
+                attempt += 1
+            else:
+                _record_tokens(model, messages, response['content'], response.get('usage'))
+                return response
+
+    def _stream_call(self, model, messages, temperature):
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            started = False
+            try:
+                with telemetry.track('llm', 'stream'):
+                    for chunk in self.backend.stream(model, messages, temperature):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                # Once text has reached the caller a retry would repeat it.
+                if started or attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                self._backoff(attempt, e, 'stream')
+                attempt += 1
+
+    def _run(self, key, model, messages, temperature, use_cache):
+        response = self._call(model, messages, temperature)
+        if use_cache:
+            self._store(key, response['content'])
+        return response['content']
+
+    def _run_stream(self, key, shared, model, messages, temperature, use_cache):
+        # Runs on the executor so the stream completes (and is cached) even if
+        # the reader that started it stops early.
+        try:
+            for chunk in self._stream_call(model, messages, temperature):
+                shared.append(chunk)
+        except Exception as e:
+            shared.finish(e)
+            raise
+        content = ''.join(shared.chunks)
+        _record_tokens(model, messages, content)
+        if use_cache:
+            self._store(key, content)
+        shared.finish()
+        return content
+
+    def _release(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._streams.pop(key, None)
+
+    def submit(self, messages, model=DEFAULT_MODEL, temperature=0.7, use_cache=True):
+        key = request_key(model, messages, temperature)
+        if use_cache:
+            content = self._cached(key)
+            telemetry.cache_result('llm', content is not None)
+            if content is not None:
+                future = Future()
+                future.set_result(content)
+                return future
+
+        with self._lock:
+            future = self._inflight.get(key)
+            created = future is None
+            if created:
+                future = self._executor.submit(self._run, key, model, messages, temperature, use_cache)
+                self._inflight[key] = future
+        if created:
+            future.add_done_callback(lambda done: self._release(key, done))
+        return future
+
+    def stream(self, messages, model=DEFAULT_MODEL, temperature=0.7, use_cache=True):
+        key = request_key(model, messages, temperature)
+        if use_cache:
+            content = self._cached(key)
+            telemetry.cache_result('llm', content is not None)
+            if content is not None:
+                yield content
+                return
+
+        # Identical requests in flight share one upstream call: a stream is
+        # joined from its first chunk, a plain request is awaited whole.
+        created = False
+        with self._lock:
+            future = self._inflight.get(key)
+            shared = self._streams.get(key)
+            if future is None and hasattr(self.backend, 'stream'):
+                shared = self._streams[key] = SharedStream()
+                future = self._executor.submit(self._run_stream, key, shared, model, messages, temperature, use_cache)
+                self._inflight[key] = future
+                created = True
+        if created:
+            future.add_done_callback(lambda done: self._release(key, done))
+        if shared is None:
+            yield (future or self.submit(messages, model=model, temperature=temperature, use_cache=use_cache)).result()
+            return
+        yield from shared
+
+    def complete(self, messages, **kwargs):
+        return self.submit(messages, **kwargs).result()
+
+    async def acomplete(self, messages, **kwargs):
+        return await asyncio.wrap_future(self.submit(messages, **kwargs))
+
+    def complete_many(self, batch, **kwargs):
+        futures = [self.submit(messages, **kwargs) for messages in batch]
+        return [future.result() for future in futures]
+
+    def chat(self, system, prompt, **kwargs):
+        return self.complete(_messages(system, prompt), **kwargs)
+
+    def stream_chat(self, system, prompt, **kwargs):
+        return self.stream(_messages(system, prompt), **kwargs)
+
+
+def _messages(system, prompt):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _default_backend():
+    if config.get("LLM_BACKEND", "openai").lower() == "stub":
+        return StubBackend(latency=float(config.get("LLM_STUB_LATENCY", "0")))
+    return OpenAIBackend()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                backend=_default_backend(),
+                max_concurrency=int(config.get("LLM_MAX_CONCURRENCY", "4")),
+                requests_per_minute=float(config.get("LLM_REQUESTS_PER_MINUTE", "60"))
+            )
+        return _client
+
+
+def set_client(client):
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def chat(system, prompt, **kwargs):
+    return get_client().chat(system, prompt, **kwargs)
+
+
+def stream_chat(system, prompt, **kwargs):
+    return get_client().stream_chat(system, prompt, **kwargs)
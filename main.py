@@ -1,84 +1,22 @@
-import openai
-from gather_yahoo_finance import gather_yahoo_finance
-from get_graph import get_graph
-from analysis import (
-    calculate_roi,
-    calculate_sharpe_ratio,
-    calculate_volatility,
-    track_profit_loss,
-    calculate_sector_diversity
-)
-from risk_management import calculate_position_size
-from market_sentiment import analyze_news_sentiment
-from real_time_alerts import set_price_alert
-from dotenv import load_dotenv
 import os
-import pandas as pd
 from colorama import Fore, Style
+import config
 
 def clear_console():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-load_dotenv()
+def get_portfolio():
+    from portfolio import get_portfolio
+    return get_portfolio()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+if __name__ == "__main__":
+    import argparse
+    import telemetry
 
-def analyze_stock(ticker, isHolding, include_sentiment=False):
-    financial_data = gather_yahoo_finance(ticker)
-    sentiment_data = ""
-    if include_sentiment:
-        sentiment_result = analyze_news_sentiment(ticker)
-        sentiment_data = f"\nMarket Sentiment: {sentiment_result['interpretation']} (Score: {sentiment_result['sentiment_score']:.2f})"
-    
-    analysis_prompt = f"""
-    Based on the following financial data for {ticker}:
-    {financial_data}
-    {sentiment_data}
-    
-    Is the user holding the stock? {isHolding}
-    
-    *y = yes, n = no*
-    
-    Use this information to provide a comprehensive financial analysis and investment recommendation.
-    
-    Not just the ticker, but also state the company name, and the industry it is in.
-    
-    Please provide a comprehensive financial analysis including:
-    1. Investment recommendation (Buy, Sell, Hold, etc)
-    2. Key financial metrics analysis
-    3. Risk assessments
-    4. Short-term and long-term outlook
-    5. Important factors influencing the stock
-    6. Potential price targets
-    
-    Present the analysis in a clear, structured format.
-    
-    The idea is to get to the point, but also provide a more detailed analysis than just a simple buy/sell/hold recommendation. Try to simplify the information so it isn't too long.
-    """
-    
-    try:
-        chat_completion = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional financial analyst with expertise in stock market analysis and investment strategies. Do NOT answer questions irrelevant to the topic AT ALL."
-                },
-                {
-                    "role": "user",
-                    "content": analysis_prompt
-                }
-            ],
-            temperature=0.7
-        )
-        return chat_completion.choices[0].message.content
-        
-    except Exception as e:
-        return f"An error occurred during analysis: {str(e)}"
+    parser = argparse.ArgumentParser(description="AI stock market advisor.")
+    telemetry.add_arguments(parser)
+    telemetry.from_arguments(parser.parse_args())
 
-if __name__ == "__main__":
-    portfolio = pd.DataFrame(columns=['symbol', 'initial_investment', 'current_value', 'sector'])
-    
     while True:
         print(f"\n{Fore.CYAN}Choose an option:{Style.RESET_ALL}")
         print(f"{Fore.GREEN}1. View Portfolio Analytics{Style.RESET_ALL}")
@@ -92,22 +30,46 @@ if __name__ == "__main__":
         
         if choice == "1":
             clear_console()
+            portfolio = get_portfolio()
             
             if portfolio.empty:
                 print(f"{Fore.RED}Portfolio is empty. Please add positions first.{Style.RESET_ALL}")
                 continue
                 
-            roi = calculate_roi(portfolio['initial_investment'].sum(), portfolio['current_value'].sum())
+            from analysis import calculate_roi, track_profit_loss, calculate_sector_diversity
+            from portfolio import mark_to_market, portfolio_metrics
+            from risk_engine import get_risk_engine
+
+            repriced = []
+            try:
+                repriced = mark_to_market(portfolio)
+                holdings, totals = portfolio_metrics(portfolio)
+                risk = get_risk_engine().snapshot(portfolio.symbols, window=252)
+                if not risk.empty:
+                    holdings = holdings.join(risk[['var_95', 'cvar_95', 'max_drawdown', 'beta']], on='symbol')
+            except Exception as e:
+                holdings, totals = None, None
+                print(f"{Fore.RED}Could not fetch market prices: {str(e)}{Style.RESET_ALL}")
+
+            roi = calculate_roi(*portfolio.totals())
             pl = track_profit_loss(portfolio)
             sector_weights = calculate_sector_diversity(portfolio)
 
             print(f"\n{Fore.CYAN}Portfolio Analytics:{Style.RESET_ALL}")
             print("=" * 50)
+            if repriced:
+                print(f"{Fore.YELLOW}Current value updated to shares x latest price for: {', '.join(repriced)}{Style.RESET_ALL}")
             print(f"{Fore.YELLOW}Portfolio ROI: {roi}%{Style.RESET_ALL}")
             print(f"\n{Fore.YELLOW}Profit/Loss by Position:{Style.RESET_ALL}")
             print(pl)
             print(f"\n{Fore.YELLOW}Sector Weights:{Style.RESET_ALL}")
             print(sector_weights)
+            if holdings is not None:
+                print(f"\n{Fore.YELLOW}Risk by Position (annualized volatility %, Sharpe ratio vs 2% risk-free, 1y daily VaR/CVaR 95%, max drawdown, beta vs {get_risk_engine().benchmark}):{Style.RESET_ALL}")
+                print(holdings.set_index('symbol').round(2))
+                print(f"\n{Fore.YELLOW}Portfolio Volatility: {totals['volatility']:.2f}% | Sharpe Ratio: {totals['sharpe_ratio']:.2f}{Style.RESET_ALL}")
+                if totals['partial_history']:
+                    print(f"{Fore.YELLOW}Days without prices for {', '.join(totals['partial_history'])} use the other holdings only.{Style.RESET_ALL}")
             print("=" * 50)
             
         elif choice == "2":
@@ -138,22 +100,60 @@ if __name__ == "__main__":
                     break
                 print(f"{Fore.RED}Invalid time period. Please choose from: {', '.join(valid_periods)}{Style.RESET_ALL}")
 
-            try:
-                analysis = analyze_stock(ticker, isHolding, include_sentiment == 'y')
-                graph = get_graph(ticker, graph_term)
-                if "An error occurred" not in analysis:
-                    print(f"\n{Fore.CYAN}Financial Analysis for {ticker}:{Style.RESET_ALL}")
-                    print("=" * 50)
-                    print(analysis)
-                    print("=" * 50)
-                    print(graph)
-                else:
+            import time
+            from concurrent.futures import ThreadPoolExecutor
+            from get_graph import get_graph, get_graph_data
+            from stock_analysis import stream_analysis
+
+            started = time.perf_counter()
+            first_output = None
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                chart_data = executor.submit(get_graph_data, ticker, graph_term)
+                analysis = executor.submit(stream_analysis, ticker, isHolding, include_sentiment == 'y')
+                try:
+                    has_prices = chart_data.result().size > 0
+                except Exception:
+                    has_prices = False
+                if not has_prices:
                     print(f"{Fore.RED}The ticker '{ticker}' does not exist. Please try again with a valid stock symbol.{Style.RESET_ALL}")
-            except Exception:
-                print(f"{Fore.RED}The ticker '{ticker}' does not exist. Please try again with a valid stock symbol.{Style.RESET_ALL}")
+                    continue
+                try:
+                    analysis = analysis.result()
+                except Exception as e:
+                    print(f"{Fore.RED}Error fetching data for {ticker}: {str(e)}{Style.RESET_ALL}")
+                    continue
+
+                # The LLM call starts on the first chunk; the chart and its
+                # metrics are drawn while it runs.
+                first_chunk = executor.submit(next, analysis, None)
+                try:
+                    graph = get_graph(ticker, graph_term)
+                    if graph is not None:
+                        print(graph)
+                except Exception as e:
+                    print(f"{Fore.RED}Could not draw the chart: {str(e)}{Style.RESET_ALL}")
+
+                print(f"\n{Fore.CYAN}Financial Analysis for {ticker}:{Style.RESET_ALL}")
+                print("=" * 50)
+                try:
+                    chunk = first_chunk.result()
+                    if chunk is None:
+                        print(f"{Fore.RED}No analysis was returned for {ticker}.{Style.RESET_ALL}")
+                    else:
+                        first_output = time.perf_counter() - started
+                        print(chunk, end="", flush=True)
+                        for chunk in analysis:
+                            print(chunk, end="", flush=True)
+                except Exception as e:
+                    print(f"\nAn error occurred during analysis: {str(e)}")
+                print()
+                print("=" * 50)
+            if first_output is not None:
+                print(f"{Fore.YELLOW}First output after {first_output:.2f}s, finished in {time.perf_counter() - started:.2f}s{Style.RESET_ALL}")
             
         elif choice == "3":
             clear_console()
+            portfolio = get_portfolio()
             
             while True:
                 print(f"\n{Fore.CYAN}Portfolio Management:{Style.RESET_ALL}")
@@ -177,15 +177,17 @@ if __name__ == "__main__":
                         except ValueError:
                             print(f"{Fore.RED}Please enter valid numerical values.{Style.RESET_ALL}")
                     
+                    while True:
+                        shares = input(f"{Fore.YELLOW}Enter number of shares (leave blank to skip; with shares, current value follows the market price): {Style.RESET_ALL}").strip()
+                        try:
+                            shares = float(shares) if shares else None
+                            break
+                        except ValueError:
+                            print(f"{Fore.RED}Please enter a valid numerical value.{Style.RESET_ALL}")
+                    
                     sector = input(f"{Fore.YELLOW}Enter sector (e.g., Technology, Healthcare): {Style.RESET_ALL}")
                     
-                    new_position = pd.DataFrame({
-                        'symbol': [symbol],
-                        'initial_investment': [initial_investment],
-                        'current_value': [current_value],
-                        'sector': [sector]
-                    })
-                    portfolio = pd.concat([portfolio, new_position], ignore_index=True)
+                    portfolio.add_position(symbol, initial_investment, current_value, sector, shares)
                     print(f"{Fore.GREEN}Position added successfully!{Style.RESET_ALL}")
                     
                 elif portfolio_choice == "2":
@@ -196,17 +198,17 @@ if __name__ == "__main__":
                         continue
                         
                     print(f"\n{Fore.YELLOW}Current positions:{Style.RESET_ALL}")
-                    print(portfolio)
+                    print(portfolio.to_frame())
                     symbol = input(f"{Fore.YELLOW}Enter symbol to update: {Style.RESET_ALL}").upper()
                     
-                    if symbol in portfolio['symbol'].values:
+                    if symbol in portfolio:
                         while True:
                             try:
                                 current_value = float(input(f"{Fore.YELLOW}Enter new current value: {Style.RESET_ALL}"))
                                 break
                             except ValueError:
                                 print(f"{Fore.RED}Please enter a valid numerical value.{Style.RESET_ALL}")
-                        portfolio.loc[portfolio['symbol'] == symbol, 'current_value'] = current_value
+                        portfolio.update_value(symbol, current_value)
                         print(f"{Fore.GREEN}Position updated successfully!{Style.RESET_ALL}")
                     else:
                         print(f"{Fore.RED}Symbol not found in portfolio.{Style.RESET_ALL}")
@@ -219,11 +221,10 @@ if __name__ == "__main__":
                         continue
                         
                     print(f"\n{Fore.YELLOW}Current positions:{Style.RESET_ALL}")
-                    print(portfolio)
+                    print(portfolio.to_frame())
                     symbol = input(f"{Fore.YELLOW}Enter symbol to remove: {Style.RESET_ALL}").upper()
                     
-                    if symbol in portfolio['symbol'].values:
-                        portfolio = portfolio[portfolio['symbol'] != symbol]
+                    if portfolio.remove(symbol):
                         print(f"{Fore.GREEN}Position removed successfully!{Style.RESET_ALL}")
                     else:
                         print(f"{Fore.RED}Symbol not found in portfolio.{Style.RESET_ALL}")
@@ -235,7 +236,7 @@ if __name__ == "__main__":
                         print(f"{Fore.RED}Portfolio is empty.{Style.RESET_ALL}")
                     else:
                         print(f"\n{Fore.YELLOW}Current Portfolio:{Style.RESET_ALL}")
-                        print(portfolio)
+                        print(portfolio.to_frame())
                         
                 elif portfolio_choice == "5":
                     clear_console()
@@ -261,6 +262,7 @@ if __name__ == "__main__":
                     print(f"{Fore.RED}Please enter valid numerical values.{Style.RESET_ALL}")
             
             try:
+                from risk_management import calculate_position_size
                 position_info = calculate_position_size(ticker, account_size, risk_percentage)
                 print(f"\n{Fore.CYAN}Position Size Analysis:{Style.RESET_ALL}")
                 print(f"{Fore.YELLOW}Suggested Position Size: ${position_info['suggested_position']}{Style.RESET_ALL}")
@@ -270,6 +272,13 @@ if __name__ == "__main__":
 
         elif choice == "5":
             clear_console()
+            from real_time_alerts import set_price_alert, get_alert_engine
+            
+            active_alerts = get_alert_engine().alerts()
+            if active_alerts:
+                print(f"\n{Fore.CYAN}Active Alerts:{Style.RESET_ALL}")
+                for alert in active_alerts:
+                    print(f"{Fore.YELLOW}{alert.symbol} {alert.alert_type} ${alert.target_price:.2f}{Style.RESET_ALL}")
             
             while True:
                 ticker = input(f"{Fore.YELLOW}Enter stock ticker symbol (e.g. AAPL): {Style.RESET_ALL}").upper()
@@ -284,8 +293,11 @@ if __name__ == "__main__":
                 except ValueError:
                     print(f"{Fore.RED}Please enter a valid numerical value.{Style.RESET_ALL}")
             
-            set_price_alert(ticker, target_price)
-            print(f"{Fore.GREEN}Price alert set for {ticker} at ${target_price:.2f}{Style.RESET_ALL}")
+            message = set_price_alert(ticker, target_price)
+            if message.startswith("Monitoring"):
+                print(f"{Fore.GREEN}Price alert set for {ticker} at ${target_price:.2f}{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}")
             
         elif choice == "6":
             clear_console()
@@ -0,0 +1,496 @@
+import os
+import json
+import time
+import threading
+
+import pandas as pd
+
+import telemetry
+from cache import TTLCache
+from config import CACHE_DIR
+
+INFO_TTL = 15 * 60
+NEWS_TTL = 10 * 60
+NEWS_LIMIT = 25
+HISTORY_TTL = 5 * 60
+INTRADAY_TTL = 60
+LIVE_PRICE_TTL = 5
+
+INTRADAY_INTERVALS = {'1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h'}
+
+
+_memory = TTLCache()
+_tickers = TTLCache(maxsize=256, ttl=60 * 60)
+_locks = {}
+_locks_guard = threading.Lock()
+_session = None
+
+
+def _lock_for(*key):
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def configure_session(pool_size=16):
+    global _session
+    try:
+        from curl_cffi import requests as curl_requests
+        session = curl_requests.Session(impersonate='chrome')
+    except ImportError:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    request = session.request
+
+    def counted_request(*args, **kwargs):
+        response = request(*args, **kwargs)
+        if telemetry.enabled():
+            telemetry.count_bytes('yahoo', len(response.content or b''))
+        return response
+
+    session.request = counted_request
+    _session = session
+    _tickers.clear()
+    return session
+
+
+def session_kwargs():
+    # Response sizes are only visible through a session we created.
+    if _session is None and telemetry.enabled():
+        configure_session()
+    return {'session': _session} if _session is not None else {}
+
+
+def _ticker(symbol):
+    import yfinance as yf
+
+    ticker = _tickers.get(symbol)
+    if ticker is None:
+        ticker = yf.Ticker(symbol, **session_kwargs())
+        _tickers.set(symbol, ticker)
+    return ticker
+
+
+def _meta_path(symbol, interval):
+    from bar_store import get_bar_store
+    return f"{get_bar_store().path(symbol, interval)}.json"
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _today():
+    return pd.Timestamp.now().normalize()
+
+
+def _resolve_range(period, start=None, end=None):
+    end = pd.Timestamp(end).normalize() if end is not None else _today() + pd.Timedelta(days=1)
+    if start is not None:
+        return pd.Timestamp(start).normalize(), end, None
+
+    today = _today()
+    tail = None
+    if period == 'max':
+        start = pd.Timestamp('1900-01-01')
+    elif period == 'ytd':
+        start = pd.Timestamp(year=today.year, month=1, day=1)
+    elif period.endswith('mo'):
+        start = today - pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith('y'):
+        start = today - pd.DateOffset(years=int(period[:-1]))
+    elif period.endswith('d'):
+        # yfinance treats day periods as trading days, so pad for weekends
+        # and holidays and trim to the last N bars afterwards.
+        tail = int(period[:-1])
+        start = today - pd.Timedelta(days=tail * 2 + 7)
+    else:
+        raise ValueError(f"Unsupported period: {period}")
+    return start, end, tail
+
+
+def _naive_index(frame):
+    index = frame.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index
+
+
+def _download(symbol, interval, start, end):
+    ticker = _ticker(symbol)
+    with telemetry.track('yahoo', 'history'):
+        if start <= pd.Timestamp('1900-01-01'):
+            return ticker.history(period='max', interval=interval)
+        return ticker.history(
+            start=start.strftime('%Y-%m-%d'),
+            end=end.strftime('%Y-%m-%d'),
+            interval=interval
+        )
+
+
+def _timezone(frame):
+    tz = getattr(frame.index, 'tz', None) if frame is not None else None
+    return str(tz) if tz is not None else None
+
+
+def _load_meta(symbol, interval):
+    key = ('history', symbol, interval)
+    meta = _memory.get(key)
+    if meta is None:
+        meta = _read_json(_meta_path(symbol, interval))
+        if meta is not None:
+            _memory.set(key, meta, ttl=24 * 60 * 60)
+    return meta
+
+
+def _write_bars(symbol, interval, frame):
+    # Returns False when the bars could not be stored; the range they
+    # cover must then not be recorded as cached.
+    from bar_store import from_frame, get_bar_store
+
+    try:
+        get_bar_store().write(symbol, interval, from_frame(frame))
+    except OSError:
+        return False
+    return True
+
+
+def _store_history(symbol, interval, frame, meta):
+    if not _write_bars(symbol, interval, frame):
+        return False
+    meta.setdefault('tz', _timezone(frame))
+    _memory.set(('history', symbol, interval), meta, ttl=24 * 60 * 60)
+    try:
+        _write_json(_meta_path(symbol, interval), meta)
+    except OSError:
+        pass
+    return True
+
+
+def _last_stored(symbol, interval):
+    from bar_store import get_bar_store
+
+    records = get_bar_store().read(symbol, interval)
+    return pd.Timestamp(records['time'][-1]) if records.size else None
+
+
+def _fill_history(symbol, interval, start, end):
+    meta = _load_meta(symbol, interval)
+    now = time.time()
+    today = _today()
+
+    if meta is None or 'start' not in meta:
+        telemetry.cache_result('history', False)
+        frame = _download(symbol, interval, start, end)
+        if not frame.empty:
+            _store_history(symbol, interval, frame, {'start': start, 'end': end, 'fetched_at': now})
+        return
+
+    covered_start = pd.Timestamp(meta['start'])
+    covered_end = pd.Timestamp(meta['end'])
+    changed = False
+
+    if start < covered_start and _write_bars(symbol, interval, _download(symbol, interval, start, covered_start)):
+        covered_start = start
+        changed = True
+
+    stale = end > today and now - meta['fetched_at'] > HISTORY_TTL
+    if end > covered_end or stale:
+        refresh_from = covered_end
+        last = _last_stored(symbol, interval)
+        if last is not None:
+            refresh_from = min(covered_end, last.normalize())
+        if _write_bars(symbol, interval, _download(symbol, interval, refresh_from, max(end, covered_end))):
+            covered_end = max(end, covered_end)
+            meta['fetched_at'] = now
+            changed = True
+
+    telemetry.cache_result('history', not changed)
+    if changed:
+        meta.update({'start': covered_start, 'end': covered_end})
+        _store_history(symbol, interval, None, meta)
+
+
+def _intraday_window(symbol, period, interval, start, end):
+    key = ('intraday', symbol, period, interval, start, end)
+    window = _memory.get(key)
+    if window is None:
+        with _lock_for('intraday', symbol, interval):
+            window = _memory.get(key)
+            if window is None:
+                ticker = _ticker(symbol)
+                with telemetry.track('yahoo', 'history'):
+                    if start is not None:
+                        frame = ticker.history(start=start, end=end, interval=interval)
+                    else:
+                        frame = ticker.history(period=period, interval=interval)
+                window = (None, None)
+                if not frame.empty and _store_history(symbol, interval, frame, {'tz': _timezone(frame)}):
+                    index = _naive_index(frame)
+                    window = (index[0], index[-1] + pd.Timedelta(microseconds=1))
+                _memory.set(key, window, ttl=INTRADAY_TTL)
+    return window
+
+
+def get_bars(symbol, period='1mo', interval='1d', start=None, end=None):
+    from bar_store import empty, get_bar_store
+
+    symbol = symbol.upper()
+    if interval in INTRADAY_INTERVALS:
+        start, end = _intraday_window(symbol, period, interval, start, end)
+        if start is None:
+            return empty()
+        return get_bar_store().slice(symbol, interval, start, end)
+
+    start, end, tail = _resolve_range(period, start, end)
+    with _lock_for('history', symbol, interval):
+        _fill_history(symbol, interval, start, end)
+    return get_bar_store().slice(symbol, interval, start, end, tail)
+
+
+def history_timezone(symbol, interval='1d'):
+    meta = _load_meta(symbol.upper(), interval)
+    return meta.get('tz') if meta else None
+
+
+def get_history(symbol, period='1mo', interval='1d', start=None, end=None):
+    from bar_store import to_frame
+
+    bars = get_bars(symbol, period, interval, start, end)
+    if not bars.size:
+        return pd.DataFrame()
+    return to_frame(bars, history_timezone(symbol, interval))
+
+
+def get_info(symbol):
+    symbol = symbol.upper()
+    key = ('info', symbol)
+    info = _memory.get(key)
+    if info is not None:
+        telemetry.cache_result('info', True)
+        return info
+
+    with _lock_for('info', symbol):
+        info = _memory.get(key)
+        if info is not None:
+            telemetry.cache_result('info', True)
+            return info
+
+        path = os.path.join(CACHE_DIR, 'info', f"{symbol}.json")
+        cached = _read_json(path)
+        fresh = bool(cached) and time.time() - cached['fetched_at'] < INFO_TTL
+        telemetry.cache_result('info', fresh)
+        if fresh:
+            info = cached['info']
+        else:
+            ticker = _ticker(symbol)
+            with telemetry.track('yahoo', 'info'):
+                info = ticker.info
+            try:
+                _write_json(path, {'fetched_at': time.time(), 'info': info})
+            except OSError:
+                pass
+
+        _memory.set(key, info, ttl=INFO_TTL)
+        return info
+
+
+def _fetch_news(symbol):
+    ticker = _ticker(symbol)
+    with telemetry.track('yahoo', 'news'):
+        return ticker.news or []
+
+
+def refresh_news(symbols, max_age=NEWS_TTL, max_workers=8):
+    # Fetches only symbols whose stored news is older than max_age and
+    # stores them in one transaction. Returns {symbol: exception}.
+    from concurrent.futures import ThreadPoolExecutor
+    from news_store import get_news_store
+
+    store = get_news_store()
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    stale = store.stale(symbols, max_age)
+    telemetry.cache_result('news', True, len(symbols) - len(stale))
+    telemetry.cache_result('news', False, len(stale))
+    errors = {}
+    if not stale:
+        return errors
+
+    def fetch(symbol):
+        try:
+            return symbol, _fetch_news(symbol)
+        except Exception as e:
+            errors[symbol] = e
+            return symbol, None
+
+    if len(stale) == 1:
+        fetched = [fetch(stale[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as executor:
+            fetched = list(executor.map(fetch, stale))
+    store.ingest({symbol: news for symbol, news in fetched if news is not None})
+    for symbol in stale:
+        _memory.pop(('news', symbol))
+    return errors
+
+
+def get_news(symbol):
+    from news_store import get_news_store
+
+    symbol = symbol.upper()
+    key = ('news', symbol)
+    news = _memory.get(key)
+    if news is None:
+        with _lock_for('news', symbol):
+            news = _memory.get(key)
+            if news is None:
+                errors = refresh_news([symbol])
+                news = get_news_store().headlines([symbol], limit=NEWS_LIMIT)
+                # Older stored headlines are better than none when Yahoo fails.
+                if symbol in errors and not news:
+                    raise errors[symbol]
+                _memory.set(key, news, ttl=NEWS_TTL)
+                return news
+    telemetry.cache_result('news', True)
+    return news
+
+
+def get_live_price(symbol, max_age=LIVE_PRICE_TTL):
+    from yahoo_fin import stock_info
+
+    symbol = symbol.upper()
+    key = ('live_price', symbol)
+    price = _memory.get(key) if max_age else None
+    if max_age:
+        telemetry.cache_result('live_price', price is not None)
+    if price is None:
+        with telemetry.track('yahoo_fin', 'live_price'):
+            price = stock_info.get_live_price(symbol)
+        _memory.set(key, price, ttl=max_age)
+    return price
+
+
+def _history_covered(symbol, interval, start, end):
+    meta = _load_meta(symbol, interval)
+    if meta is None or 'start' not in meta:
+        return False
+    if start < pd.Timestamp(meta['start']) or end > pd.Timestamp(meta['end']):
+        return False
+    return not (end > _today() and time.time() - meta['fetched_at'] > HISTORY_TTL)
+
+
+def _seed_history(symbol, interval, update, start, end):
+    with _lock_for('history', symbol, interval):
+        meta = _load_meta(symbol, interval)
+        if meta is not None and 'start' in meta:
+            covered_start = pd.Timestamp(meta['start'])
+            covered_end = pd.Timestamp(meta['end'])
+            if start <= covered_end and end >= covered_start:
+                start = min(start, covered_start)
+                end = max(end, covered_end)
+        _store_history(symbol, interval, update, {'start': start, 'end': end, 'fetched_at': time.time(),
+                                                  'tz': _timezone(update)})
+
+
+def _symbol_frame(data, symbol):
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(0):
+            return None
+        data = data[symbol]
+    return data.dropna(how='all')
+
+
+def prefetch(symbols, period='1mo', interval='1d', include_info=True, include_news=True, max_workers=8):
+    import yfinance as yf
+    from concurrent.futures import ThreadPoolExecutor
+
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    errors = {}
+
+    if interval not in INTRADAY_INTERVALS:
+        start, end, _ = _resolve_range(period)
+        missing = [symbol for symbol in symbols if not _history_covered(symbol, interval, start, end)]
+        if missing:
+            if start <= pd.Timestamp('1900-01-01'):
+                window = {'period': 'max'}
+            else:
+                window = {'start': start.strftime('%Y-%m-%d'), 'end': end.strftime('%Y-%m-%d')}
+            try:
+                with telemetry.track('yahoo', 'download'):
+                    data = yf.download(
+                        missing, interval=interval, group_by='ticker', actions=True,
+                        ignore_tz=False, threads=max_workers, progress=False, **window, **session_kwargs()
+                    )
+            except Exception as e:
+                data = None
+                errors.update({symbol: str(e) for symbol in missing})
+            if data is not None and not data.empty:
+                for symbol in missing:
+                    frame = _symbol_frame(data, symbol)
+                    if frame is not None and not frame.empty:
+                        _seed_history(symbol, interval, frame, start, end)
+
+    if include_news:
+        errors.update({symbol: str(e) for symbol, e in refresh_news(symbols, max_workers=max_workers).items()})
+
+    def fetch(symbol):
+        try:
+            get_info(symbol)
+        except Exception as e:
+            errors[symbol] = str(e)
+
+    if include_info:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(fetch, symbols))
+
+    return errors
+
+
+def get_close_matrix(symbols, period='1y', interval='1d', max_workers=8):
+    symbols = [symbol.upper() for symbol in symbols]
+    if not symbols:
+        return pd.DataFrame()
+    prefetch(symbols, period=period, interval=interval, include_info=False,
+             include_news=False, max_workers=max_workers)
+
+    closes = {}
+    for symbol in symbols:
+        hist = get_history(symbol, period=period, interval=interval)
+        if hist is not None and not hist.empty:
+            index = _naive_index(hist)
+            if interval not in INTRADAY_INTERVALS:
+                index = index.normalize()
+            series = pd.Series(hist['Close'].to_numpy(), index=index)
+            closes[symbol] = series[~series.index.duplicated(keep='last')]
+    return pd.DataFrame(closes, columns=symbols).sort_index()
+
+
+def clear_cache(disk=False):
+    from bar_store import get_bar_store
+
+    _memory.clear()
+    _tickers.clear()
+    get_bar_store().clear()
+    if disk:
+        import shutil
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
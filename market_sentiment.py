@@ -1,18 +1,269 @@
-from textblob import TextBlob
-import yfinance as yf
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
-def analyze_news_sentiment(ticker):
-    stock = yf.Ticker(ticker)
-    news = stock.news
-    
-    sentiment_scores = []
+import market_data
+import telemetry
+from config import CACHE_DIR
+
+SENTIMENT_DB = os.path.join(CACHE_DIR, 'sentiment.db')
+HALF_LIFE_HOURS = 24.0
+
+
+def headline_id(article):
+    # Articles from the news store carry a key shared by every copy of the story.
+    if article.get('key'):
+        return article['key']
+    key = article.get('uuid') or article.get('link') or (article.get('title') or '').strip().lower()
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def score_headline(title):
+    from textblob import TextBlob
+
+    return TextBlob(title).sentiment.polarity
+
+
+def _score_titles(titles):
+    return [score_headline(title) for title in titles]
+
+
+class HeadlineCache:
+    def __init__(self, path=None):
+        self.path = path or SENTIMENT_DB
+        self._scores = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS headline_scores "
+                "(id TEXT PRIMARY KEY, polarity REAL NOT NULL, scored_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, ids):
+        found = {headline: self._scores[headline] for headline in ids if headline in self._scores}
+        missing = [headline for headline in ids if headline not in found]
+        if missing:
+            with self._lock:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self.connection.execute(
+                        f"SELECT id, polarity FROM headline_scores WHERE id IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    found.update(rows)
+            self._scores.update(found)
+        return found
+
+    def set_many(self, scores):
+        if not scores:
+            return
+        self._scores.update(scores)
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO headline_scores (id, polarity, scored_at) VALUES (?, ?, ?)",
+                [(headline, polarity, now) for headline, polarity in scores.items()]
+            )
+
+
+class SentimentAggregate:
+    """Mean and time-decayed polarity of a ticker's current headlines."""
+
+    def __init__(self, half_life_hours=HALF_LIFE_HOURS):
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.entries = {}
+        self.count = 0
+        self.total = 0.0
+        self._weighted_sum = 0.0
+        self._weight = 0.0
+        self._last_time = None
+
+    def __contains__(self, headline):
+        return headline in self.entries
+
+    def add(self, headline, polarity, published):
+        if headline in self.entries:
+            return False
+        published = published or time.time()
+        self.entries[headline] = (polarity, published)
+        self.count += 1
+        self.total += polarity
+
+        if self._last_time is None:
+            self._last_time = published
+        if published >= self._last_time:
+            factor = math.exp(-self.decay * (published - self._last_time))
+            self._weighted_sum = self._weighted_sum * factor + polarity
+            self._weight = self._weight * factor + 1.0
+            self._last_time = published
+        else:
+            factor = math.exp(-self.decay * (self._last_time - published))
+            self._weighted_sum += polarity * factor
+            self._weight += factor
+        return True
+
+    def remove(self, headline):
+        polarity, published = self.entries.pop(headline)
+        self.count -= 1
+        if not self.entries:
+            self.total = self._weighted_sum = self._weight = 0.0
+            self._last_time = None
+            return
+        self.total -= polarity
+        factor = math.exp(-self.decay * (self._last_time - published))
+        self._weighted_sum -= polarity * factor
+        self._weight = max(0.0, self._weight - factor)
+
+    def retain(self, headlines):
+        """Drop the headlines that are no longer in the ticker's news."""
+        for headline in [headline for headline in self.entries if headline not in headlines]:
+            self.remove(headline)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def decayed_mean(self):
+        return self._weighted_sum / self._weight if self._weight else 0.0
+
+
+_cache = None
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+def get_headline_cache():
+    global _cache
+    if _cache is None:
+        _cache = HeadlineCache()
+    return _cache
+
+
+def _aggregate(ticker):
+    with _aggregates_lock:
+        aggregate = _aggregates.get(ticker)
+        if aggregate is None:
+            aggregate = _aggregates[ticker] = SentimentAggregate()
+        return aggregate
+
+
+def _headlines(news):
+    headlines = {}
     for article in news:
-        analysis = TextBlob(article['title'])
-        sentiment_scores.append(analysis.sentiment.polarity)
-    
-    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+        if article.get('title'):
+            headlines[headline_id(article)] = (article['title'], article.get('providerPublishTime'))
+    return headlines
+
+
+def _interpret(score, count):
+    if not count:
+        return 'Neutral'
+    return 'Bullish' if score > 0 else 'Bearish'
+
+
+def _result(ticker):
+    aggregate = _aggregate(ticker)
     return {
         'ticker': ticker,
-        'sentiment_score': avg_sentiment,
-        'interpretation': 'Bullish' if avg_sentiment > 0 else 'Bearish'
+        'sentiment_score': aggregate.mean,
+        'decayed_sentiment_score': aggregate.decayed_mean,
+        'article_count': aggregate.count,
+        'interpretation': _interpret(aggregate.mean, aggregate.count)
     }
+
+
+def _score(headlines):
+    # Cached scores first; the rest are scored and cached.
+    cache = get_headline_cache()
+    scores = cache.get_many(list(headlines))
+    unscored = {headline: score_headline(title) for headline, (title, _) in headlines.items() if headline not in scores}
+    telemetry.cache_result('headline', True, len(scores))
+    telemetry.cache_result('headline', False, len(unscored))
+    cache.set_many(unscored)
+    scores.update(unscored)
+    return scores
+
+
+def _update(ticker, headlines, scores):
+    # `headlines` is the ticker's whole current news; `scores` covers the new ones.
+    aggregate = _aggregate(ticker)
+    while True:
+        with _aggregates_lock:
+            aggregate.retain(headlines)
+            # A concurrent call may have evicted headlines this one found already counted.
+            missing = {headline: value for headline, value in headlines.items()
+                       if headline not in aggregate and headline not in scores}
+            if not missing:
+                for headline, (_, published) in headlines.items():
+                    if headline not in aggregate:
+                        aggregate.add(headline, scores[headline], published)
+                return
+        scores = dict(scores, **_score(missing))
+
+
+def analyze_news_sentiment(ticker):
+    ticker = ticker.upper()
+    headlines = _headlines(market_data.get_news(ticker))
+    aggregate = _aggregate(ticker)
+    with _aggregates_lock:
+        new = {headline: value for headline, value in headlines.items() if headline not in aggregate}
+    _update(ticker, headlines, _score(new) if new else {})
+
+    return _result(ticker)
+
+
+def analyze_news_sentiment_batch(tickers, processes=None, chunk_size=64):
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    market_data.prefetch(tickers, include_info=False, include_news=True)
+
+    news_by_ticker = {}
+    for ticker in tickers:
+        try:
+            news_by_ticker[ticker] = _headlines(market_data.get_news(ticker))
+        except Exception:
+            continue
+
+    pending = {}
+    for ticker, headlines in news_by_ticker.items():
+        aggregate = _aggregate(ticker)
+        for headline, (title, _) in headlines.items():
+            if headline not in aggregate:
+                pending.setdefault(headline, title)
+
+    cache = get_headline_cache()
+    scores = cache.get_many(list(pending))
+    unscored = [(headline, title) for headline, title in pending.items() if headline not in scores]
+    telemetry.cache_result('headline', True, len(scores))
+    telemetry.cache_result('headline', False, len(unscored))
+
+    if unscored:
+        chunks = [unscored[start:start + chunk_size] for start in range(0, len(unscored), chunk_size)]
+        if len(chunks) > 1 and processes != 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = executor.map(_score_titles, [[title for _, title in chunk] for chunk in chunks])
+                new_scores = {
+                    headline: polarity
+                    for chunk, polarities in zip(chunks, results)
+                    for (headline, _), polarity in zip(chunk, polarities)
+                }
+        else:
+            new_scores = {headline: score_headline(title) for headline, title in unscored}
+        cache.set_many(new_scores)
+        scores.update(new_scores)
+
+    for ticker, headlines in news_by_ticker.items():
+        _update(ticker, headlines, scores)
+    return {ticker: _result(ticker) for ticker in tickers}
@@ -0,0 +1,382 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import telemetry
+from config import CACHE_DIR
+
+NEWS_DB = os.path.join(CACHE_DIR, 'news.db')
+RETENTION_DAYS = 30
+PRUNE_INTERVAL = 60 * 60
+RECENT_HOURS = 24
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or over than that the their this to
+up was were will with after amid new says said vs
+""".split())
+TRACKING_PARAMS = frozenset("guccounter ncid fbclid gclid mc_cid mc_eid cmpid soc_src soc_trk yptr .tsrc".split())
+TRACKING_PREFIXES = ('utm_', 'guce_')
+NAME_SUFFIXES = frozenset("inc incorporated corp corporation co company ltd limited plc holdings group class sa nv ag".split())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_PATTERN.findall((text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def title_key(title):
+    return _digest(' '.join(_TOKEN_PATTERN.findall((title or '').lower())))
+
+
+def link_key(link):
+    if not link:
+        return None
+    # The same story is often linked with different tracking parameters;
+    # the rest of the query can identify the story, so it is kept.
+    parts = urlsplit(link.strip())
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES))
+    key = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return _digest(f"{key}?{urlencode(query)}" if query else key)
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    from datetime import datetime
+
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def normalize_article(article):
+    """Flatten a Yahoo news item, old or new (`content`) format, to the fields the store keeps."""
+    content = article.get('content') or {}
+    link = article.get('link') or (content.get('canonicalUrl') or {}).get('url') or \
+        (content.get('clickThroughUrl') or {}).get('url')
+    return {
+        'uuid': article.get('uuid') or article.get('id'),
+        'title': ' '.join((article.get('title') or content.get('title') or '').split()),
+        'publisher': article.get('publisher') or (content.get('provider') or {}).get('displayName'),
+        'link': link,
+        'published': _timestamp(article.get('providerPublishTime') or content.get('pubDate')),
+        'related': [symbol.upper() for symbol in article.get('relatedTickers') or []]
+    }
+
+
+def name_terms(name):
+    """Tokens of a company name without legal suffixes: 'Apple Inc.' -> ['apple']."""
+    return [token for token in tokenize(name) if token not in NAME_SUFFIXES]
+
+
+class NewsStore:
+    """Headlines for many tickers, stored once per story, with per-ticker time and token indexes."""
+
+    def __init__(self, path=None, retention_days=RETENTION_DAYS):
+        self.path = path or NEWS_DB
+        self.retention_days = retention_days
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_prune = None
+
+    @property
+    def connection(self):
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    title_key TEXT NOT NULL UNIQUE,
+                    link_key TEXT UNIQUE,
+                    uuid TEXT,
+                    title TEXT NOT NULL,
+                    publisher TEXT,
+                    link TEXT,
+                    published REAL NOT NULL,
+                    ingested_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published);
+                CREATE TABLE IF NOT EXISTS article_tickers (
+                    ticker TEXT NOT NULL,
+                    published REAL NOT NULL,
+                    article_id INTEGER NOT NULL,
+                    PRIMARY KEY (ticker, published, article_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_article_tickers_article ON article_tickers (article_id);
+                CREATE TABLE IF NOT EXISTS article_tokens (
+                    token TEXT NOT NULL,
+                    article_id INTEGER NOT NULL,
+                    PRIMARY KEY (token, article_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_article_tokens_article ON article_tokens (article_id);
+                CREATE TABLE IF NOT EXISTS fetches (
+                    ticker TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def ingest(self, news_by_ticker, fetched_at=None):
+        """Store each ticker's news in one transaction. Returns the number of new stories."""
+        fetched_at = fetched_at or time.time()
+        added = 0
+        with self._lock, self.connection as conn:
+            for ticker, articles in news_by_ticker.items():
+                ticker = ticker.upper()
+                for article in articles or ():
+                    article = normalize_article(article)
+                    if not article['title']:
+                        continue
+                    article_id, new = self._insert(conn, article, fetched_at)
+                    added += new
+                    tickers = {ticker, *article['related']}
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO article_tickers (ticker, published, article_id) "
+                        "SELECT ?, published, id FROM articles WHERE id = ?",
+                        [(symbol, article_id) for symbol in tickers]
+                    )
+                conn.execute("INSERT OR REPLACE INTO fetches (ticker, fetched_at) VALUES (?, ?)", (ticker, fetched_at))
+            # Long-running processes keep ingesting, so old articles are
+            # pruned again once an interval has passed, not just once.
+            if self._last_prune is None or fetched_at - self._last_prune >= PRUNE_INTERVAL:
+                self._prune(conn, fetched_at - self.retention_days * 86400)
+                self._last_prune = fetched_at
+        return added
+
+    def _insert(self, conn, article, fetched_at):
+        keys = (title_key(article['title']), link_key(article['link']))
+        # A story already stored under the same title or link is the same story.
+        row = conn.execute("SELECT id FROM articles WHERE title_key = ? OR link_key = ? LIMIT 1", keys).fetchone()
+        if row is not None:
+            return row[0], False
+        cursor = conn.execute(
+            "INSERT INTO articles (title_key, link_key, uuid, title, publisher, link, published, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            keys + (article['uuid'], article['title'], article['publisher'], article['link'],
+                    article['published'] or fetched_at, fetched_at)
+        )
+        article_id = cursor.lastrowid
+        conn.executemany("INSERT OR IGNORE INTO article_tokens (token, article_id) VALUES (?, ?)",
+                         [(token, article_id) for token in set(tokenize(article['title']))])
+        return article_id, True
+
+    def _prune(self, conn, before):
+        old = "SELECT id FROM articles WHERE published < ?"
+        conn.execute(f"DELETE FROM article_tickers WHERE article_id IN ({old})", (before,))
+        conn.execute(f"DELETE FROM article_tokens WHERE article_id IN ({old})", (before,))
+        conn.execute("DELETE FROM articles WHERE published < ?", (before,))
+
+    def fetched_at(self, tickers):
+        tickers = [ticker.upper() for ticker in tickers]
+        rows = []
+        for start in range(0, len(tickers), 500):
+            chunk = tickers[start:start + 500]
+            rows += self._execute(
+                f"SELECT ticker, fetched_at FROM fetches WHERE ticker IN ({','.join('?' * len(chunk))})", chunk
+            )
+        return dict(rows)
+
+    def stale(self, tickers, max_age):
+        fetched = self.fetched_at(tickers)
+        now = time.time()
+        return [ticker for ticker in tickers if now - fetched.get(ticker.upper(), 0) > max_age]
+
+    def query(self, tickers=None, text=None, mentions=(), since=None, until=None, limit=None):
+        """Headlines newest first.
+
+        `tickers` limits results to those tickers' news, and `text` to headlines
+        containing all of its words. `mentions` is a list of phrases; a headline
+        containing any of them is included even if it was filed under another ticker.
+        """
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("a.published >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("a.published < ?")
+            params.append(until)
+
+        scope, scope_params = [], []
+        if tickers:
+            tickers = sorted({ticker.upper() for ticker in tickers})
+            window = "".join(f" AND published {op} ?" for op, value in (('>=', since), ('<', until)) if value is not None)
+            scope.append(f"a.id IN (SELECT article_id FROM article_tickers WHERE ticker IN "
+                         f"({','.join('?' * len(tickers))}){window})")
+            scope_params += tickers + [value for value in (since, until) if value is not None]
+        for phrase in mentions:
+            tokens = sorted(set(tokenize(phrase) if isinstance(phrase, str) else phrase))
+            if tokens:
+                scope.append(self._all_tokens(tokens))
+                scope_params += tokens + [len(tokens)]
+        if scope:
+            clauses.append(f"({' OR '.join(scope)})")
+            params += scope_params
+
+        if text is not None:
+            tokens = sorted(set(tokenize(text)))
+            if not tokens:
+                return []
+            clauses.append(self._all_tokens(tokens))
+            params += tokens + [len(tokens)]
+
+        sql = (
+            "SELECT a.id, a.uuid, a.title, a.publisher, a.link, a.published, a.title_key, "
+            "(SELECT GROUP_CONCAT(ticker) FROM article_tickers WHERE article_id = a.id) "
+            "FROM articles a"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY a.published DESC, a.id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        return [
+            {
+                'key': key,
+                'uuid': uuid,
+                'title': title,
+                'publisher': publisher,
+                'link': link,
+                'providerPublishTime': int(published),
+                'relatedTickers': sorted(related.split(',')) if related else []
+            }
+            for _, uuid, title, publisher, link, published, key, related in self._execute(sql, params)
+        ]
+
+    @staticmethod
+    def _all_tokens(tokens):
+        return (f"a.id IN (SELECT article_id FROM article_tokens WHERE token IN ({','.join('?' * len(tokens))}) "
+                f"GROUP BY article_id HAVING COUNT(*) = ?)")
+
+    def headlines(self, tickers, since=None, limit=None):
+        return self.query(tickers=tickers, since=since, limit=limit)
+
+    def search(self, text, tickers=None, hours=RECENT_HOURS, limit=None):
+        since = time.time() - hours * 3600 if hours else None
+        return self.query(tickers=tickers, text=text, since=since, limit=limit)
+
+    def stats(self):
+        articles, links = self._execute("SELECT COUNT(*), COUNT(DISTINCT link_key) FROM articles")[0]
+        tickers, mappings = self._execute("SELECT COUNT(DISTINCT ticker), COUNT(*) FROM article_tickers")[0]
+        return {'articles': articles, 'links': links, 'tickers': tickers, 'ticker_articles': mappings}
+
+    def clear(self):
+        with self._lock, self.connection as conn:
+            for table in ('articles', 'article_tickers', 'article_tokens', 'fetches'):
+                conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_news_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = NewsStore()
+        return _store
+
+
+def related_news(ticker, hours=72, limit=20):
+    """A ticker's own headlines plus headlines filed under other tickers that mention it or its company.
+
+    The ticker itself only counts as a mention in upper case or as a $cashtag, so
+    tickers that are also words (NOW, ALL, ON) do not pull in unrelated headlines.
+    """
+    import market_data
+
+    ticker = ticker.upper()
+    market_data.get_news(ticker)
+    try:
+        terms = name_terms(market_data.get_info(ticker).get('shortName'))
+    except Exception:
+        terms = []
+    symbol = re.compile(rf"(?<![A-Za-z0-9])\$?{re.escape(ticker)}(?![A-Za-z0-9])")
+
+    def mentioned(article):
+        return ticker in article['relatedTickers'] or symbol.search(article['title']) or \
+            (terms and set(terms) <= set(tokenize(article['title'])))
+
+    mentions = [[ticker.lower()]] + ([terms] if terms else [])
+    articles = get_news_store().query(tickers=[ticker], mentions=mentions, since=time.time() - hours * 3600)
+    return [article for article in articles if mentioned(article)][:limit]
+
+
+def portfolio_news(tickers, text=None, hours=RECENT_HOURS, limit=50, refresh=True):
+    """Recent headlines for `tickers`, optionally only those mentioning `text`."""
+    import market_data
+
+    tickers = [ticker.upper() for ticker in tickers]
+    if refresh and tickers:
+        market_data.refresh_news(tickers)
+    since = time.time() - hours * 3600 if hours else None
+    return get_news_store().query(tickers=tickers, text=text, since=since, limit=limit)
+
+
+def main(argv=None):
+    from colorama import Fore, Style
+
+    parser = argparse.ArgumentParser(description="Search recent headlines across the portfolio.")
+    parser.add_argument('text', nargs='?', help="Only headlines containing all of these words")
+    parser.add_argument('-t', '--tickers', help="Comma-separated tickers (default: the saved portfolio)")
+    parser.add_argument('--hours', type=float, default=RECENT_HOURS, help="How far back to look (0 for all)")
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--offline', action='store_true', help="Only search stored news, without refreshing")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    if args.tickers:
+        tickers = [ticker for ticker in args.tickers.split(',') if ticker]
+    else:
+        from portfolio import get_portfolio
+        tickers = get_portfolio().symbols
+    started = time.perf_counter()
+    results = portfolio_news(tickers, args.text, args.hours, args.limit, refresh=not args.offline)
+    elapsed = time.perf_counter() - started
+
+    if not results:
+        print(f"{Fore.RED}No matching headlines.{Style.RESET_ALL}")
+    for article in results:
+        published = time.strftime('%m-%d %H:%M', time.localtime(article['providerPublishTime']))
+        related = ','.join(article['relatedTickers'])
+        print(f"{Fore.YELLOW}{published}{Style.RESET_ALL} {article['title']} "
+              f"{Fore.CYAN}[{related}]{Style.RESET_ALL} {article['publisher'] or ''}")
+    print(f"\n{Fore.YELLOW}{len(results)} headlines in {elapsed:.2f}s{Style.RESET_ALL}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import types
+import zlib
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+HISTORY_START = '2000-01-03'
+INTRADAY_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical', 'Industrials']
+HEADLINES = [
+    "{name} beats earnings expectations as revenue surges",
+    "{name} shares fall after weak guidance",
+    "Analysts upgrade {name} on strong demand",
+    "{name} faces regulatory scrutiny over new product",
+    "{name} announces record buyback program",
+    "{name} stock is flat ahead of the Fed decision",
+    "Investors worry about {name} margins",
+    "{name} expands into new markets with bold acquisition"
+]
+WIRE_HEADLINES = [
+    "Stocks rally as inflation cools more than expected",
+    "Markets slide on recession fears and weak jobs data",
+    "Fed holds rates steady, signals patience"
+]
+
+
+class _Object(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.upper().encode())
+
+
+class OfflineMarket:
+    def __init__(self, data_dir=None, latency=0.0, end=None):
+        self.data_dir = data_dir
+        self.latency = latency
+        self.end = pd.Timestamp(end).normalize() if end else pd.Timestamp.now().normalize()
+        self._daily = {}
+        self.calls = {'history': 0, 'info': 0, 'news': 0, 'download': 0, 'live_price': 0, 'chat': 0}
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _recorded(self, symbol, suffix):
+        if not self.data_dir:
+            return None
+        path = os.path.join(self.data_dir, f"{symbol}.{suffix}")
+        return path if os.path.exists(path) else None
+
+    def daily(self, symbol):
+        symbol = symbol.upper()
+        frame = self._daily.get(symbol)
+        if frame is not None:
+            return frame
+
+        path = self._recorded(symbol, 'csv')
+        if path:
+            frame = pd.read_csv(path, index_col=0)
+            frame.index = pd.to_datetime(frame.index, utc=True).tz_convert('America/New_York')
+        else:
+            rng = np.random.default_rng(_seed(symbol))
+            index = pd.bdate_range(HISTORY_START, self.end, tz='America/New_York')
+            drift, sigma = rng.uniform(-0.0002, 0.0008), rng.uniform(0.01, 0.03)
+            close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(drift, sigma, index.size)))
+            spread = np.abs(rng.normal(0, sigma, index.size)) * close
+            frame = pd.DataFrame({
+                'Open': close * (1 + rng.normal(0, sigma / 3, index.size)),
+                'High': close + spread,
+                'Low': np.maximum(close - spread, 0.01),
+                'Close': close,
+                'Volume': rng.integers(1_000_000, 50_000_000, index.size).astype(float),
+                'Dividends': 0.0,
+                'Stock Splits': 0.0
+            }, index=index)
+        self._daily[symbol] = frame
+        return frame
+
+    def intraday(self, symbol, start, end, interval):
+        minutes = INTRADAY_MINUTES[interval]
+        daily = self.daily(symbol)
+        days = daily[(daily.index >= start) & (daily.index < end)]
+        bars = []
+        rng = np.random.default_rng(_seed(symbol) + int(start.value // 10 ** 9))
+        steps = 390 // minutes
+        for day, row in days.iterrows():
+            index = pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=steps, freq=f"{minutes}min")
+            path = row['Open'] + np.cumsum(rng.normal(0, row['Close'] * 0.001, steps))
+            path += np.linspace(0, row['Close'] - path[-1], steps)
+            bars.append(pd.DataFrame({
+                'Open': path, 'High': path * 1.001, 'Low': path * 0.999, 'Close': path,
+                'Volume': rng.integers(10_000, 500_000, steps).astype(float),
+                'Dividends': 0.0, 'Stock Splits': 0.0
+            }, index=index))
+        return pd.concat(bars) if bars else daily.iloc[0:0]
+
+    def history(self, symbol, period=None, interval='1d', start=None, end=None, **kwargs):
+        self.calls['history'] += 1
+        self._sleep()
+        return self._history(symbol, period, interval, start, end)
+
+    def _history(self, symbol, period=None, interval='1d', start=None, end=None):
+        tz = 'America/New_York'
+        end = pd.Timestamp(end).tz_localize(tz) if end is not None else self.end.tz_localize(tz) + pd.Timedelta(days=1)
+        if start is not None:
+            start = pd.Timestamp(start).tz_localize(tz)
+        elif period in (None, 'max'):
+            start = pd.Timestamp(HISTORY_START, tz=tz)
+        elif period == 'ytd':
+            start = pd.Timestamp(year=end.year, month=1, day=1, tz=tz)
+        elif period.endswith('mo'):
+            start = end - pd.DateOffset(months=int(period[:-2]))
+        elif period.endswith('y'):
+            start = end - pd.DateOffset(years=int(period[:-1]))
+        else:
+            days = int(period[:-1])
+            daily = self.daily(symbol)
+            start = daily.index[daily.index < end][-days] if len(daily) >= days else daily.index[0]
+
+        if interval in INTRADAY_MINUTES:
+            return self.intraday(symbol, start, end, interval)
+        daily = self.daily(symbol)
+        return daily[(daily.index >= start) & (daily.index < end)].copy()
+
+    def info(self, symbol):
+        self.calls['info'] += 1
+        self._sleep()
+        path = self._recorded(symbol, 'info.json')
+        if path:
+            with open(path) as f:
+                return json.load(f)
+
+        rng = np.random.default_rng(_seed(symbol) + 1)
+        daily = self.daily(symbol)
+        year = daily['Close'].iloc[-252:]
+        price = float(daily['Close'].iloc[-1])
+        eps = price / rng.uniform(5, 60)
+        return {
+            'symbol': symbol,
+            'longName': f"{symbol} Holdings Inc.",
+            'sector': SECTORS[_seed(symbol) % len(SECTORS)],
+            'currentPrice': round(price, 2),
+            'fiftyTwoWeekHigh': round(float(year.max()), 2),
+            'fiftyTwoWeekLow': round(float(year.min()), 2),
+            'marketCap': int(price * rng.uniform(1e7, 1e10)),
+            'volume': int(daily['Volume'].iloc[-1]),
+            'averageVolume': int(daily['Volume'].iloc[-60:].mean()),
+            'trailingPE': round(price / eps, 2),
+            'trailingEps': round(eps, 2),
+            'dividendYield': round(float(rng.uniform(0, 0.04)), 4) if rng.random() > 0.3 else None
+        }
+
+    def news(self, symbol):
+        self.calls['news'] += 1
+        self._sleep()
+        path = self._recorded(symbol, 'news.json')
+        if path:
+            with open(path) as f:
+                return json.load(f)
+
+        rng = np.random.default_rng(_seed(symbol) + 2)
+        now = int(self.end.timestamp()) + 16 * 3600
+        articles = []
+        for i, template in enumerate(rng.permutation(HEADLINES)[:6]):
+            title = template.format(name=symbol)
+            articles.append({
+                'uuid': hashlib.sha1(f"{symbol}:{title}".encode()).hexdigest(),
+                'title': title,
+                'publisher': 'Offline Wire',
+                'link': f"https://example.com/{symbol.lower()}/{i}",
+                'providerPublishTime': now - int(rng.integers(600, 72 * 3600)),
+                'relatedTickers': [symbol]
+            })
+        for i, title in enumerate(WIRE_HEADLINES):
+            articles.append({
+                'uuid': hashlib.sha1(title.encode()).hexdigest(),
+                'title': title,
+                'publisher': 'Offline Wire',
+                'link': f"https://example.com/markets/{i}",
+                'providerPublishTime': now - (i + 1) * 3600,
+                'relatedTickers': []
+            })
+        return articles
+
+    def live_price(self, symbol):
+        self.calls['live_price'] += 1
+        self._sleep()
+        return float(self.daily(symbol)['Close'].iloc[-1])
+
+    def download(self, tickers, period=None, interval='1d', start=None, end=None, group_by='column', **kwargs):
+        self.calls['download'] += 1
+        self._sleep()
+        if isinstance(tickers, str):
+            tickers = tickers.replace(',', ' ').split()
+        frames = {symbol: self._history(symbol, period, interval, start, end) for symbol in tickers}
+        data = pd.concat(frames, axis=1)
+        if group_by != 'ticker':
+            data = data.swaplevel(axis=1).sort_index(axis=1)
+        return data
+
+
+def _chat_module(market, latency, responder=None, token_latency=0.0):
+    def create(model, messages, temperature=None, stream=False, **kwargs):
+        market.calls['chat'] += 1
+        prompt = messages[-1]['content']
+        # Prompt processing time grows with prompt size, roughly 4 chars a token.
+        delay = latency + token_latency * sum(len(message['content']) for message in messages) / 4
+        if delay:
+            time.sleep(delay)
+        if responder is not None:
+            content = responder(model, messages)
+        else:
+            digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+            content = (f"Offline analysis {digest}: Hold. Key metrics are in line with the sector, "
+                       f"risk is moderate and the stock is unlikely to move sharply in the short term.")
+        usage = _Object(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                        total_tokens=(len(prompt) + len(content)) // 4)
+        if stream:
+            words = content.split(' ')
+            return iter([
+                _Object(choices=[_Object(delta=_Object(content=word + (' ' if i < len(words) - 1 else '')),
+                                         finish_reason=None)])
+                for i, word in enumerate(words)
+            ])
+        return _Object(
+            choices=[_Object(message=_Object(role='assistant', content=content), finish_reason='stop')],
+            usage=usage
+        )
+
+    openai = types.ModuleType('openai')
+    openai.api_key = None
+    openai.ChatCompletion = types.SimpleNamespace(create=create)
+    openai.error = types.SimpleNamespace()
+    return openai
+
+
+def install(data_dir=None, latency=0.0, llm_latency=0.0, llm_responder=None, end=None, llm_token_latency=0.0):
+    market = OfflineMarket(data_dir=data_dir, latency=latency, end=end)
+
+    class Ticker:
+        def __init__(self, symbol, session=None):
+            self.ticker = symbol.upper()
+
+        def history(self, *args, **kwargs):
+            return market.history(self.ticker, *args, **kwargs)
+
+        @property
+        def info(self):
+            return market.info(self.ticker)
+
+        @property
+        def news(self):
+            return market.news(self.ticker)
+
+    yfinance = types.ModuleType('yfinance')
+    yfinance.Ticker = Ticker
+    yfinance.download = market.download
+
+    yahoo_fin = types.ModuleType('yahoo_fin')
+    stock_info = types.ModuleType('yahoo_fin.stock_info')
+    stock_info.get_live_price = market.live_price
+    yahoo_fin.stock_info = stock_info
+
+    sys.modules['yfinance'] = yfinance
+    sys.modules['yahoo_fin'] = yahoo_fin
+    sys.modules['yahoo_fin.stock_info'] = stock_info
+    sys.modules['openai'] = _chat_module(market, llm_latency, llm_responder, llm_token_latency)
+    return market
+
+
+def record(symbols, data_dir, period='max'):
+    import yfinance as yf
+
+    os.makedirs(data_dir, exist_ok=True)
+    for symbol in symbols:
+        symbol = symbol.upper()
+        ticker = yf.Ticker(symbol)
+        ticker.history(period=period).to_csv(os.path.join(data_dir, f"{symbol}.csv"))
+        with open(os.path.join(data_dir, f"{symbol}.info.json"), 'w') as f:
+            json.dump(ticker.info, f, default=str)
+        with open(os.path.join(data_dir, f"{symbol}.news.json"), 'w') as f:
+            json.dump(ticker.news, f, default=str)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record live Yahoo Finance data for offline replay.")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('-d', '--data-dir', default='market_data_recording')
+    parser.add_argument('--period', default='max')
+    args = parser.parse_args()
+    record(args.symbols, args.data_dir, args.period)
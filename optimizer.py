@@ -0,0 +1,399 @@
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+from cache import TTLCache
+from analysis import calculate_sector_diversity
+
+TRADING_DAYS = 252
+METHODS = ('min_variance', 'mean_variance', 'risk_parity')
+RISK_MODEL_TTL = 60 * 60
+
+_models = TTLCache(maxsize=32, ttl=RISK_MODEL_TTL)
+_models_lock = threading.Lock()
+
+
+def shrinkage_covariance(returns):
+    """Ledoit-Wolf covariance of daily returns shrunk towards a scaled identity.
+
+    Returns (covariance, shrinkage). Missing returns are treated as the
+    column mean so every asset can use the full aligned window.
+    """
+    returns = np.asarray(returns, dtype=float)
+    observations = returns.shape[0]
+    if observations < 2:
+        raise ValueError("Need at least two aligned return observations")
+    centred = np.nan_to_num(returns - np.nanmean(returns, axis=0))
+
+    sample = centred.T @ centred / observations
+    target = np.trace(sample) / sample.shape[0]
+    distance = np.sum(sample * sample) - 2 * target * np.trace(sample) + target * target * sample.shape[0]
+    # Sum over t of ||x_t x_t' - S||^2, expanded so it needs no N x N matrix per row.
+    norms = np.sum(centred * centred, axis=1)
+    spread = (np.sum(norms * norms) - observations * np.sum(sample * sample)) / observations ** 2
+    shrinkage = min(max(spread / distance, 0.0), 1.0) if distance > 0 else 1.0
+
+    covariance = (1 - shrinkage) * sample
+    covariance[np.diag_indices_from(covariance)] += shrinkage * target
+    return covariance, shrinkage
+
+
+class RiskModel:
+    """Annualized expected returns and shrinkage covariance for a set of symbols."""
+
+    def __init__(self, symbols, expected_returns, covariance, shrinkage=None, observations=None):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.expected_returns = np.asarray(expected_returns, dtype=float)
+        self.covariance = np.asarray(covariance, dtype=float)
+        self.shrinkage = shrinkage
+        self.observations = observations
+        self.built_at = time.time()
+        self._eigen = None
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_returns(cls, symbols, returns):
+        returns = np.asarray(returns, dtype=float)
+        covariance, shrinkage = shrinkage_covariance(returns)
+        expected = np.nan_to_num(np.nanmean(returns, axis=0)) * TRADING_DAYS
+        return cls(symbols, expected, covariance * TRADING_DAYS, shrinkage, returns.shape[0])
+
+    @classmethod
+    def from_prices(cls, symbols, prices):
+        from analysis import calculate_returns_matrix
+
+        return cls.from_returns(symbols, calculate_returns_matrix(prices))
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self._columns
+
+    @property
+    def eigen(self):
+        # Computed once per model and reused by every optimization over it.
+        if self._eigen is None:
+            values, vectors = np.linalg.eigh(self.covariance)
+            self._eigen = (np.maximum(values, 0.0), vectors)
+        return self._eigen
+
+    def subset(self, symbols):
+        columns = [self._columns[symbol.upper()] for symbol in symbols]
+        model = RiskModel([self.symbols[i] for i in columns], self.expected_returns[columns],
+                          self.covariance[np.ix_(columns, columns)], self.shrinkage, self.observations)
+        model.built_at = self.built_at
+        return model
+
+
+def get_risk_model(symbols, period='1y'):
+    import indicators
+
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    key = ('risk_model', period)
+    with _models_lock:
+        cached = _models.get(key)
+        if cached is not None and all(symbol in cached for symbol in symbols):
+            return cached if cached.symbols == symbols else cached.subset(symbols)
+
+    # Build for the union with whatever is cached so later what-if runs over
+    # either set are served by slicing instead of rebuilding.
+    wanted = list(dict.fromkeys(symbols + (cached.symbols if cached is not None else [])))
+    bars = indicators.load_bars(wanted, period=period)
+    missing = [symbol for symbol in wanted if symbol not in bars.symbols]
+    if any(symbol in missing for symbol in symbols):
+        raise ValueError(f"No price history available for {', '.join(s for s in symbols if s in missing)}")
+    model = RiskModel.from_prices(bars.symbols, bars.close)
+    with _models_lock:
+        _models.set(key, model)
+    return model if model.symbols == symbols else model.subset(symbols)
+
+
+def clear_cache():
+    _models.clear()
+
+
+def _sector_codes(sectors, max_sector=None, sector_caps=None):
+    names = list(dict.fromkeys(sectors))
+    codes = np.array([names.index(sector) for sector in sectors], dtype=int)
+    caps = np.full(len(names), np.inf)
+    if max_sector is not None:
+        caps[:] = max_sector / 100
+    for sector, cap in (sector_caps or {}).items():
+        if sector in names:
+            caps[names.index(sector)] = cap / 100
+    return codes, caps
+
+
+def _crossings(starts, ends, totals, targets, groups, count):
+    # Each item lowers its group's total with slope -1 between its start and
+    # end. Returns, per group, the point where the total falls to its target.
+    positions = np.concatenate([starts, ends])
+    steps = np.concatenate([np.ones(starts.size), -np.ones(ends.size)])
+    owners = np.concatenate([groups, groups])
+    order = np.lexsort((positions, owners))
+    positions, steps, owners = positions[order], steps[order], owners[order]
+
+    active = np.cumsum(steps)
+    gaps = np.diff(positions, append=positions[-1])
+    after = np.cumsum(active * gaps)
+    before = after - active * gaps
+    first = np.searchsorted(owners, np.arange(count))
+    offset = before[first][owners]
+    before, after = before - offset, after - offset
+
+    needed = (totals - targets)[owners]
+    reached = np.flatnonzero((after >= needed) & (active > 0))
+    groups_reached, index = np.unique(owners[reached], return_index=True)
+    crossings = positions[first].copy()
+    segment = reached[index]
+    crossings[groups_reached] = positions[segment] + (needed[segment] - before[segment]) / active[segment]
+    return np.where(totals - targets > 0, crossings, positions[first])
+
+
+def _project(values, upper, codes, caps):
+    # Euclidean projection onto {0 <= w <= upper, sector sums <= caps, sum w = 1}:
+    # w_i = clip(v_i - max(level, t_s), 0, upper_i), where t_s makes a capped
+    # sector sum to exactly its cap and level makes the weights sum to one.
+    count = caps.size
+    capacity = np.bincount(codes, upper, count)
+    floor = np.full(values.size, -np.inf)
+    binding = capacity > caps
+    if binding.any():
+        thresholds = _crossings(values - upper, values, capacity, caps, codes, count)
+        floor = np.where(binding, thresholds, -np.inf)[codes]
+
+    total = np.clip(values - floor, 0, upper).sum()
+    single = np.zeros(values.size, dtype=int)
+    level = _crossings(np.maximum(floor, values - upper), np.maximum(floor, values),
+                       np.array([total]), np.ones(1), single, 1)[0]
+    return np.clip(values - np.maximum(level, floor), 0, upper)
+
+
+def _minimize_quadratic(eigenvalues, eigenvectors, scale, linear, start, project, max_iter=5000, tol=1e-8):
+    # ADMM for 0.5 w'(scale * C)w - linear'w over the constraint set: a linear
+    # solve with the cached eigendecomposition of C, then a projection.
+    curvature = scale * eigenvalues
+    rho = max(float(np.mean(curvature)), 1e-12)
+    z = start
+    u = np.zeros_like(start)
+    for iteration in range(1, max_iter + 1):
+        rhs = rho * (z - u) + linear
+        w = eigenvectors @ ((eigenvectors.T @ rhs) / (curvature + rho))
+        previous = z
+        z = project(w + u)
+        u += w - z
+        primal = np.max(np.abs(w - z))
+        dual = rho * np.max(np.abs(z - previous))
+        if primal < tol and dual < tol:
+            break
+        # Keep the two residuals within a factor of ten of each other.
+        if primal > 10 * dual:
+            rho *= 2
+            u /= 2
+        elif dual > 10 * primal:
+            rho /= 2
+            u *= 2
+    return z, iteration
+
+
+def _risk_parity(covariance, budgets, max_iter=100, tol=1e-12):
+    # Newton's method on the convex risk-budgeting objective
+    # 0.5 y'Cy - sum(b_i log y_i); its minimizer has risk contributions
+    # proportional to the budgets once normalized.
+    y = budgets / np.sqrt(np.diag(covariance))
+    for iteration in range(1, max_iter + 1):
+        gradient = covariance @ y - budgets / y
+        hessian = covariance + np.diag(budgets / (y * y))
+        direction = np.linalg.solve(hessian, gradient)
+        step = 1.0
+        while np.any(y - step * direction <= 0):
+            step /= 2
+        y = y - step * direction
+        if np.max(np.abs(step * direction) / y) < tol:
+            break
+    return y / y.sum(), iteration
+
+
+def optimize(model, method='min_variance', sectors=None, max_weight=100.0, max_sector=None, sector_caps=None,
+             risk_aversion=3.0, expected_returns=None, risk_budgets=None):
+    """Target weights for the model's symbols.
+
+    Weights, caps and budgets are percentages, like calculate_sector_diversity.
+    Risk parity is solved without constraints and then projected onto them.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(METHODS)}")
+    count = len(model.symbols)
+    if not count:
+        raise ValueError("Nothing to optimize")
+    sectors = list(sectors) if sectors is not None else ['Unknown'] * count
+    codes, caps = _sector_codes(sectors, max_sector, sector_caps)
+    upper = np.full(count, max_weight / 100)
+    if np.minimum(np.bincount(codes, upper, caps.size), caps).sum() < 1 - 1e-9:
+        raise ValueError("Weight and sector caps leave less than 100% to allocate")
+
+    def project(values):
+        return _project(values, upper, codes, caps)
+
+    mu = model.expected_returns.copy()
+    if expected_returns:
+        for symbol, value in expected_returns.items():
+            if symbol.upper() in model:
+                mu[model.symbols.index(symbol.upper())] = value / 100
+
+    start = project(np.full(count, 1 / count))
+    covariance = model.covariance
+    if method == 'risk_parity':
+        budgets = np.ones(count)
+        if risk_budgets is not None:
+            risk_budgets = {symbol.upper(): value for symbol, value in risk_budgets.items()}
+            budgets = np.asarray([risk_budgets.get(symbol, 0.0) for symbol in model.symbols], dtype=float)
+        if np.any(~np.isfinite(budgets)) or np.any(budgets < 0) or not budgets.sum() > 0:
+            raise ValueError("Risk budgets must be non-negative and not all zero")
+        # Symbols without a budget get no weight; the log barrier needs b_i > 0.
+        funded = budgets > 0
+        weights = np.zeros(count)
+        weights[funded], iterations = _risk_parity(covariance[np.ix_(funded, funded)],
+                                                   budgets[funded] / budgets[funded].sum())
+        weights = project(weights)
+    elif method == 'mean_variance':
+        weights, iterations = _minimize_quadratic(*model.eigen, risk_aversion, mu, start, project)
+    else:
+        weights, iterations = _minimize_quadratic(*model.eigen, 1.0, np.zeros(count), start, project)
+
+    weights[weights < 1e-10] = 0.0
+    weights /= weights.sum()
+    variance = float(weights @ covariance @ weights)
+    contributions = weights * (covariance @ weights) / variance if variance > 0 else np.zeros(count)
+    volatility = np.sqrt(variance) * 100
+    expected = float(mu @ weights) * 100
+
+    return {
+        'method': method,
+        'weights': pd.Series(weights * 100, index=pd.Index(model.symbols, name='symbol')),
+        'risk_contributions': pd.Series(contributions * 100, index=pd.Index(model.symbols, name='symbol')),
+        'sector_weights': calculate_sector_diversity(pd.DataFrame({'sector': sectors, 'current_value': weights})),
+        'expected_return': expected,
+        'volatility': volatility,
+        'sharpe_ratio': (expected - 2.0) / volatility if volatility else float('nan'),
+        'iterations': iterations
+    }
+
+
+def rebalance(symbols, current_values, target_weights, prices, band=0.5, min_trade=0.0):
+    """Trades that move current holdings to the target weights.
+
+    Positions whose weight is within `band` percentage points of the target
+    are left alone, and buys or sells are scaled so the trades net to zero
+    cash. Each symbol is traded at most once.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    current = np.nan_to_num(np.asarray(current_values, dtype=float))
+    target = np.asarray(target_weights, dtype=float) / 100
+    prices = np.asarray(prices, dtype=float)
+    total = current.sum()
+    if total <= 0:
+        raise ValueError("Portfolio has no value to rebalance")
+
+    trades = target * total - current
+    drift = np.abs(current / total - target) * 100
+    trades[(drift < band) | (np.abs(trades) < max(min_trade, 1e-9))] = 0.0
+    buys, sells = trades[trades > 0].sum(), -trades[trades < 0].sum()
+    if buys > sells:
+        trades[trades > 0] *= sells / buys
+    elif sells > buys:
+        trades[trades < 0] *= buys / sells
+
+    rows = np.flatnonzero(trades)
+    frame = pd.DataFrame({
+        'symbol': [symbols[i] for i in rows],
+        'action': np.where(trades[rows] > 0, 'BUY', 'SELL'),
+        'value': np.abs(trades[rows]),
+        'shares': np.abs(trades[rows]) / prices[rows],
+        'current_weight': current[rows] / total * 100,
+        'target_weight': target[rows] * 100
+    })
+    return frame.sort_values('value', ascending=False, ignore_index=True)
+
+
+def plan(store, method='min_variance', add=(), period='1y', band=0.5, **kwargs):
+    """Optimize a portfolio store (plus any candidate symbols) and list the trades."""
+    import market_data
+    from portfolio import latest_prices
+
+    held = store.symbols
+    candidates = [symbol.upper() for symbol in add if symbol.upper() not in held]
+    symbols = held + candidates
+    sectors = store.sectors
+    for symbol in candidates:
+        try:
+            sectors.append(market_data.get_info(symbol).get('sector') or 'Unknown')
+        except Exception:
+            sectors.append('Unknown')
+
+    model = get_risk_model(symbols, period)
+    result = optimize(model, method, sectors, **kwargs)
+    current = np.concatenate([np.nan_to_num(store.column('current_value')), np.zeros(len(candidates))])
+    result['trades'] = rebalance(symbols, current, result['weights'].to_numpy(), latest_prices(symbols), band)
+    result['current_sector_weights'] = calculate_sector_diversity(store)
+    return result
+
+
+def main(argv=None):
+    from colorama import Fore, Style
+
+    parser = argparse.ArgumentParser(description="Optimize the saved portfolio and plan rebalancing trades.")
+    parser.add_argument('--method', choices=METHODS, default='min_variance')
+    parser.add_argument('--period', default='1y', help="History used for the covariance matrix")
+    parser.add_argument('--max-weight', type=float, default=100.0, help="Largest weight per position (%%)")
+    parser.add_argument('--max-sector', type=float, help="Largest weight per sector (%%)")
+    parser.add_argument('--sector-cap', nargs='*', default=[], metavar='SECTOR=PCT')
+    parser.add_argument('--risk-aversion', type=float, default=3.0)
+    parser.add_argument('--band', type=float, default=0.5, help="Skip trades for positions within this many points of target")
+    parser.add_argument('--add', nargs='*', default=[], help="Candidate tickers to consider buying")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    from portfolio import get_portfolio
+
+    portfolio = get_portfolio()
+    if portfolio.empty and not args.add:
+        print(f"{Fore.RED}Portfolio is empty. Please add positions first.{Style.RESET_ALL}")
+        return 1
+    sector_caps = {}
+    for item in args.sector_cap:
+        sector, _, cap = item.rpartition('=')
+        sector_caps[sector] = float(cap)
+
+    started = time.perf_counter()
+    result = plan(portfolio, args.method, args.add, args.period, args.band, max_weight=args.max_weight,
+                  max_sector=args.max_sector, sector_caps=sector_caps, risk_aversion=args.risk_aversion)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{Fore.CYAN}Target Portfolio ({args.method.replace('_', ' ')}):{Style.RESET_ALL}")
+    print("=" * 50)
+    targets = pd.DataFrame({'weight': result['weights'], 'risk_contribution': result['risk_contributions']})
+    print(targets[targets['weight'] > 0].sort_values('weight', ascending=False).round(2))
+    print(f"\n{Fore.YELLOW}Sector Weights (current -> target):{Style.RESET_ALL}")
+    sectors = pd.DataFrame({'current': result['current_sector_weights'], 'target': result['sector_weights']})
+    print(sectors.fillna(0).round(2))
+    print(f"\n{Fore.YELLOW}Expected Return: {result['expected_return']:.2f}% | "
+          f"Volatility: {result['volatility']:.2f}% | Sharpe Ratio: {result['sharpe_ratio']:.2f}{Style.RESET_ALL}")
+
+    print(f"\n{Fore.CYAN}Rebalancing Trades:{Style.RESET_ALL}")
+    if result['trades'].empty:
+        print(f"{Fore.GREEN}Portfolio is already within {args.band}% of target.{Style.RESET_ALL}")
+    for trade in result['trades'].itertuples():
+        color = Fore.GREEN if trade.action == 'BUY' else Fore.RED
+        print(f"{color}{trade.action} {trade.shares:.4f} {trade.symbol} (${trade.value:,.2f}){Style.RESET_ALL} "
+              f"{trade.current_weight:.1f}% -> {trade.target_weight:.1f}%")
+    print(f"\n{Fore.YELLOW}Planned in {elapsed:.2f}s{Style.RESET_ALL}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+import os
+import time
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from config import PORTFOLIO_DB
+from analysis import (
+    calculate_returns_matrix,
+    calculate_volatilities,
+    calculate_sharpe_ratios,
+    calculate_portfolio_returns,
+    calculate_volatility,
+    calculate_sharpe_ratio
+)
+
+COLUMNS = ['symbol', 'initial_investment', 'current_value', 'sector', 'shares']
+NUMERIC_COLUMNS = ['initial_investment', 'current_value', 'shares']
+
+
+class PortfolioStore:
+    def __init__(self, capacity=64):
+        self._index = {}
+        self._symbols = []
+        self._sectors = []
+        self._columns = {name: np.full(capacity, np.nan) for name in NUMERIC_COLUMNS}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self._index
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    @property
+    def symbols(self):
+        return list(self._symbols)
+
+    @property
+    def sectors(self):
+        return list(self._sectors)
+
+    def column(self, name):
+        return self._columns[name][:self._size]
+
+    def _grow(self):
+        for name, values in self._columns.items():
+            grown = np.full(len(values) * 2, np.nan)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+
+    def get(self, symbol):
+        row = self._index.get(symbol.upper())
+        if row is None:
+            return None
+        position = {'symbol': self._symbols[row], 'sector': self._sectors[row]}
+        position.update({name: float(self._columns[name][row]) for name in NUMERIC_COLUMNS})
+        return position
+
+    def upsert(self, symbol, initial_investment=None, current_value=None, sector=None, shares=None):
+        symbol = symbol.upper()
+        row = self._index.get(symbol)
+        if row is None:
+            if self._size == len(self._columns['current_value']):
+                self._grow()
+            row = self._size
+            self._index[symbol] = row
+            self._symbols.append(symbol)
+            self._sectors.append(sector or 'Unknown')
+            for values in self._columns.values():
+                values[row] = np.nan
+            self._size += 1
+        elif sector is not None:
+            self._sectors[row] = sector
+
+        for name, value in (('initial_investment', initial_investment),
+                            ('current_value', current_value),
+                            ('shares', shares)):
+            if value is not None:
+                self._columns[name][row] = value
+        return row
+
+    def add_position(self, symbol, initial_investment, current_value, sector=None, shares=None):
+        existing = self.get(symbol)
+        if existing is not None:
+            initial_investment += existing['initial_investment']
+            current_value += existing['current_value']
+            if shares is not None and not np.isnan(existing['shares']):
+                shares += existing['shares']
+        return self.upsert(symbol, initial_investment, current_value, sector, shares)
+
+    def update_value(self, symbol, current_value):
+        row = self._index.get(symbol.upper())
+        if row is None:
+            raise KeyError(symbol)
+        self._columns['current_value'][row] = current_value
+
+    def remove(self, symbol):
+        symbol = symbol.upper()
+        row = self._index.pop(symbol, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            moved = self._symbols[last]
+            self._symbols[row] = moved
+            self._sectors[row] = self._sectors[last]
+            for values in self._columns.values():
+                values[row] = values[last]
+            self._index[moved] = row
+        self._symbols.pop()
+        self._sectors.pop()
+        self._size = last
+        return True
+
+    def set_current_values(self, values):
+        self._columns['current_value'][:self._size] = values
+
+    def to_frame(self):
+        frame = pd.DataFrame({
+            'symbol': self._symbols,
+            'initial_investment': self.column('initial_investment').copy(),
+            'current_value': self.column('current_value').copy(),
+            'sector': self._sectors,
+            'shares': self.column('shares').copy()
+        }, columns=COLUMNS)
+        return frame
+
+    def totals(self):
+        return (float(np.nansum(self.column('initial_investment'))),
+                float(np.nansum(self.column('current_value'))))
+
+    def profit_loss(self):
+        return pd.Series(
+            self.column('current_value') - self.column('initial_investment'),
+            index=pd.Index(self.symbols, name='symbol')
+        ).sort_index()
+
+    def sector_totals(self):
+        return pd.Series(self.column('current_value'), index=self.sectors).groupby(level=0).sum()
+
+
+def _nullable(value):
+    # NaN (no value entered) is stored as NULL rather than as $0.
+    return None if value is None or np.isnan(value) else float(value)
+
+
+class SQLitePortfolioStore(PortfolioStore):
+    def __init__(self, path=None, capacity=64):
+        super().__init__(capacity)
+        self.path = path or PORTFOLIO_DB
+        self._conn = None
+        self._loaded = False
+        self._db_lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS positions (
+                    symbol TEXT PRIMARY KEY,
+                    initial_investment REAL,
+                    current_value REAL,
+                    sector TEXT NOT NULL,
+                    shares REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._allow_null_values(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_positions_sector ON positions (sector)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _allow_null_values(conn):
+        # Older databases declared the values NOT NULL and stored a missing
+        # value as 0; NaN is now stored as NULL, so the table is rebuilt.
+        required = {name for _, name, _, notnull, _, _ in conn.execute("PRAGMA table_info(positions)") if notnull}
+        if not required & {'initial_investment', 'current_value'}:
+            return
+        with conn:
+            conn.execute("ALTER TABLE positions RENAME TO positions_old")
+            conn.execute("""
+                CREATE TABLE positions (
+                    symbol TEXT PRIMARY KEY,
+                    initial_investment REAL,
+                    current_value REAL,
+                    sector TEXT NOT NULL,
+                    shares REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("INSERT INTO positions SELECT symbol, initial_investment, current_value, sector, shares, "
+                         "updated_at FROM positions_old ORDER BY rowid")
+            conn.execute("DROP TABLE positions_old")
+
+    def _execute(self, query, params=()):
+        with self._db_lock, self.connection:
+            return self.connection.execute(query, params).fetchall()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        rows = self._execute(
+            "SELECT symbol, initial_investment, current_value, sector, shares FROM positions ORDER BY rowid"
+        )
+        for symbol, initial_investment, current_value, sector, shares in rows:
+            PortfolioStore.upsert(self, symbol, initial_investment, current_value, sector, shares)
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def __contains__(self, symbol):
+        self._load()
+        return super().__contains__(symbol)
+
+    @property
+    def empty(self):
+        self._load()
+        return super().empty
+
+    @property
+    def symbols(self):
+        self._load()
+        return super().symbols
+
+    @property
+    def sectors(self):
+        self._load()
+        return super().sectors
+
+    def column(self, name):
+        self._load()
+        return super().column(name)
+
+    def get(self, symbol):
+        self._load()
+        return super().get(symbol)
+
+    def to_frame(self):
+        self._load()
+        return super().to_frame()
+
+    def upsert(self, symbol, initial_investment=None, current_value=None, sector=None, shares=None):
+        self._load()
+        row = super().upsert(symbol, initial_investment, current_value, sector, shares)
+        position = super().get(symbol)
+        self._execute(
+            """
+            INSERT INTO positions (symbol, initial_investment, current_value, sector, shares, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (symbol) DO UPDATE SET
+                initial_investment = excluded.initial_investment,
+                current_value = excluded.current_value,
+                sector = excluded.sector,
+                shares = excluded.shares,
+                updated_at = excluded.updated_at
+            """,
+            (position['symbol'], _nullable(position['initial_investment']), _nullable(position['current_value']),
+             position['sector'], _nullable(position['shares']), time.time())
+        )
+        return row
+
+    def update_value(self, symbol, current_value):
+        self._load()
+        super().update_value(symbol, current_value)
+        self._execute(
+            "UPDATE positions SET current_value = ?, updated_at = ? WHERE symbol = ?",
+            (_nullable(current_value), time.time(), symbol.upper())
+        )
+
+    def remove(self, symbol):
+        self._load()
+        removed = super().remove(symbol)
+        if removed:
+            self._execute("DELETE FROM positions WHERE symbol = ?", (symbol.upper(),))
+        return removed
+
+    def set_current_values(self, values):
+        self._load()
+        super().set_current_values(values)
+        now = time.time()
+        with self._db_lock, self.connection:
+            self.connection.executemany(
+                "UPDATE positions SET current_value = ?, updated_at = ? WHERE symbol = ?",
+                [(_nullable(value), now, symbol) for symbol, value in zip(self._symbols, self.column('current_value'))]
+            )
+
+    def totals(self):
+        initial_investment, current_value = self._execute(
+            "SELECT TOTAL(initial_investment), TOTAL(current_value) FROM positions"
+        )[0]
+        return initial_investment, current_value
+
+    def profit_loss(self):
+        rows = self._execute(
+            "SELECT symbol, current_value - initial_investment FROM positions ORDER BY symbol"
+        )
+        return pd.Series(dict(rows), dtype=float).rename_axis('symbol')
+
+    def sector_totals(self):
+        rows = self._execute(
+            "SELECT sector, TOTAL(current_value) FROM positions GROUP BY sector ORDER BY sector"
+        )
+        return pd.Series(dict(rows), dtype=float)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_portfolio = None
+
+
+def get_portfolio():
+    global _portfolio
+    if _portfolio is None:
+        _portfolio = SQLitePortfolioStore()
+    return _portfolio
+
+
+def latest_prices(symbols, period='5d'):
+    closes = market_data.get_close_matrix(symbols, period=period)
+    if closes.empty:
+        return np.full(len(symbols), np.nan)
+    return closes.ffill().iloc[-1].reindex([symbol.upper() for symbol in symbols]).to_numpy(dtype=float)
+
+
+def mark_to_market(store, prices=None):
+    """Set the current value of every position entered with a share count to
+    shares * latest price, and return the symbols that were repriced."""
+    if store.empty:
+        return []
+    if prices is None:
+        prices = latest_prices(store.symbols)
+    prices = np.asarray(prices, dtype=float)
+
+    shares = store.column('shares')
+    current = store.column('current_value')
+    priced = ~(np.isnan(shares) | np.isnan(prices))
+    store.set_current_values(np.where(priced, shares * prices, current))
+    return [symbol for symbol, repriced in zip(store.symbols, priced) if repriced]
+
+
+def portfolio_metrics(store, period='1y', closes=None):
+    symbols = store.symbols
+    if closes is None:
+        closes = market_data.get_close_matrix(symbols, period=period)
+    closes = closes.reindex(columns=symbols)
+
+    returns = calculate_returns_matrix(closes.to_numpy(dtype=float))
+    weights = np.nan_to_num(store.column('current_value'))
+
+    holdings = pd.DataFrame({
+        'symbol': symbols,
+        'weight': weights / weights.sum() * 100 if weights.sum() else np.zeros(len(symbols)),
+        'volatility': calculate_volatilities(returns),
+        'sharpe_ratio': calculate_sharpe_ratios(returns)
+    })
+
+    portfolio_returns = pd.Series(calculate_portfolio_returns(returns, weights)) if weights.sum() else pd.Series(dtype=float)
+    totals = {
+        'volatility': calculate_volatility(portfolio_returns),
+        'sharpe_ratio': calculate_sharpe_ratio(portfolio_returns),
+        # Holdings missing some returns are left out of those days' portfolio return.
+        'partial_history': [symbol for symbol, gaps in zip(symbols, np.isnan(returns).any(axis=0)) if gaps]
+    }
+    return holdings, totals
@@ -0,0 +1,254 @@
+import re
+import math
+import time
+from functools import lru_cache
+
+DEFAULT_BUDGETS = {'financial': 100, 'volatility': 45, 'technical': 65, 'price': 70, 'sentiment': 80}
+SECTION_ORDER = ['financial', 'volatility', 'technical', 'price', 'sentiment']
+TECHNICAL_SPECS = ('sma20', 'sma50', 'sma200', 'rsi14', 'macd', 'atr14', 'bb20', 'vwap20', 'obv')
+HEADLINE_CHARS = 90
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text, model='gpt-4'):
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Without tiktoken, approximate BPE: words, digit groups of up to three
+    # and each punctuation mark count as one token.
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def format_number(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = float(value)
+    if not math.isfinite(value):
+        return None
+    magnitude = abs(value)
+    for limit, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M')):
+        if magnitude >= limit:
+            return f"{value / limit:.3g}{suffix}"
+    if magnitude >= 1000:
+        return f"{value:.0f}"
+    return f"{value:.4g}"
+
+
+def format_price(value):
+    # Prices keep their cents; significant-digit rounding would turn
+    # 187.45 into 187.
+    if value is None or isinstance(value, str):
+        return value
+    value = float(value)
+    return f"{value:.2f}" if math.isfinite(value) else None
+
+
+def _percent(value):
+    return None if value is None else value * 100
+
+
+def fit(name, items, budget, model='gpt-4', separator='; '):
+    # Items are in priority order; the lowest priority ones are dropped
+    # until the section fits its token budget.
+    items = [item for item in items if item]
+    while items:
+        text = f"{name.upper()}: {separator.join(items)}"
+        if budget is None or count_tokens(text, model) <= budget:
+            return text
+        items.pop()
+    return ''
+
+
+def fields(pairs):
+    items = []
+    for key, value in pairs:
+        value = format_number(value)
+        if value not in (None, '', 'N/A'):
+            items.append(f"{key}={value}")
+    return items
+
+
+def financial_section(info, closes=None, budget=DEFAULT_BUDGETS['financial'], model='gpt-4'):
+    price = info.get('currentPrice') or info.get('regularMarketPrice')
+    high, low = info.get('fiftyTwoWeekHigh'), info.get('fiftyTwoWeekLow')
+    month_return = None
+    if closes is not None and len(closes) > 1 and closes[0]:
+        month_return = (closes[-1] / closes[0] - 1) * 100
+
+    pairs = [
+        ('name', info.get('longName')),
+        ('sector', info.get('sector')),
+        ('industry', info.get('industry')),
+        ('price', format_price(price)),
+        ('mcap', info.get('marketCap')),
+        ('pe', info.get('trailingPE')),
+        ('fwd_pe', info.get('forwardPE')),
+        ('eps', info.get('trailingEps')),
+        ('ret_1mo%', month_return),
+        ('52w_high', format_price(high)),
+        ('52w_low', format_price(low)),
+        ('from_52w_high%', (price / high - 1) * 100 if price and high else None),
+        ('div_yield%', _percent(info.get('dividendYield'))),
+        ('volume', info.get('volume')),
+        ('avg_volume', info.get('averageVolume')),
+        ('beta', info.get('beta'))
+    ]
+    return fit('financial', fields(pairs), budget, model)
+
+
+def volatility_section(metrics, budget=DEFAULT_BUDGETS['volatility'], model='gpt-4'):
+    if not metrics:
+        return ''
+    pairs = [
+        ('ann_vol%', metrics.get('volatility')),
+        ('daily_vol%', _percent(metrics.get('daily_volatility'))),
+        ('var95%', _percent(metrics.get('var_95'))),
+        ('cvar95%', _percent(metrics.get('cvar_95'))),
+        ('max_dd%', _percent(metrics.get('max_drawdown'))),
+        ('beta_spy', metrics.get('beta')),
+        ('days', metrics.get('observations'))
+    ]
+    return fit('volatility', fields(pairs), budget, model)
+
+
+def technical_section(history, budget=DEFAULT_BUDGETS['technical'], model='gpt-4'):
+    import numpy as np
+    import indicators
+
+    if history is None or len(history) < 2:
+        return ''
+    bars = indicators.Bars.from_frames({'symbol': history})
+    results = indicators.compute(bars, TECHNICAL_SPECS)
+    values = indicators.latest(results)
+    close = bars.close[-1, 0]
+
+    def gap(name):
+        return (close / values[name] - 1) * 100 if values[name] else None
+
+    band = values['bb20_upper'] - values['bb20_lower']
+    volume = np.nan_to_num(bars.volume[-20:, 0]).sum()
+    obv = results['obv'][:, 0]
+    pairs = [
+        ('rsi14', values['rsi14']),
+        ('macd_hist', values['macd_hist']),
+        ('vs_sma50%', gap('sma50')),
+        ('vs_sma200%', gap('sma200')),
+        ('vs_sma20%', gap('sma20')),
+        ('bb20_pos', (close - values['bb20_lower']) / band if band else None),
+        ('atr14%', values['atr14'] / close * 100 if close else None),
+        ('vs_vwap20%', gap('vwap20')),
+        ('obv_flow20%', (obv[-1] - obv[-21]) / volume * 100 if obv.size > 20 and volume else None)
+    ]
+    return fit('technical', fields(pairs), budget, model)
+
+
+def price_section(closes, label='closes', points=16, budget=DEFAULT_BUDGETS['price'], model='gpt-4'):
+    import numpy as np
+    from charts import lttb_indices
+
+    closes = np.asarray(closes, dtype=float)
+    closes = closes[np.isfinite(closes)]
+    if closes.size == 0:
+        return ''
+    summary = fields([
+        ('last', format_price(closes[-1])),
+        ('chg%', (closes[-1] / closes[0] - 1) * 100 if closes[0] else None),
+        ('high', format_price(closes.max())),
+        ('low', format_price(closes.min()))
+    ])
+    # Shrink the sampled series before giving up on it entirely.
+    while points >= 3:
+        sampled = closes[lttb_indices(closes, points)]
+        series = f"{label}=" + ",".join(format_price(value) for value in sampled)
+        text = fit('price', summary + [series], None, model)
+        if count_tokens(text, model) <= budget:
+            return text
+        points //= 2
+    return fit('price', summary, budget, model)
+
+
+def sentiment_section(news=(), sentiment=None, budget=DEFAULT_BUDGETS['sentiment'], model='gpt-4'):
+    items = []
+    if sentiment:
+        items.append('; '.join(fields([
+            ('mood', sentiment.get('interpretation')),
+            ('score', sentiment.get('sentiment_score')),
+            ('decayed', sentiment.get('decayed_sentiment_score')),
+            ('articles', sentiment.get('article_count'))
+        ])))
+
+    seen = set()
+    articles = sorted(news, key=lambda article: (-(article.get('providerPublishTime') or 0), article.get('title') or ''))
+    for article in articles:
+        title = ' '.join((article.get('title') or '').split())
+        if not title or title.lower() in seen:
+            continue
+        seen.add(title.lower())
+        if len(title) > HEADLINE_CHARS:
+            title = title[:HEADLINE_CHARS - 3].rstrip() + '...'
+        published = article.get('providerPublishTime')
+        date = time.strftime('%m-%d', time.gmtime(published)) if published else None
+        items.append(f'{date} "{title}"' if date else f'"{title}"')
+    return fit('news', items, budget, model, separator=' | ') if items else ''
+
+
+def build_prompt(header, sections, instructions):
+    body = [sections[name] for name in SECTION_ORDER if sections.get(name)]
+    body += [text for name, text in sections.items() if name not in SECTION_ORDER and text]
+    return "\n".join([header] + body + ["", instructions.strip()])
+
+
+def stock_sections(ticker, include_sentiment=False, budgets=None, model='gpt-4'):
+    import market_data
+    from concurrent.futures import ThreadPoolExecutor
+    from news_store import related_news
+    from risk_engine import get_risk_engine
+
+    def risk_metrics():
+        try:
+            return get_risk_engine().metrics(ticker, window=252)
+        except ValueError:
+            return None
+
+    def technicals():
+        return technical_section(market_data.get_history(ticker, period='1y'), budgets['technical'], model)
+
+    def sentiment():
+        from market_sentiment import analyze_news_sentiment
+        return analyze_news_sentiment(ticker) if include_sentiment else None
+
+    budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        info = executor.submit(market_data.get_info, ticker)
+        history = executor.submit(market_data.get_history, ticker, period='1mo')
+        metrics = executor.submit(risk_metrics)
+        news = executor.submit(related_news, ticker)
+        technical = executor.submit(technicals)
+        scores = executor.submit(sentiment)
+
+        history = history.result()
+        closes = history['Close'].to_numpy(dtype=float) if history is not None and not history.empty else None
+        return {
+            'financial': financial_section(info.result(), closes, budgets['financial'], model),
+            'volatility': volatility_section(metrics.result(), budgets['volatility'], model),
+            'technical': technical.result(),
+            'price': price_section(closes, 'closes_1mo', budget=budgets['price'], model=model) if closes is not None else '',
+            'sentiment': sentiment_section(news.result(), scores.result(), budgets['sentiment'], model)
+        }
+
+
+def prompt_stats(prompt, model='gpt-4'):
+    return {'chars': len(prompt), 'tokens': count_tokens(prompt, model)}
@@ -0,0 +1,290 @@
+import math
+import bisect
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import market_data
+
+DEFAULT_WINDOWS = (20, 60, 252)
+DEFAULT_BENCHMARK = 'SPY'
+
+
+class RollingMoments:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.sorted_values = []
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._evicted = None
+
+    def _add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        bisect.insort(self.sorted_values, value)
+
+    def _remove(self, value):
+        # Welford update reversed.
+        self.count -= 1
+        del self.sorted_values[bisect.bisect_left(self.sorted_values, value)]
+        if not self.count:
+            self.mean = self._m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self._m2 = max(0.0, self._m2 - delta * (value - self.mean))
+
+    def push(self, value):
+        """Add a return, dropping the oldest once the window is full.
+
+        Mean and variance update in O(1). The sorted copy behind the VaR
+        quantile is a list, so the insort and delete are O(window) per push.
+        """
+        self.values.append(value)
+        self._add(value)
+        self._evicted = None
+        if self.count > self.window:
+            self._evicted = self.values.popleft()
+            self._remove(self._evicted)
+
+    def pop(self):
+        """Undo the last push, restoring the value it pushed out of the window."""
+        self._remove(self.values.pop())
+        if self._evicted is not None:
+            self.values.appendleft(self._evicted)
+            self._add(self._evicted)
+            self._evicted = None
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else float('nan')
+
+    def value_at_risk(self, confidence=0.95):
+        if not self.count:
+            return float('nan')
+        cut = max(1, int(math.floor((1 - confidence) * self.count)))
+        return -self.sorted_values[cut - 1]
+
+    def conditional_value_at_risk(self, confidence=0.95):
+        if not self.count:
+            return float('nan')
+        cut = max(1, int(math.floor((1 - confidence) * self.count)))
+        return -sum(self.sorted_values[:cut]) / cut
+
+
+class RollingCovariance:
+    def __init__(self, window):
+        self.window = window
+        self.pairs = deque()
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self._cxy = 0.0
+        self._m2y = 0.0
+        self._evicted = None
+
+    def _add(self, x, y):
+        self.count += 1
+        delta_x = x - self.mean_x
+        self.mean_x += delta_x / self.count
+        delta_y = y - self.mean_y
+        self.mean_y += delta_y / self.count
+        self._cxy += delta_x * (y - self.mean_y)
+        self._m2y += delta_y * (y - self.mean_y)
+
+    def _remove(self, x, y):
+        self.count -= 1
+        if not self.count:
+            self.mean_x = self.mean_y = self._cxy = self._m2y = 0.0
+            return
+        delta_x = x - self.mean_x
+        self.mean_x -= delta_x / self.count
+        delta_y = y - self.mean_y
+        self.mean_y -= delta_y / self.count
+        self._cxy -= delta_x * (y - self.mean_y)
+        self._m2y = max(0.0, self._m2y - delta_y * (y - self.mean_y))
+
+    def push(self, x, y):
+        self.pairs.append((x, y))
+        self._add(x, y)
+        self._evicted = None
+        if self.count > self.window:
+            self._evicted = self.pairs.popleft()
+            self._remove(*self._evicted)
+
+    def pop(self):
+        self._remove(*self.pairs.pop())
+        if self._evicted is not None:
+            self.pairs.appendleft(self._evicted)
+            self._add(*self._evicted)
+            self._evicted = None
+
+    @property
+    def beta(self):
+        return self._cxy / self._m2y if self.count > 1 and self._m2y else float('nan')
+
+
+class SymbolRisk:
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.moments = {window: RollingMoments(window) for window in windows}
+        self.covariances = {window: RollingCovariance(window) for window in windows}
+        self.prices = deque(maxlen=max(windows) + 1)
+        self.last_price = None
+        self.last_timestamp = None
+        self._undo = None
+
+    def update(self, price, timestamp=None, benchmark_return=None):
+        # A bar with the same timestamp as the last one restates it (today's
+        # bar while the market is open): undo the last update and apply again.
+        if timestamp is not None and timestamp == self.last_timestamp and self._undo is not None:
+            self._rollback()
+        price = float(price)
+        returned = paired = False
+        if self.last_price is not None and self.last_price > 0:
+            ret = price / self.last_price - 1
+            for moments in self.moments.values():
+                moments.push(ret)
+            returned = True
+            if benchmark_return is not None and not math.isnan(benchmark_return):
+                for covariance in self.covariances.values():
+                    covariance.push(ret, benchmark_return)
+                paired = True
+
+        dropped = self.prices[0] if len(self.prices) == self.prices.maxlen else None
+        self._undo = (self.last_price, self.last_timestamp, dropped, returned, paired)
+        self.prices.append(price)
+        self.last_price = price
+        self.last_timestamp = timestamp
+
+    def _rollback(self):
+        self.last_price, self.last_timestamp, dropped, returned, paired = self._undo
+        self._undo = None
+        if returned:
+            for moments in self.moments.values():
+                moments.pop()
+        if paired:
+            for covariance in self.covariances.values():
+                covariance.pop()
+        self.prices.pop()
+        if dropped is not None:
+            self.prices.appendleft(dropped)
+
+    def window_drawdown(self, window):
+        prices = np.fromiter(self.prices, dtype=float)[-(window + 1):]
+        if prices.size < 2:
+            return 0.0
+        return float(np.max(1 - prices / np.maximum.accumulate(prices)))
+
+    def metrics(self, window):
+        moments = self.moments[window]
+        return {
+            'daily_volatility': moments.std,
+            'volatility': moments.std * np.sqrt(252) * 100,
+            'mean_return': moments.mean if moments.count else float('nan'),
+            'var_95': moments.value_at_risk(0.95),
+            'cvar_95': moments.conditional_value_at_risk(0.95),
+            'max_drawdown': self.window_drawdown(window),
+            'beta': self.covariances[window].beta,
+            'observations': moments.count
+        }
+
+
+class RiskEngine:
+    def __init__(self, windows=DEFAULT_WINDOWS, benchmark=DEFAULT_BENCHMARK, history_period='2y'):
+        self.windows = tuple(sorted(windows))
+        self.benchmark = benchmark
+        self.history_period = history_period
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def _state(self, symbol):
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = SymbolRisk(self.windows)
+        return state
+
+    def update(self, symbol, price, timestamp=None, benchmark_return=None):
+        with self._lock:
+            self._state(symbol.upper()).update(price, timestamp, benchmark_return)
+
+    def feed(self, symbol, closes, benchmark_closes=None):
+        symbol = symbol.upper()
+        closes = closes.dropna()
+        benchmark_returns = None
+        if benchmark_closes is not None and not benchmark_closes.empty:
+            benchmark_returns = benchmark_closes.dropna().pct_change()
+
+        with self._lock:
+            state = self._state(symbol)
+            if state.last_timestamp is not None:
+                # The last bar fed may have been restated since; it is fed again.
+                closes = closes[closes.index >= state.last_timestamp]
+            for timestamp, price in closes.items():
+                benchmark_return = None
+                if benchmark_returns is not None:
+                    benchmark_return = benchmark_returns.get(timestamp)
+                state.update(price, timestamp, benchmark_return)
+
+    def _closes(self, symbol):
+        bars = market_data.get_bars(symbol, period=self.history_period)
+        if not bars.size:
+            return pd.Series(dtype=float)
+        return pd.Series(bars['close'], index=pd.DatetimeIndex(bars['time']).normalize())
+
+    def refresh(self, symbol):
+        symbol = symbol.upper()
+        closes = self._closes(symbol)
+        benchmark_closes = None
+        if self.benchmark and symbol != self.benchmark:
+            try:
+                benchmark_closes = self._closes(self.benchmark)
+            except Exception:
+                benchmark_closes = None
+        self.feed(symbol, closes, benchmark_closes)
+
+    def metrics(self, symbol, window=20, refresh=True):
+        symbol = symbol.upper()
+        if window not in self.windows:
+            raise ValueError(f"Window {window} is not tracked; choose from {self.windows}")
+        if refresh:
+            self.refresh(symbol)
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None or state.last_price is None:
+                raise ValueError(f"No price history available for {symbol}")
+            return state.metrics(window)
+
+    def daily_volatility(self, symbol, window=20, refresh=True):
+        return self.metrics(symbol, window, refresh)['daily_volatility']
+
+    def snapshot(self, symbols, window=252, refresh=True):
+        if refresh and symbols:
+            market_data.prefetch(list(symbols) + ([self.benchmark] if self.benchmark else []),
+                                 period=self.history_period, include_info=False, include_news=False)
+        rows = {}
+        for symbol in symbols:
+            try:
+                rows[symbol.upper()] = self.metrics(symbol, window, refresh)
+            except ValueError:
+                continue
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+_engine = None
+
+
+def get_risk_engine():
+    global _engine
+    if _engine is None:
+        _engine = RiskEngine()
+    return _engine
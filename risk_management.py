@@ -1,13 +1,9 @@
-import numpy as np
-import yfinance as yf
-import openai
-from dotenv import load_dotenv
-import os
+import market_data
+import llm_client
+from risk_engine import get_risk_engine
 
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def get_ai_analysis(ticker, account_size, risk_percentage, suggested_position, daily_volatility):
+def get_ai_analysis(ticker, account_size, risk_percentage, suggested_position, daily_volatility, verbose=True):
     analysis_prompt = f"""
     Given the following information for the stock {ticker}:
     - Account Size: ${account_size}
@@ -26,38 +22,40 @@ def get_ai_analysis(ticker, account_size, risk_percentage, suggested_position, d
     Also, provide some news of the stock that relate to the risk management below the bullet points.
     """
     
+    system = "You are a financial advisor with expertise in portfolio management and risk assessment."
     try:
-        chat_completion = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a financial advisor with expertise in portfolio management and risk assessment."},
-                {"role": "user", "content": analysis_prompt}
-            ],
-            temperature=0.7
-        )
-        ai_response = chat_completion.choices[0].message['content']
-        print("\n\n", ai_response)
-        return ai_response
+        if not verbose:
+            return llm_client.chat(system, analysis_prompt, temperature=0.7)
+
+        print("\n\n ", end="")
+        chunks = []
+        for chunk in llm_client.stream_chat(system, analysis_prompt, temperature=0.7):
+            chunks.append(chunk)
+            print(chunk, end="", flush=True)
+        print()
+        return "".join(chunks)
 
     except Exception as e:
-        print(f"Error generating AI analysis: {str(e)}")
+        if verbose:
+            print(f"Error generating AI analysis: {str(e)}")
         return f"Error generating AI analysis: {str(e)}"
 
 
-def calculate_position_size(ticker, account_size, risk_percentage):
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="1mo")
-    
-    daily_volatility = hist['Close'].pct_change().std()
-    
+def suggested_position_size(account_size, risk_percentage, daily_volatility):
     max_position = account_size * (risk_percentage / 100)
     
-    suggested_position = max_position * (1 - daily_volatility)
+    return max_position * (1 - daily_volatility)
+
+
+def calculate_position_size(ticker, account_size, risk_percentage, verbose=True):
+    daily_volatility = get_risk_engine().daily_volatility(ticker, window=20)
+    
+    suggested_position = suggested_position_size(account_size, risk_percentage, daily_volatility)
     
-    ai_analysis = get_ai_analysis(ticker, account_size, risk_percentage, suggested_position, daily_volatility)
+    ai_analysis = get_ai_analysis(ticker, account_size, risk_percentage, suggested_position, daily_volatility, verbose)
 
     return {
         'suggested_position': round(suggested_position, 2),
-        'max_shares': round(suggested_position / stock.info['currentPrice'], 0),
+        'max_shares': round(suggested_position / market_data.get_info(ticker)['currentPrice'], 0),
         'ai_analysis': ai_analysis
     }
@@ -0,0 +1,420 @@
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+import bar_store
+import market_data
+import telemetry
+from config import CACHE_DIR
+
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, 'screener', 'snapshot.npz')
+SNAPSHOT_TTL = 6 * 60 * 60
+
+INFO_FIELDS = {
+    'price': 'currentPrice',
+    'high_52w': 'fiftyTwoWeekHigh',
+    'low_52w': 'fiftyTwoWeekLow',
+    'market_cap': 'marketCap',
+    'volume': 'volume',
+    'avg_volume': 'averageVolume',
+    'pe': 'trailingPE',
+    'forward_pe': 'forwardPE',
+    'eps': 'trailingEps',
+    'dividend_yield': 'dividendYield',
+    'beta': 'beta'
+}
+DERIVED_FIELDS = ('from_low', 'from_high', 'return_1mo')
+NUMERIC_FIELDS = tuple(INFO_FIELDS) + DERIVED_FIELDS
+TEXT_FIELDS = {'name': 'longName', 'sector': 'sector', 'industry': 'industry'}
+ALIASES = {
+    'pe_ratio': 'pe', 'mcap': 'market_cap', 'marketcap': 'market_cap', 'yield': 'dividend_yield',
+    'from_52w_low': 'from_low', 'from_52w_high': 'from_high', 'ret_1mo': 'return_1mo'
+}
+
+_CONDITION = re.compile(r"^\s*([A-Za-z_][\w%]*)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$")
+_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+
+def _float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if np.isfinite(value) else np.nan
+
+
+def parse_value(text):
+    text = text.strip().strip('"\'')
+    match = re.fullmatch(r"([-+]?\d*\.?\d+)\s*([KMBTkmbt]?)%?", text)
+    if not match:
+        return text
+    return float(match.group(1)) * _SUFFIXES.get(match.group(2).upper(), 1)
+
+
+def parse_condition(condition):
+    if not isinstance(condition, str):
+        field, op, value = condition
+    else:
+        match = _CONDITION.match(condition)
+        if not match:
+            raise ValueError(f"Invalid condition '{condition}'. Use e.g. 'pe < 15' or 'market_cap > 10B'")
+        field, op, value = match.group(1), match.group(2), parse_value(match.group(3))
+    field = field.lower().rstrip('%')
+    field = ALIASES.get(field, field)
+    op = '==' if op == '=' else op
+    if field not in NUMERIC_FIELDS and field not in TEXT_FIELDS:
+        raise ValueError(f"Unknown field '{field}'. Choose from: {', '.join(NUMERIC_FIELDS + tuple(TEXT_FIELDS))}")
+    if field in NUMERIC_FIELDS and isinstance(value, str):
+        raise ValueError(f"'{field}' needs a numeric value, got '{value}'")
+    return field, op, value
+
+
+def parse_query(query):
+    return [parse_condition(part) for part in re.split(r"\s+and\s+|,", query, flags=re.IGNORECASE) if part.strip()]
+
+
+class Snapshot:
+    def __init__(self, symbols, columns, text, fetched_at=None):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.columns = {name: np.asarray(columns[name], dtype=float) for name in NUMERIC_FIELDS}
+        self.text = {name: np.asarray(text[name], dtype=str) for name in TEXT_FIELDS}
+        self.fetched_at = fetched_at or time.time()
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self._sorted = {}
+        self._text_index = {}
+
+    def __len__(self):
+        return self.symbols.size
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self._rows
+
+    def sorted_index(self, field):
+        # Values in ascending order plus the rows they came from; missing
+        # values are left out so they never match a range.
+        index = self._sorted.get(field)
+        if index is None:
+            values = self.columns[field]
+            rows = np.flatnonzero(~np.isnan(values))
+            order = rows[np.argsort(values[rows], kind='stable')]
+            index = self._sorted[field] = (values[order], order)
+        return index
+
+    def text_index(self, field):
+        index = self._text_index.get(field)
+        if index is None:
+            values = np.char.lower(self.text[field])
+            keys, inverse = np.unique(values, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(keys.size + 1))
+            index = self._text_index[field] = {key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(keys)}
+        return index
+
+    def range(self, field, low=-np.inf, high=np.inf, include_low=True, include_high=True):
+        values, order = self.sorted_index(field)
+        start = np.searchsorted(values, low, side='left' if include_low else 'right')
+        stop = np.searchsorted(values, high, side='right' if include_high else 'left')
+        return order[start:max(start, stop)]
+
+    def where(self, conditions):
+        ranges = {}
+        filters = []
+        for field, op, value in conditions:
+            if field in TEXT_FIELDS or op == '!=':
+                filters.append((field, op, value))
+                continue
+            low, high, include_low, include_high = ranges.get(field, (-np.inf, np.inf, True, True))
+            if op in ('>', '>=', '==') and (value > low or (value == low and op == '>')):
+                low, include_low = value, op != '>'
+            if op in ('<', '<=', '==') and (value < high or (value == high and op == '<')):
+                high, include_high = value, op != '<'
+            ranges[field] = (low, high, include_low, include_high)
+
+        # Start from the most selective index and check the other conditions
+        # only against the rows it returns.
+        candidates = [(self.range(field, *bounds), field) for field, bounds in ranges.items()]
+        candidates += [(self.text_index(field).get(str(value).lower(), np.empty(0, dtype=int)), field)
+                       for field, op, value in filters if op == '==']
+        if candidates:
+            rows, seed = min(candidates, key=lambda candidate: candidate[0].size)
+        else:
+            rows, seed = np.arange(len(self)), None
+
+        keep = np.ones(rows.size, dtype=bool)
+        for field, (low, high, include_low, include_high) in ranges.items():
+            if field == seed:
+                continue
+            values = self.columns[field][rows]
+            keep &= (values >= low) if include_low else (values > low)
+            keep &= (values <= high) if include_high else (values < high)
+        for field, op, value in filters:
+            if field in TEXT_FIELDS:
+                matches = np.char.lower(self.text[field][rows]) == str(value).lower()
+            else:
+                matches = self.columns[field][rows] == value
+            keep &= matches if op == '==' else ~matches
+        return np.sort(rows[keep])
+
+    def to_frame(self, rows=None):
+        import pandas as pd
+
+        rows = np.arange(len(self)) if rows is None else rows
+        frame = pd.DataFrame({name: values[rows] for name, values in self.text.items()},
+                             index=pd.Index(self.symbols[rows], name='symbol'))
+        for name in NUMERIC_FIELDS:
+            frame[name] = self.columns[name][rows]
+        return frame
+
+    def merge(self, other):
+        """A new snapshot with `other`'s rows added to, or replacing, this one's."""
+        keep = ~np.isin(self.symbols, other.symbols)
+        symbols = np.concatenate([self.symbols[keep], other.symbols])
+        order = np.argsort(symbols, kind='stable')
+        columns = {name: np.concatenate([self.columns[name][keep], other.columns[name]])[order]
+                   for name in NUMERIC_FIELDS}
+        text = {name: np.concatenate([self.text[name][keep], other.text[name]])[order] for name in TEXT_FIELDS}
+        # The merged snapshot is only as fresh as its oldest rows.
+        fetched_at = min(self.fetched_at, other.fetched_at) if keep.any() else other.fetched_at
+        return Snapshot(symbols[order], columns, text, fetched_at)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, symbols=self.symbols, fetched_at=self.fetched_at,
+                 **{f"num_{name}": values for name, values in self.columns.items()},
+                 **{f"text_{name}": values for name, values in self.text.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as data:
+                return cls(data['symbols'],
+                           {name: data[f"num_{name}"] for name in NUMERIC_FIELDS},
+                           {name: data[f"text_{name}"] for name in TEXT_FIELDS},
+                           float(data['fetched_at']))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def _bar_fields(bars):
+    if not bars.size:
+        return {}
+    close = bars['close']
+    times = bars['time']
+    month_ago = np.searchsorted(times, times[-1] - np.timedelta64(30, 'D'))
+    return {
+        'price': close[-1],
+        'high_52w': np.nanmax(bars['high']),
+        'low_52w': np.nanmin(bars['low']),
+        'return_1mo': (close[-1] / close[month_ago] - 1) * 100 if close[month_ago] else np.nan
+    }
+
+
+def build_snapshot(symbols, max_workers=16):
+    symbols = sorted({symbol.upper() for symbol in symbols})
+    # One bulk history download for prices and 52-week ranges, info fetched
+    # concurrently (and from the disk cache when fresh).
+    errors = market_data.prefetch(symbols, period='1y', include_info=True, include_news=False,
+                                  max_workers=max_workers)
+
+    columns = {name: np.full(len(symbols), np.nan) for name in NUMERIC_FIELDS}
+    text = {name: [''] * len(symbols) for name in TEXT_FIELDS}
+    for row, symbol in enumerate(symbols):
+        info = {}
+        if symbol not in errors:
+            try:
+                info = market_data.get_info(symbol) or {}
+            except Exception:
+                info = {}
+        for name, key in INFO_FIELDS.items():
+            columns[name][row] = _float(info.get(key))
+        if np.isnan(columns['price'][row]):
+            columns['price'][row] = _float(info.get('regularMarketPrice'))
+        for name, key in TEXT_FIELDS.items():
+            text[name][row] = info.get(key) or ''
+
+        try:
+            bars = market_data.get_bars(symbol, period='1y')
+        except Exception:
+            bars = bar_store.empty()
+        for name, value in _bar_fields(bars).items():
+            if name == 'return_1mo' or np.isnan(columns[name][row]):
+                columns[name][row] = value
+
+    columns['dividend_yield'] *= 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['from_low'] = (columns['price'] / columns['low_52w'] - 1) * 100
+        columns['from_high'] = (columns['price'] / columns['high_52w'] - 1) * 100
+    return Snapshot(symbols, columns, text)
+
+
+class Screener:
+    def __init__(self, path=None, max_age=SNAPSHOT_TTL):
+        self.path = path or SNAPSHOT_PATH
+        self.max_age = max_age
+        self.universe = []
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = Snapshot.load(self.path)
+        return self._snapshot
+
+    def stale(self, symbols=None):
+        snapshot = self.snapshot
+        if snapshot is None or time.time() - snapshot.fetched_at > self.max_age:
+            return True
+        return any(symbol.upper() not in snapshot for symbol in symbols or [])
+
+    def refresh(self, symbols=None, max_workers=16, force=False):
+        requested = {symbol.upper() for symbol in symbols or []}
+        with self._lock:
+            current = self.snapshot
+            known = set(self.universe) | (set(current.symbols.tolist()) if current is not None else set())
+            if not requested | known:
+                raise ValueError("No symbols to screen; pass a universe of tickers")
+            expired = current is None or time.time() - current.fetched_at > self.max_age
+            # Only fetch what is missing, or everything once the snapshot has
+            # expired; a few requested tickers never replace the universe.
+            if expired:
+                fetch = known | requested
+            elif force:
+                fetch = requested or known
+            else:
+                fetch = {symbol for symbol in requested | set(self.universe) if symbol not in current}
+            if fetch:
+                snapshot = build_snapshot(fetch, max_workers)
+                if current is not None:
+                    snapshot = current.merge(snapshot)
+                try:
+                    snapshot.save(self.path)
+                except OSError:
+                    pass
+                self._snapshot = snapshot
+        return self._snapshot
+
+    def screen(self, conditions, symbols=None, sort_by=None, ascending=True, limit=None):
+        if isinstance(conditions, str):
+            conditions = parse_query(conditions)
+        conditions = [parse_condition(condition) for condition in conditions]
+        snapshot = self.refresh(symbols) if symbols or self.stale() else self.snapshot
+
+        rows = snapshot.where(conditions)
+        if symbols:
+            wanted = np.isin(snapshot.symbols[rows], [symbol.upper() for symbol in symbols])
+            rows = rows[wanted]
+        if sort_by:
+            sort_by = ALIASES.get(sort_by, sort_by)
+            values = snapshot.columns[sort_by][rows]
+            order = np.argsort(values if ascending else -values, kind='stable')
+            rows = rows[order]
+        if limit:
+            rows = rows[:limit]
+        return snapshot.to_frame(rows)
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh(force=True)
+            except Exception as e:
+                print(f"Error refreshing screener snapshot: {str(e)}")
+
+    def start(self, symbols, interval=SNAPSHOT_TTL):
+        self.universe = [symbol.upper() for symbol in symbols]
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="screener-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_screener = None
+
+
+def get_screener():
+    global _screener
+    if _screener is None:
+        _screener = Screener()
+    return _screener
+
+
+def analyze_shortlist(results, analyze, include_sentiment=False, max_workers=4):
+    """Run `analyze(symbol, is_holding, include_sentiment)` on each screened symbol."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    symbols = list(results.index)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        analyses = executor.map(lambda symbol: analyze(symbol, 'n', include_sentiment), symbols)
+        return dict(zip(symbols, analyses))
+
+
+def main(argv=None):
+    from colorama import Fore, Style
+    from batch import read_tickers
+
+    parser = argparse.ArgumentParser(description="Screen a universe of tickers on fundamentals.")
+    parser.add_argument('conditions', nargs='*', help="e.g. 'pe < 15' 'market_cap > 10B' 'from_low <= 5'")
+    parser.add_argument('-f', '--file', help="File with the ticker universe (whitespace or comma separated)")
+    parser.add_argument('-t', '--tickers', default='', help="Comma-separated ticker universe, e.g. AAPL,MSFT")
+    parser.add_argument('--sort', help="Field to sort results by")
+    parser.add_argument('--desc', action='store_true', help="Sort descending")
+    parser.add_argument('--limit', type=int, default=25)
+    parser.add_argument('--refresh', action='store_true', help="Rebuild the snapshot even if it is fresh")
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('--analyze', action='store_true', help="Run the AI stock analysis on the results")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    universe = [ticker.strip().upper() for ticker in args.tickers.split(',') if ticker.strip()]
+    if args.file:
+        universe.extend(read_tickers(args.file))
+
+    screener = get_screener()
+    started = time.perf_counter()
+    if universe or args.refresh:
+        screener.refresh(universe or None, max_workers=args.concurrency, force=args.refresh)
+    if screener.snapshot is None:
+        parser.error("no saved snapshot; provide a universe with --tickers or --file")
+    loaded = time.perf_counter()
+
+    results = screener.screen(args.conditions, sort_by=args.sort, ascending=not args.desc, limit=args.limit)
+    finished = time.perf_counter()
+
+    print(f"\n{Fore.CYAN}{len(results)} matches from {len(screener.snapshot)} tickers{Style.RESET_ALL}")
+    print("-" * 50)
+    for symbol, row in results.iterrows():
+        print(f"{Fore.GREEN}{symbol:<6}{Style.RESET_ALL} {row['name'][:28]:<28} ${row['price']:>9.2f}  "
+              f"PE {row['pe']:>6.1f}  MCap {row['market_cap'] / 1e9:>8.1f}B  "
+              f"{row['from_low']:>6.1f}% above 52w low")
+    print(f"\n{Fore.YELLOW}Snapshot ready in {loaded - started:.2f}s, query took "
+          f"{(finished - loaded) * 1000:.1f}ms{Style.RESET_ALL}")
+
+    if args.analyze and len(results):
+        from stock_analysis import analyze_stock
+
+        for symbol, analysis in analyze_shortlist(results, analyze_stock).items():
+            print(f"\n{Fore.CYAN}Financial Analysis for {symbol}:{Style.RESET_ALL}")
+            print("=" * 50)
+            print(analysis)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+from colorama import Fore, Style
+
+import telemetry
+from json_utils import json_safe, json_default
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway'
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    def __init__(self, size=1024):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=size)
+
+    def record(self, seconds, error=False):
+        self.count += 1
+        self.errors += bool(error)
+        self.total += seconds
+        self._recent.append(seconds)
+
+    def snapshot(self):
+        recent = sorted(self._recent)
+
+        def percentile(percent):
+            if not recent:
+                return None
+            return recent[min(len(recent) - 1, int(round(percent / 100 * (len(recent) - 1))))] * 1000
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': self.total / self.count * 1000 if self.count else None,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+            'max_ms': recent[-1] * 1000 if recent else None
+        }
+
+
+class Coalescer:
+    def __init__(self, executor):
+        self.executor = executor
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, fn, *args):
+        # Everything here runs on the event loop thread, so the in-flight
+        # table needs no lock. Shielding keeps one client hanging up from
+        # cancelling the fetch other clients are waiting on.
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+
+def _ticker(params):
+    ticker = (params.get('ticker') or '').strip().upper()
+    if not ticker:
+        raise HTTPError(400, "Missing required parameter 'ticker'")
+    return ticker
+
+
+def _number(params, name, default=None):
+    value = params.get(name, default)
+    if value is None:
+        raise HTTPError(400, f"Missing required parameter '{name}'")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Parameter '{name}' must be a number")
+    if not math.isfinite(value):
+        raise HTTPError(400, f"Parameter '{name}' must be a finite number")
+    return value
+
+
+def _flag(params, name):
+    return str(params.get(name, '')).lower() in ('1', 'true', 'yes', 'y')
+
+
+def _finite(value):
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+
+def _alert_dict(alert):
+    return {
+        'id': alert.id,
+        'ticker': alert.symbol,
+        'target_price': alert.target_price,
+        'alert_type': alert.alert_type,
+        'created_at': alert.created_at,
+        'triggered_at': alert.triggered_at,
+        'triggered_price': alert.triggered_price
+    }
+
+
+def chart_data(ticker, period='1y', points=200, overlays=None):
+    import charts
+    import market_data
+    from bar_store import to_frame
+    from get_graph import INTRADAY_PERIODS
+
+    interval = INTRADAY_PERIODS.get(period, '1d')
+    bars = market_data.get_bars(ticker, period=period, interval=interval)
+    if not bars.size:
+        raise ValueError(f"No price history available for {ticker}")
+
+    prices = bars['close']
+    series = {'close': prices}
+    series.update(charts.overlay_series(prices, overlays, bars['high'], bars['low'], bars['volume']))
+    indices = charts.downsample(prices, points) if points else range(prices.size)
+    timestamps = to_frame(bars[list(indices)], market_data.history_timezone(ticker, interval)).index
+
+    return {
+        'ticker': ticker,
+        'period': period,
+        'interval': interval,
+        'points': len(indices),
+        'timestamps': [timestamp.isoformat() for timestamp in timestamps],
+        'series': {name: [_finite(values[i]) for i in indices] for name, values in series.items()}
+    }
+
+
+def _risk_report(ticker, account_size, risk_percentage):
+    from risk_management import calculate_position_size
+    from risk_engine import get_risk_engine
+
+    position = calculate_position_size(ticker, account_size, risk_percentage, verbose=False)
+    metrics = get_risk_engine().metrics(ticker, window=20, refresh=False)
+    return dict(position, ticker=ticker, account_size=account_size, risk_percentage=risk_percentage,
+                risk_metrics={name: _finite(value) for name, value in metrics.items()})
+
+
+def _analysis(ticker, holding, sentiment):
+    # analyze_stock reports failures as text; here they become statuses.
+    import llm_client
+    from stock_analysis import ANALYSIS_SYSTEM, build_analysis_prompt
+
+    try:
+        prompt = build_analysis_prompt(ticker, holding, sentiment)
+    except (ValueError, LookupError) as e:
+        raise HTTPError(404, f"No data for {ticker}: {e}")
+    except Exception as e:
+        raise HTTPError(502, f"Error fetching data for {ticker}: {e}")
+    try:
+        return llm_client.chat(ANALYSIS_SYSTEM, prompt, temperature=0.7)
+    except Exception as e:
+        raise HTTPError(502, f"An error occurred during analysis: {e}")
+
+
+class AdvisorService:
+    def __init__(self, max_workers=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='advisor')
+        self.coalescer = Coalescer(self.executor)
+        self.started_at = time.time()
+        self.stats = {}
+        self.active_requests = 0
+        self.triggered = deque(maxlen=256)
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics,
+            ('GET', '/metrics/prometheus'): self.prometheus,
+            ('GET', '/analyze'): self.analyze,
+            ('GET', '/risk'): self.risk,
+            ('GET', '/sentiment'): self.sentiment,
+            ('GET', '/chart'): self.chart,
+            ('GET', '/screen'): self.screen,
+            ('GET', '/news'): self.news,
+            ('GET', '/alerts'): self.list_alerts,
+            ('POST', '/alerts'): self.create_alert,
+            ('DELETE', '/alerts'): self.delete_alert
+        }
+
+    async def health(self, params, body):
+        import real_time_alerts
+
+        engine = real_time_alerts._engine
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'active_requests': self.active_requests,
+            'inflight_fetches': len(self.coalescer),
+            'active_alerts': len(engine) if engine is not None else 0,
+            'alert_engine_running': bool(engine is not None and engine.running)
+        }
+
+    async def metrics(self, params, body):
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'routes': {route: stats.snapshot() for route, stats in sorted(self.stats.items())},
+            'upstream': {'calls': self.coalescer.calls, 'coalesced': self.coalescer.coalesced}
+        }
+
+    async def prometheus(self, params, body):
+        return telemetry.prometheus()
+
+    async def analyze(self, params, body):
+        ticker = _ticker(params)
+        holding = 'y' if _flag(params, 'holding') else 'n'
+        sentiment = _flag(params, 'sentiment')
+        analysis = await self.coalescer.run(('analyze', ticker, holding, sentiment),
+                                            _analysis, ticker, holding, sentiment)
+        return {'ticker': ticker, 'holding': holding == 'y', 'analysis': analysis}
+
+    async def risk(self, params, body):
+        ticker = _ticker(params)
+        account_size = _number(params, 'account_size')
+        risk_percentage = _number(params, 'risk_percentage', 2)
+        return await self.coalescer.run(('risk', ticker, account_size, risk_percentage),
+                                        _risk_report, ticker, account_size, risk_percentage)
+
+    async def sentiment(self, params, body):
+        from market_sentiment import analyze_news_sentiment
+
+        ticker = _ticker(params)
+        return await self.coalescer.run(('sentiment', ticker), analyze_news_sentiment, ticker)
+
+    async def chart(self, params, body):
+        ticker = _ticker(params)
+        period = params.get('period', '1y')
+        points = int(_number(params, 'points', 200))
+        overlays = tuple(overlay for overlay in params.get('overlays', '').split(',') if overlay)
+        return await self.coalescer.run(('chart', ticker, period, points, overlays),
+                                        chart_data, ticker, period, points, overlays)
+
+    async def screen(self, params, body):
+        from screener import get_screener, parse_query
+
+        conditions = tuple(parse_query(params.get('q', '')))
+        tickers = tuple(ticker.strip().upper() for ticker in params.get('tickers', '').split(',') if ticker.strip())
+        sort_by = params.get('sort') or None
+        limit = int(_number(params, 'limit', 50))
+        ascending = not _flag(params, 'desc')
+        results = await self.coalescer.run(('screen', conditions, tickers, sort_by, ascending, limit),
+                                           get_screener().screen, list(conditions), list(tickers), sort_by,
+                                           ascending, limit)
+        rows = [{'ticker': symbol, **{name: _finite(value) if isinstance(value, float) else value
+                                      for name, value in row.items()}}
+                for symbol, row in results.iterrows()]
+        return {'count': len(rows), 'results': rows}
+
+    async def news(self, params, body):
+        from news_store import RECENT_HOURS, portfolio_news
+
+        text = params.get('q') or None
+        tickers = tuple(ticker.strip().upper() for ticker in params.get('tickers', '').split(',') if ticker.strip())
+        hours = _number(params, 'hours', RECENT_HOURS)
+        limit = int(_number(params, 'limit', 50))
+        if not tickers:
+            from portfolio import get_portfolio
+            tickers = tuple(get_portfolio().symbols)
+        results = await self.coalescer.run(('news', text, tickers, hours, limit), portfolio_news,
+                                           list(tickers), text, hours, limit)
+        return {'count': len(results), 'results': results}
+
+    def _on_trigger(self, alert):
+        self.triggered.append(_alert_dict(alert))
+
+    async def list_alerts(self, params, body):
+        from real_time_alerts import get_alert_engine
+
+        symbol = params.get('ticker')
+        return {
+            'active': [_alert_dict(alert) for alert in get_alert_engine().alerts(symbol)],
+            'triggered': [alert for alert in self.triggered if not symbol or alert['ticker'] == symbol.upper()]
+        }
+
+    async def create_alert(self, params, body):
+        from real_time_alerts import get_ai_prediction, register_price_alert
+
+        params = dict(params, **(body or {}))
+        ticker = _ticker(params)
+        target_price = _number(params, 'target_price')
+        alert_type = params.get('alert_type', 'above')
+        if alert_type not in ('above', 'below'):
+            raise HTTPError(400, "alert_type must be 'above' or 'below'")
+        # Only the AI prediction is shared; every request registers its own alert.
+        prediction = await self.coalescer.run(('alert_prediction', ticker, target_price, alert_type),
+                                              get_ai_prediction, ticker, target_price, alert_type)
+        alert, message = await asyncio.get_running_loop().run_in_executor(
+            self.executor, register_price_alert, ticker, target_price, alert_type, self._on_trigger, prediction
+        )
+        if alert is None:
+            return {'alert': None, 'message': message}
+        return 201, {'alert': _alert_dict(alert), 'message': message}
+
+    async def delete_alert(self, params, body):
+        from real_time_alerts import get_alert_engine
+
+        alert_id = int(_number(params, 'id'))
+        if not get_alert_engine().remove_alert(alert_id):
+            raise HTTPError(404, f"No active alert with id {alert_id}")
+        return {'removed': alert_id}
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        handler = self.routes.get((method, path))
+        route = f"{method} {path}" if handler is not None else 'unmatched'
+        status = 200
+        started = time.perf_counter()
+        self.active_requests += 1
+        try:
+            if handler is None:
+                if any(route_path == path for _, route_path in self.routes):
+                    raise HTTPError(405, f"Method {method} not allowed for {path}")
+                raise HTTPError(404, f"Unknown endpoint {path}")
+            payload = await handler(dict(parse_qsl(url.query)), _parse_body(body))
+            if isinstance(payload, tuple):
+                status, payload = payload
+        except HTTPError as e:
+            status, payload = e.status, {'error': str(e)}
+        except ValueError as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.active_requests -= 1
+        elapsed = time.perf_counter() - started
+        self.stats.setdefault(route, LatencyStats()).record(elapsed, error=status >= 500)
+        telemetry.observe('http_request_seconds', elapsed, route=route)
+        telemetry.inc('http_requests_total', route=route, status=status)
+        return status, payload
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    _write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_body(body):
+    if not body:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Request body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return payload
+
+
+async def _readline(reader):
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise HTTPError(400, "Request line or header too long")
+
+
+async def _read_request(reader):
+    line = await _readline(reader)
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(json_safe(payload), default=json_default, allow_nan=False).encode(), 'application/json'
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, max_workers=16, pool_size=16, prefetch=None):
+    import market_data
+
+    telemetry.enable()
+    market_data.configure_session(pool_size)
+    service = AdvisorService(max_workers=max_workers)
+    if prefetch:
+        await asyncio.get_running_loop().run_in_executor(service.executor, market_data.prefetch, prefetch)
+
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path)
+        address = unix_path
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        address = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"{Fore.GREEN}Stock advisor service listening on {address}{Style.RESET_ALL}", file=sys.stderr)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the stock advisor as a local HTTP/JSON API.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="Listen on a Unix socket instead of TCP")
+    parser.add_argument('-w', '--workers', type=int, default=16, help="Threads for blocking data and AI calls")
+    parser.add_argument('--pool-size', type=int, default=16, help="Pooled HTTP connections to Yahoo Finance")
+    parser.add_argument('--prefetch', nargs='*', metavar='TICKER', help="Warm the cache for these tickers on start")
+    telemetry.add_arguments(parser)
+    args = parser.parse_args(argv)
+    telemetry.from_arguments(args)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.pool_size, args.prefetch))
+    except KeyboardInterrupt:
+        print(f"{Fore.YELLOW}Service stopped.{Style.RESET_ALL}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
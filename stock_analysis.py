@@ -0,0 +1,56 @@
+import llm_client
+from prompts import build_prompt, stock_sections
+
+ANALYSIS_SYSTEM = "You are a professional financial analyst with expertise in stock market analysis and investment strategies. Do NOT answer questions irrelevant to the topic AT ALL."
+
+
+def build_analysis_prompt(ticker, isHolding, include_sentiment=False):
+    # Data errors propagate: a prompt without the data is not worth sending.
+    sections = stock_sections(ticker, include_sentiment)
+    if not sections['price']:
+        raise ValueError(f"No price history available for {ticker}")
+
+    analysis_prompt = build_prompt(
+        f"Data for {ticker} (compact key=value; % values are percents):",
+        sections,
+        f"""
+    Is the user holding the stock? {isHolding}
+    
+    *y = yes, n = no*
+    
+    Use this information to provide a comprehensive financial analysis and investment recommendation.
+    
+    Not just the ticker, but also state the company name, and the industry it is in.
+    
+    Please provide a comprehensive financial analysis including:
+    1. Investment recommendation (Buy, Sell, Hold, etc)
+    2. Key financial metrics analysis
+    3. Risk assessments
+    4. Short-term and long-term outlook
+    5. Important factors influencing the stock
+    6. Potential price targets
+    
+    Present the analysis in a clear, structured format.
+    
+    The idea is to get to the point, but also provide a more detailed analysis than just a simple buy/sell/hold recommendation. Try to simplify the information so it isn't too long.
+    """
+    )
+    return analysis_prompt
+
+
+def analyze_stock(ticker, isHolding, include_sentiment=False):
+    try:
+        analysis_prompt = build_analysis_prompt(ticker, isHolding, include_sentiment)
+    except Exception as e:
+        return f"Error fetching data for {ticker}: {str(e)}"
+    
+    try:
+        return llm_client.chat(ANALYSIS_SYSTEM, analysis_prompt, temperature=0.7)
+        
+    except Exception as e:
+        return f"An error occurred during analysis: {str(e)}"
+
+
+def stream_analysis(ticker, isHolding, include_sentiment=False):
+    analysis_prompt = build_analysis_prompt(ticker, isHolding, include_sentiment)
+    return llm_client.stream_chat(ANALYSIS_SYSTEM, analysis_prompt, temperature=0.7)
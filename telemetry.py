@@ -0,0 +1,285 @@
+import os
+import sys
+import time
+import atexit
+import bisect
+import threading
+
+import config
+
+PREFIX = 'advisor_'
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS = {
+    'upstream_requests_total': ('counter', "Calls to Yahoo Finance and the LLM by outcome."),
+    'upstream_request_seconds': ('histogram', "Latency of calls to Yahoo Finance and the LLM."),
+    'upstream_retries_total': ('counter', "Calls retried after a retryable error."),
+    'upstream_bytes_total': ('counter', "Response bytes received from Yahoo Finance."),
+    'llm_tokens_total': ('counter', "LLM prompt and completion tokens."),
+    'cache_requests_total': ('counter', "Cache lookups by cache and result."),
+    'http_requests_total': ('counter', "Service requests by route and status."),
+    'http_request_seconds': ('histogram', "Service request latency by route.")
+}
+
+_enabled = config.get("STOCK_ADVISOR_TELEMETRY", "").lower() in ('1', 'true', 'yes')
+_counters = {}
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Interpolated within the bucket, like Prometheus' histogram_quantile.
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(LATENCY_BUCKETS):
+                    return LATENCY_BUCKETS[-1]
+                lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+                return lower + (LATENCY_BUCKETS[i] - lower) * (rank - seen) / count
+            seen += count
+        return LATENCY_BUCKETS[-1]
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+class _Call:
+    __slots__ = ('service', 'operation', 'started', 'outer')
+
+    def __init__(self, service, operation):
+        self.service = service
+        self.operation = operation
+
+    def __enter__(self):
+        self.outer = getattr(_local, 'call', None)
+        _local.call = self
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        _local.call = self.outer
+        # A stream closed early by its reader is not an upstream failure.
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        observe('upstream_request_seconds', elapsed, service=self.service, operation=self.operation)
+        inc('upstream_requests_total', service=self.service, operation=self.operation,
+            status='error' if failed else 'ok')
+        return False
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_DISABLED = _Disabled()
+
+
+def track(service, operation):
+    """Time one upstream call: `with telemetry.track('yahoo', 'info'): ...`"""
+    return _Call(service, operation) if _enabled else _DISABLED
+
+
+def count_bytes(service, amount):
+    # Attributed to the call being tracked on this thread, if any.
+    if not _enabled:
+        return
+    call = getattr(_local, 'call', None)
+    inc('upstream_bytes_total', amount, service=service, operation=call.operation if call is not None else 'other')
+
+
+def cache_result(cache, hit, amount=1):
+    if amount:
+        inc('cache_requests_total', amount, cache=cache, result='hit' if hit else 'miss')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in _histograms.items())
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        if kind == 'counter':
+            series = [(labels, value) for (metric, labels), value in counters if metric == name]
+        else:
+            series = [(labels, value) for (metric, labels), value in histograms if metric == name]
+        if not series:
+            continue
+        lines.append(f"# HELP {PREFIX}{name} {description}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+                cumulative += bucket
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus())
+    os.replace(tmp_path, path)
+
+
+def _format_bytes(amount):
+    for limit, suffix in ((1 << 30, 'GB'), (1 << 20, 'MB'), (1 << 10, 'KB')):
+        if amount >= limit:
+            return f"{amount / limit:.1f}{suffix}"
+    return f"{amount:.0f}B"
+
+
+def summary():
+    """Per-call counts, latency, bytes, retries, cache hit rates and token usage as text lines."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+
+    def total(name, **labels):
+        wanted = set(labels.items())
+        return sum(value for (metric, key), value in counters.items() if metric == name and wanted <= set(key))
+
+    lines = []
+    calls = sorted((dict(key) for metric, key in histograms if metric == 'upstream_request_seconds'),
+                   key=lambda labels: (labels['service'], labels['operation']))
+    if calls:
+        lines.append(f"{'call':<24}{'count':>7}{'errors':>8}{'retries':>9}{'p50':>10}{'p95':>10}{'total':>10}{'bytes':>10}")
+    for labels in calls:
+        histogram = histograms[_key('upstream_request_seconds', labels)]
+        errors = total('upstream_requests_total', status='error', **labels)
+        retries = total('upstream_retries_total', **labels)
+        received = total('upstream_bytes_total', **labels)
+        lines.append(
+            f"{labels['service'] + ' ' + labels['operation']:<24}{histogram.count:>7}{errors:>8}{retries:>9}"
+            f"{histogram.quantile(0.5) * 1000:>8.0f}ms{histogram.quantile(0.95) * 1000:>8.0f}ms"
+            f"{histogram.sum:>9.2f}s{_format_bytes(received) if received else '-':>10}"
+        )
+
+    caches = sorted({dict(key)['cache'] for metric, key in counters if metric == 'cache_requests_total'})
+    if caches:
+        rates = []
+        for cache in caches:
+            hits = total('cache_requests_total', cache=cache, result='hit')
+            lookups = hits + total('cache_requests_total', cache=cache, result='miss')
+            rates.append(f"{cache} {hits:.0f}/{lookups:.0f}")
+        lines.append("cache hits: " + ", ".join(rates))
+
+    models = sorted({dict(key)['model'] for metric, key in counters if metric == 'llm_tokens_total'})
+    for model in models:
+        prompt = total('llm_tokens_total', model=model, kind='prompt')
+        completion = total('llm_tokens_total', model=model, kind='completion')
+        lines.append(f"{model} tokens: {prompt:.0f} prompt + {completion:.0f} completion")
+    return lines
+
+
+def print_summary(file=sys.stderr):
+    from colorama import Fore, Style
+
+    lines = summary()
+    print(f"\n{Fore.CYAN}Session Stats:{Style.RESET_ALL}", file=file)
+    print("\n".join(lines) if lines else "No upstream calls were made.", file=file)
+
+
+def add_arguments(parser):
+    parser.add_argument('--stats', action='store_true',
+                        help="Print upstream call counts, latency and token usage on exit")
+    parser.add_argument('--metrics-file', default=config.get("STOCK_ADVISOR_METRICS_FILE"),
+                        help="Write Prometheus metrics to this file on exit")
+
+
+def _report(stats, path):
+    if path:
+        try:
+            write_prometheus(path)
+        except OSError as e:
+            print(f"Could not write metrics to {path}: {e}", file=sys.stderr)
+    if stats:
+        print_summary()
+
+
+def from_arguments(args):
+    if args.stats or args.metrics_file:
+        enable()
+        atexit.register(_report, args.stats, args.metrics_file)
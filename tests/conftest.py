@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Caches, the portfolio and the news store go to a scratch directory, never ~/.stock_advisor.
+_data_dir = tempfile.mkdtemp(prefix="stock_advisor_tests_")
+os.environ["STOCK_ADVISOR_DATA_DIR"] = _data_dir
+os.environ["STOCK_ADVISOR_CACHE_DIR"] = os.path.join(_data_dir, "cache")
+os.environ["STOCK_ADVISOR_PORTFOLIO_DB"] = os.path.join(_data_dir, "portfolio.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+from alert_engine import AlertEngine
+
+
+def test_above_and_below_alerts_fire_once():
+    engine = AlertEngine()
+    above = engine.add_alert('AAPL', 150, 'above')
+    below = engine.add_alert('AAPL', 100, 'below')
+    engine.add_alert('AAPL', 200, 'above')
+
+    assert engine.process_tick('AAPL', 120) == []
+    assert engine.process_tick('AAPL', 155) == [above]
+    assert engine.process_tick('AAPL', 99) == [below]
+    assert engine.process_tick('AAPL', 155) == []
+    assert len(engine) == 1
+    assert above.triggered_price == 155
+
+
+def test_failing_callback_does_not_drop_other_alerts(capsys):
+    notified = []
+    engine = AlertEngine(on_trigger=notified.append)
+
+    def broken(alert):
+        raise RuntimeError("mail server down")
+
+    first = engine.add_alert('MSFT', 300, 'above', callback=broken)
+    second = engine.add_alert('MSFT', 310, 'above', callback=notified.append)
+
+    assert engine.process_tick('MSFT', 320) == [first, second]
+    assert notified.count(first) == 1 and notified.count(second) == 2
+    assert "mail server down" in capsys.readouterr().out
+
+
+def test_failing_on_trigger_keeps_polling_other_quotes():
+    class Quotes:
+        def get_quotes(self, symbols):
+            return {'AAA': 10.0, 'BBB': 20.0}
+
+    def broken(alert):
+        raise RuntimeError("boom")
+
+    engine = AlertEngine(quote_source=Quotes(), on_trigger=broken)
+    engine.add_alert('AAA', 5, 'above')
+    engine.add_alert('BBB', 15, 'above')
+    assert len(engine.poll_once()) == 2
+    assert len(engine) == 0
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import calculate_portfolio_returns, calculate_sharpe_ratio, calculate_sharpe_ratios
+
+
+def test_portfolio_returns_reweight_over_holdings_with_data():
+    returns = np.array([[0.01, 0.03], [np.nan, 0.02], [np.nan, np.nan]])
+    portfolio = calculate_portfolio_returns(returns, [300, 100])
+    assert portfolio[0] == pytest.approx(0.015)
+    assert portfolio[1] == pytest.approx(0.02)
+    assert np.isnan(portfolio[2])
+
+
+def test_sharpe_ratio_uses_a_daily_risk_free_rate():
+    returns = np.random.default_rng(0).normal(0.001, 0.01, 252)
+    expected = np.sqrt(252) * (returns.mean() - 0.02 / 252) / returns.std(ddof=1)
+    assert calculate_sharpe_ratios(returns[:, None])[0] == pytest.approx(expected)
+    assert calculate_sharpe_ratio(pd.Series(returns)) == pytest.approx(expected)
+    assert np.isnan(calculate_sharpe_ratio(pd.Series([0.01])))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import backtest
+import indicators
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (400, 4)), axis=0))
+    open = close * np.exp(rng.normal(0, 0.01, close.shape))
+    high = np.maximum(open, close) * np.exp(np.abs(rng.normal(0, 0.01, close.shape)))
+    low = np.minimum(open, close) * np.exp(-np.abs(rng.normal(0, 0.01, close.shape)))
+    # One symbol lists late.
+    for values in (open, high, low, close):
+        values[:50, 3] = np.nan
+    return indicators.Bars(np.arange(400), ['AAA', 'BBB', 'CCC', 'DDD'], open, high, low, close, np.ones(close.shape))
+
+
+def test_engines_make_the_same_trades(bars):
+    params = backtest._params({})
+    event = backtest.EventBacktester(bars, **params).run()
+    for column, symbol in enumerate(bars.symbols):
+        rows, fields = backtest._symbol_arrays(bars, column)
+        vector = backtest.simulate(*fields, params)
+        event_rows, expected = event[symbol]
+        assert np.array_equal(rows, event_rows)
+        assert vector['trades']['shares'].size > 0
+        for name in backtest.TRADE_FIELDS:
+            np.testing.assert_allclose(vector['trades'][name], expected['trades'][name], err_msg=f"{symbol} {name}")
+        np.testing.assert_allclose(vector['pnl'], expected['pnl'], atol=1e-6, err_msg=symbol)
+        assert (vector['signals'], vector['triggers']) == (expected['signals'], expected['triggers'])
+
+
+def test_engines_report_the_same_portfolio(bars):
+    vector = backtest.run_backtest(bars)['portfolio']
+    event = backtest.run_backtest(bars, engine='event')['portfolio']
+    assert vector['trades'] == event['trades']
+    assert vector['total_pnl'] == pytest.approx(event['total_pnl'], abs=1e-6)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 25])
+def test_sweep_aggregates_like_run_backtest(bars, chunk_size):
+    grid = {'entry': [0.01, 0.03], 'stop': [0.05], 'take': [0.05, 0.10]}
+    results = backtest.sweep(bars, grid, processes=1, chunk_size=chunk_size)
+    assert len(results) == 4
+    assert [result['total_pnl'] for result in results] == sorted((result['total_pnl'] for result in results),
+                                                                 reverse=True)
+    for result in results:
+        params = {name: result['params'][name] for name in grid}
+        expected = backtest.run_backtest(bars, **params)['portfolio']
+        assert result['total_pnl'] == pytest.approx(expected['total_pnl'])
+        assert result['sharpe_ratio'] == pytest.approx(expected['sharpe_ratio'])
+        for name in ('trades', 'hit_rate', 'alerts', 'alert_hit_rate'):
+            assert result[name] == pytest.approx(expected[name]), name
+
+
+def test_unknown_parameters_are_rejected(bars):
+    with pytest.raises(ValueError):
+        backtest.run_backtest(bars, entri=0.01)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bar_store
+from bar_store import BarStore
+
+
+def _bars(start, count, close=100.0):
+    index = pd.bdate_range(start, periods=count)
+    frame = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1e6},
+                         index=index)
+    frame['Close'] = close + np.arange(count)
+    return bar_store.from_frame(frame)
+
+
+def test_appends_and_restates_the_tail(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write('aapl', '1d', _bars('2024-01-01', 10))
+    restated = _bars('2024-01-12', 3, close=500.0)
+    records = store.write('AAPL', '1d', restated)
+
+    assert records.size == 12
+    assert np.all(np.diff(records['time'].astype('int64')) > 0)
+    assert records['close'][8] == 108.0
+    assert list(records['close'][-3:]) == [500.0, 501.0, 502.0]
+
+
+def test_out_of_order_writes_are_merged(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write('MSFT', '1d', _bars('2024-02-01', 5))
+    records = store.write('MSFT', '1d', _bars('2024-01-01', 5, close=50.0))
+    assert records.size == 10
+    assert records['close'][0] == 50.0 and records['close'][-1] == 104.0
+    assert store.symbols('1d') == ['MSFT']
+
+
+def test_slice_by_time_and_tail(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write('SPY', '1d', _bars('2024-01-01', 20))
+    window = store.slice('SPY', '1d', start='2024-01-08', end='2024-01-13')
+    assert window.size == 5
+    assert store.slice('SPY', '1d', tail=3)['close'].tolist() == [117.0, 118.0, 119.0]
+    store.delete('SPY', '1d')
+    assert store.read('SPY', '1d').size == 0
+
+
+def test_reads_are_live_views(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write('QQQ', '1d', _bars('2024-01-01', 5))
+    view = store.read('QQQ', '1d')
+    store.write('QQQ', '1d', _bars('2024-01-05', 3, close=500.0))
+    # The restated bar shows through the earlier view; appended bars do not.
+    assert view.size == 5 and view['close'][-1] == 500.0
+    assert store.read('QQQ', '1d').size == 7
+
+
+def test_failed_merge_keeps_the_old_file(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path))
+    store.write('IWM', '1d', _bars('2024-02-01', 5))
+
+    def replace(src, dst):
+        raise PermissionError("file is mapped")
+
+    monkeypatch.setattr(bar_store.os, 'replace', replace)
+    with pytest.raises(OSError):
+        store.write('IWM', '1d', _bars('2024-01-01', 5, close=50.0))
+    assert sorted(path.name for path in (tmp_path / '1d').iterdir()) == ['IWM.bin']
+    assert store.read('IWM', '1d')['close'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
@@ -0,0 +1,87 @@
+import io
+import sys
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+import batch
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    def fetch(ticker):
+        if ticker == 'BAD':
+            raise ValueError("No price history available for BAD")
+        financial = {name: float('nan') for name in batch.FINANCIAL_FIELDS}
+        financial.update({'Company Name': f"{ticker} Inc.", 'Current Price': 187.45})
+        news = pd.DataFrame([{'title': f"{ticker} beats earnings", 'providerPublishTime': 1700000000}])
+        return {'financial_data': pd.DataFrame([financial]), 'news_data': news}
+
+    monkeypatch.setattr(batch.market_data, 'prefetch', lambda tickers, **kwargs: {'BAD': "HTTP 404"})
+    monkeypatch.setattr(batch, 'fetch_yahoo_finance', fetch)
+
+
+def _strict(constant):
+    raise ValueError(f"{constant} is not valid JSON")
+
+
+def test_read_tickers(tmp_path):
+    path = tmp_path / 'tickers.txt'
+    path.write_text("aapl, msft\n# a comment\nnvda  # trailing comment\n\ngoog,\n")
+    assert batch.read_tickers(str(path)) == ['AAPL', 'MSFT', 'NVDA', 'GOOG']
+
+
+def test_jsonl_rows_are_strict_json(offline):
+    output = io.StringIO()
+    summary = batch.run_batch(['aapl', 'bad', 'AAPL'], output=output, include_sentiment=False)
+    assert summary['completed'] == 2 and summary['failed'] == 1
+
+    rows = {row['symbol']: row for row in
+            (json.loads(line, parse_constant=_strict) for line in output.getvalue().splitlines())}
+    assert rows['AAPL']['status'] == 'ok'
+    assert rows['AAPL']['financial_data']['Current Price'] == 187.45
+    assert rows['AAPL']['financial_data']['PE Ratio'] is None
+    assert rows['AAPL']['news'][0]['title'] == "AAPL beats earnings"
+    assert rows['BAD']['status'] == 'error'
+    assert rows['BAD']['error'] == "No price history available for BAD (HTTP 404)"
+
+
+def test_csv_rows(offline):
+    output = io.StringIO()
+    batch.run_batch(['AAPL', 'BAD'], output=output, output_format='csv', include_sentiment=False)
+    reader = csv.DictReader(io.StringIO(output.getvalue()))
+    assert reader.fieldnames == batch.CSV_FIELDS
+    rows = {row['symbol']: row for row in reader}
+    assert rows['AAPL']['Company Name'] == "AAPL Inc." and rows['AAPL']['news_count'] == '1'
+    assert rows['BAD']['status'] == 'error' and rows['BAD']['news_count'] == '0'
+
+
+def test_analysis_errors_are_reported_per_ticker(offline, monkeypatch):
+    def fetch(ticker):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(batch, 'fetch_yahoo_finance', fetch)
+    output = io.StringIO()
+    assert batch.run_batch(['AAPL', 'BAD'], output=output, include_sentiment=False)['failed'] == 2
+    errors = {row['symbol']: row['error'] for row in map(json.loads, output.getvalue().splitlines())}
+    assert errors == {'AAPL': "connection reset", 'BAD': "connection reset (HTTP 404)"}
+
+
+def test_fetch_errors_stay_out_of_stdout(offline, monkeypatch, capsys):
+    import gather_yahoo_finance
+
+    def get_info(ticker):
+        raise RuntimeError("404 not found")
+
+    monkeypatch.setattr(batch, 'fetch_yahoo_finance', gather_yahoo_finance.fetch_yahoo_finance)
+    monkeypatch.setattr(batch.market_data, 'get_info', get_info)
+    batch.run_batch(['ZZZZ'], output=sys.stdout, include_sentiment=False)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['error'] == "404 not found"
+
+    assert gather_yahoo_finance.gather_yahoo_finance('ZZZZ')['financial_data'].empty
+    captured = capsys.readouterr()
+    assert captured.out == "" and "404 not found" in captured.err
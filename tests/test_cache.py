@@ -0,0 +1,21 @@
+from cache import TTLCache
+
+
+def test_expired_entries_are_misses():
+    cache = TTLCache(ttl=60)
+    cache.set('fresh', 1)
+    cache.set('stale', 2, ttl=-1)
+    assert cache.get('fresh') == 1
+    assert cache.get('stale', 'missing') == 'missing'
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.pop('a') == 1 and cache.get('a') is None
@@ -0,0 +1,75 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from charts import lttb_indices, minmax_indices
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 3), (1000, 100), (103, 20), (101, 100), (5000, 777)])
+def test_lttb_keeps_the_ends_and_returns_threshold_increasing_indices(n, threshold):
+    values = np.sin(np.arange(n) / 7.0) + np.arange(n) / n
+    indices = lttb_indices(values, threshold)
+    assert indices.size == threshold
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_keeps_a_spike():
+    values = np.zeros(1000)
+    values[637] = 100.0
+    assert 637 in lttb_indices(values, 50)
+
+
+@pytest.mark.parametrize('threshold', [0, 1, 2, 50, 51, 500])
+def test_lttb_passes_short_series_and_tiny_thresholds_through(threshold):
+    values = np.arange(50, dtype=float)
+    assert lttb_indices(values, threshold).tolist() == list(range(50))
+
+
+def test_lttb_handles_empty_and_nan_series():
+    assert lttb_indices([], 10).size == 0
+
+    values = np.arange(200, dtype=float)
+    values[50:120] = np.nan
+    indices = lttb_indices(values, 20)
+    assert indices.size == 20 and indices[0] == 0 and indices[-1] == 199
+    assert (np.diff(indices) > 0).all()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        indices = lttb_indices(np.full(200, np.nan), 20)
+    assert indices.size == 20 and (np.diff(indices) > 0).all()
+
+
+def test_minmax_keeps_extremes_in_the_tail_remainder():
+    values = np.zeros(103)
+    values[101] = 50.0
+    indices = minmax_indices(values, 20)
+    assert 101 in indices and 102 in indices
+
+
+def test_minmax_skips_buckets_without_data():
+    values = np.arange(100, dtype=float)
+    values[20:60] = np.nan
+    indices = minmax_indices(values, 10)
+    assert not np.isnan(values[indices[:-1]]).any()
+    assert {0, 19, 60, 99} <= set(indices.tolist())
+
+
+@pytest.mark.parametrize('threshold', [3, 4, 10, 20, 21, 99])
+def test_minmax_never_exceeds_the_threshold(threshold):
+    values = np.sin(np.arange(103) / 3.0)
+    values[101] = 50.0
+    indices = minmax_indices(values, threshold)
+    assert indices.size <= threshold
+    assert indices[-1] == 102 and 101 in indices
+
+
+def test_graph_without_bars_returns_early(monkeypatch, capsys):
+    import bar_store
+    import get_graph
+
+    monkeypatch.setattr(get_graph, 'get_graph_data', lambda ticker, period='1y': bar_store.empty())
+    assert get_graph.get_graph('ZZZZ', '1mo') is None
+    assert "No price data for ZZZZ" in capsys.readouterr().out
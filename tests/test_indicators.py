@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+SPECS = ('sma20', 'rsi14', 'macd', 'atr14', 'bb20')
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 3)), axis=0))
+    high, low = close * 1.01, close * 0.99
+    volume = rng.integers(100_000, 1_000_000, (300, 3)).astype(float)
+    return indicators.Bars(np.arange(300), ['AAA', 'BBB', 'CCC'], close, high, low, close, volume)
+
+
+def pandas_reference(bars):
+    close, high, low = (pd.DataFrame(values) for values in (bars.close, bars.high, bars.low))
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+    previous = close.shift()
+    true_range = pd.concat([high - low, (high - previous).abs(), (low - previous).abs()]).groupby(level=0).max()
+    middle, deviation = close.rolling(20).mean(), close.rolling(20).std()
+    return {
+        'sma20': close.rolling(20).mean(),
+        'rsi14': (100 - 100 / (1 + gain / loss)).where(change.notna().cumsum() >= 14),
+        'macd': line.where(close.notna().cumsum() >= 26),
+        'macd_signal': signal.where(close.notna().cumsum() >= 34),
+        'macd_hist': (line - signal).where(close.notna().cumsum() >= 34),
+        'atr14': true_range.where(previous.notna(), high - low).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean(),
+        'bb20_lower': middle - 2 * deviation,
+        'bb20_middle': middle,
+        'bb20_upper': middle + 2 * deviation
+    }
+
+
+def test_compute_matches_pandas(bars):
+    results = indicators.compute(bars, SPECS)
+    for name, expected in pandas_reference(bars).items():
+        np.testing.assert_allclose(results[name], expected.to_numpy(), rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_streaming_matches_compute(bars):
+    results = indicators.compute(bars, SPECS)
+    stream = indicators.StreamingIndicators(bars.symbols, SPECS)
+    for row in range(len(bars)):
+        values = stream.update(bars.open[row], bars.high[row], bars.low[row], bars.close[row], bars.volume[row])
+        for name, expected in results.items():
+            np.testing.assert_allclose(values[name], expected[row], rtol=1e-7, atol=1e-7,
+                                       err_msg=f"{name} at bar {row}")
+
+
+def test_seed_leaves_the_last_bar(bars):
+    stream = indicators.StreamingIndicators(bars.symbols, SPECS)
+    values = stream.seed(bars)
+    expected = indicators.compute(bars, SPECS)
+    for name in values:
+        np.testing.assert_allclose(values[name], expected[name][-1], rtol=1e-7, err_msg=name)
@@ -0,0 +1,173 @@
+import sys
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import LLMClient, OpenAIBackend, StubBackend, TokenBucket
+
+MESSAGES = [{'role': 'user', 'content': 'Analyze AAPL'}]
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class Completion(dict):
+    def __init__(self, content):
+        super().__init__(usage={'prompt_tokens': 3, 'completion_tokens': 1})
+        self.choices = [SimpleNamespace(message={'content': content})]
+
+
+@pytest.fixture
+def openai(monkeypatch):
+    # Stands in for the openai package; `responses` are returned or raised in order.
+    api = SimpleNamespace(calls=0, responses=[], started=threading.Event(), release=None)
+
+    def create(**kwargs):
+        api.calls += 1
+        api.started.set()
+        if api.release is not None:
+            api.release.wait(5)
+        response = api.responses.pop(0) if api.responses else "Hold."
+        if isinstance(response, Exception):
+            raise response
+        return Completion(response)
+
+    monkeypatch.setitem(sys.modules, 'openai', SimpleNamespace(ChatCompletion=SimpleNamespace(create=create)))
+    return api
+
+
+def _client(**kwargs):
+    kwargs = dict({'backend': OpenAIBackend(api_key='test'), 'requests_per_minute': 0, 'cache_dir': '',
+                   'backoff': 0}, **kwargs)
+    return LLMClient(**kwargs)
+
+
+def test_retryable_errors_are_retried(openai):
+    openai.responses = [RateLimitError("slow down"), ConnectionError("reset"), "Buy."]
+    assert _client().complete(MESSAGES) == "Buy."
+    assert openai.calls == 3
+
+    openai.responses = [ValueError("bad request"), "Buy."]
+    with pytest.raises(ValueError):
+        _client().complete(MESSAGES)
+    assert openai.calls == 4
+
+    openai.responses = [RateLimitError("slow down")] * 2
+    with pytest.raises(RateLimitError):
+        _client(max_retries=1).complete(MESSAGES)
+    assert openai.calls == 6
+
+
+def test_disk_cache_expires_after_its_ttl(openai, tmp_path, monkeypatch):
+    openai.responses = ["Buy.", "Sell."]
+    assert _client(cache_dir=str(tmp_path), cache_ttl=60).complete(MESSAGES) == "Buy."
+
+    # A new client reads the answer back from disk until it is 60 seconds old.
+    client = _client(cache_dir=str(tmp_path), cache_ttl=60)
+    assert client.complete(MESSAGES) == "Buy." and openai.calls == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert client.complete(MESSAGES) == "Sell." and openai.calls == 2
+    assert _client(cache_dir=str(tmp_path), cache_ttl=60).complete(MESSAGES) == "Sell."
+    assert openai.calls == 2
+
+
+def test_duplicate_concurrent_submits_make_one_call(openai):
+    openai.release = threading.Event()
+    client = _client()
+    futures = [client.submit(MESSAGES) for _ in range(5)]
+    assert openai.started.wait(5)
+    assert all(future is futures[0] for future in futures)
+    openai.release.set()
+    assert [future.result(5) for future in futures] == ["Hold."] * 5
+    assert openai.calls == 1
+
+    # Once it finishes, the answer comes from the cache.
+    assert client.complete(MESSAGES) == "Hold." and openai.calls == 1
+
+
+def test_token_bucket_limits_the_request_rate():
+    bucket = TokenBucket(1200, capacity=1)
+    started = time.perf_counter()
+    for _ in range(4):
+        bucket.acquire()
+    # One request is allowed at once, then one every 50ms.
+    assert time.perf_counter() - started >= 0.14
+
+
+class SlowStream(StubBackend):
+    def stream(self, model, messages, temperature):
+        for chunk in super().stream(model, messages, temperature):
+            time.sleep(0.01)
+            yield chunk
+
+
+def test_concurrent_identical_streams_share_one_call():
+    backend = SlowStream()
+    client = LLMClient(backend=backend, requests_per_minute=0, cache_dir='')
+    results = [None] * 4
+
+    def read(i):
+        results[i] = ''.join(client.stream(MESSAGES))
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 1
+    assert len(set(results)) == 1 and results[0]
+    assert client.complete(MESSAGES) == results[0]
+    assert backend.calls == 1
+
+
+def test_stream_errors_reach_every_reader():
+    readers = 4
+    joined = threading.Barrier(readers + 1, timeout=5)
+    release = threading.Event()
+
+    class Failing(StubBackend):
+        def stream(self, model, messages, temperature):
+            self.calls += 1
+            yield 'partial '
+            release.wait(5)
+            raise RuntimeError('upstream closed')
+
+    backend = Failing()
+    client = LLMClient(backend=backend, requests_per_minute=0, cache_dir='', max_retries=0)
+    chunks = [[] for _ in range(readers)]
+    errors = [None] * readers
+
+    def read(i):
+        try:
+            for chunk in client.stream(MESSAGES):
+                chunks[i].append(chunk)
+                if len(chunks[i]) == 1:
+                    joined.wait()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    # Every reader is on the shared stream before it fails.
+    joined.wait()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 1
+    assert chunks == [['partial ']] * readers
+    assert all(isinstance(error, RuntimeError) and str(error) == 'upstream closed' for error in errors)
+
+
+def test_zero_rate_means_no_limit():
+    bucket = TokenBucket(0)
+    started = time.perf_counter()
+    for _ in range(100):
+        bucket.acquire()
+    bucket.penalize(10)
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    calls = []
+
+    def download(symbol, interval, start, end):
+        calls.append((start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        index = pd.bdate_range(start, end - pd.Timedelta(days=1), tz='America/New_York')
+        close = np.arange(index.size, dtype=float) + 100
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1e6},
+                            index=index)
+
+    monkeypatch.setattr(market_data, '_download', download)
+    market_data.clear_cache()
+    yield calls
+    market_data.clear_cache()
+
+
+def test_second_request_fetches_only_the_missing_tail(downloads):
+    first = market_data.get_bars('RANGE', start='2024-01-01', end='2024-03-01')
+    second = market_data.get_bars('RANGE', start='2024-01-01', end='2024-04-01')
+
+    assert downloads == [('2024-01-01', '2024-03-01'), ('2024-02-29', '2024-04-01')]
+    assert second.size > first.size
+    assert second['time'][-1] == np.datetime64('2024-03-29')
+
+
+def test_covered_range_is_served_from_disk(downloads):
+    market_data.get_bars('COVER', start='2024-01-01', end='2024-03-01')
+    bars = market_data.get_bars('COVER', start='2024-01-15', end='2024-02-15')
+    assert len(downloads) == 1
+    assert bars['time'][0] == np.datetime64('2024-01-15')
+
+
+def test_earlier_start_fetches_only_the_missing_head(downloads):
+    market_data.get_bars('HEAD', start='2024-02-01', end='2024-03-01')
+    market_data.get_bars('HEAD', start='2024-01-01', end='2024-03-01')
+    assert downloads == [('2024-02-01', '2024-03-01'), ('2024-01-01', '2024-02-01')]
+
+
+def test_failed_bar_write_is_not_recorded_as_covered(downloads, monkeypatch):
+    import bar_store
+
+    market_data.get_bars('FAIL', start='2024-02-01', end='2024-03-01')
+    write = bar_store.BarStore.write
+
+    def failing_write(self, symbol, interval, records):
+        raise PermissionError("file is mapped")
+
+    monkeypatch.setattr(bar_store.BarStore, 'write', failing_write)
+    bars = market_data.get_bars('FAIL', start='2024-01-01', end='2024-03-01')
+    assert bars['time'][0] == np.datetime64('2024-02-01')
+
+    monkeypatch.setattr(bar_store.BarStore, 'write', write)
+    bars = market_data.get_bars('FAIL', start='2024-01-01', end='2024-03-01')
+    assert downloads[1:] == [('2024-01-01', '2024-02-01')] * 2
+    assert bars['time'][0] == np.datetime64('2024-01-01')
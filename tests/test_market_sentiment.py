@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import market_sentiment
+from market_sentiment import SentimentAggregate
+
+
+def test_retain_evicts_headlines_from_the_mean():
+    now = time.time()
+    aggregate = SentimentAggregate()
+    aggregate.add('a', 1.0, now - 3600)
+    aggregate.add('b', -0.5, now)
+    aggregate.add('c', 0.2, now - 7200)
+    aggregate.retain({'b', 'c'})
+
+    assert aggregate.count == 2
+    assert aggregate.mean == pytest.approx(-0.15)
+    expected = SentimentAggregate()
+    expected.add('b', -0.5, now)
+    expected.add('c', 0.2, now - 7200)
+    assert aggregate.decayed_mean == pytest.approx(expected.decayed_mean)
+
+    aggregate.retain(set())
+    assert aggregate.count == 0 and aggregate.mean == 0.0 and not aggregate.entries
+
+
+def test_score_follows_the_current_news(tmp_path, monkeypatch):
+    now = time.time()
+    news = [{'title': 'good', 'providerPublishTime': now}, {'title': 'bad', 'providerPublishTime': now}]
+    monkeypatch.setattr(market_sentiment.market_data, 'get_news', lambda ticker: list(news))
+    monkeypatch.setattr(market_sentiment, 'score_headline', lambda title: -1.0 if title == 'bad' else 1.0)
+    monkeypatch.setattr(market_sentiment, '_cache', market_sentiment.HeadlineCache(str(tmp_path / 'scores.db')))
+    market_sentiment._aggregates.pop('ZZZ', None)
+
+    assert market_sentiment.analyze_news_sentiment('ZZZ')['sentiment_score'] == 0.0
+    news[:] = [{'title': 'good', 'providerPublishTime': now}, {'title': 'better', 'providerPublishTime': now}]
+    result = market_sentiment.analyze_news_sentiment('ZZZ')
+    assert result['article_count'] == 2
+    assert result['sentiment_score'] == 1.0
+    assert set(market_sentiment._aggregate('ZZZ').entries) == {
+        market_sentiment.headline_id(article) for article in news}
+
+
+def test_update_scores_headlines_evicted_by_a_concurrent_call(tmp_path, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(market_sentiment, 'score_headline', lambda title: -1.0 if title == 'bad' else 1.0)
+    monkeypatch.setattr(market_sentiment, '_cache', market_sentiment.HeadlineCache(str(tmp_path / 'scores.db')))
+    market_sentiment._aggregates.pop('YYY', None)
+    headlines = {'a': ('good', now), 'b': ('bad', now)}
+
+    # 'a' looked counted when this call read the aggregate, so it brought no score for it,
+    # but another call retained a different news set in between.
+    market_sentiment._update('YYY', {'c': ('good', now)}, {'c': 1.0})
+    market_sentiment._update('YYY', headlines, {'b': -1.0})
+    aggregate = market_sentiment._aggregate('YYY')
+    assert set(aggregate.entries) == {'a', 'b'}
+    assert aggregate.mean == 0.0
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import news_store
+
+from news_store import NewsStore, link_key
+
+
+def _article(title, link=None, published=None, related=()):
+    return {'title': title, 'link': link, 'providerPublishTime': published or time.time(),
+            'publisher': 'Wire', 'relatedTickers': list(related)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NewsStore(str(tmp_path / 'news.db'))
+    yield store
+    store.close()
+
+
+def test_shared_stories_are_stored_once(store):
+    wire = _article("Stocks rally as inflation cools", "https://news.example/rally?utm_source=a")
+    added = store.ingest({
+        'AAPL': [wire, _article("Apple unveils new chip", "https://news.example/chip")],
+        'MSFT': [dict(wire, link="https://news.example/rally?utm_source=b&guccounter=1")],
+        'NVDA': [dict(wire, title="Stocks  rally as inflation cools!")]
+    })
+    assert added == 2
+    stats = store.stats()
+    assert stats['articles'] == 2 and stats['ticker_articles'] == 4
+    shared = store.query(text="rally")
+    assert len(shared) == 1 and shared[0]['relatedTickers'] == ['AAPL', 'MSFT', 'NVDA']
+
+
+def test_link_key_keeps_identifying_query_parameters(store):
+    assert link_key("https://x.com/article.php?id=1") != link_key("https://x.com/article.php?id=2")
+    assert link_key("https://X.com/article.php?utm_medium=rss&id=1&page=2&ncid=yahoo") == \
+        link_key("https://x.com/article.php?page=2&id=1")
+
+    added = store.ingest({
+        'AAPL': [_article("Apple earnings call transcript", "https://x.com/article.php?id=1")],
+        'MSFT': [_article("Microsoft earnings call transcript", "https://x.com/article.php?id=2")]
+    })
+    assert added == 2 and store.stats()['articles'] == 2
+
+
+def test_query_by_ticker_text_mentions_and_time(store):
+    now = time.time()
+    store.ingest({
+        'AAPL': [_article("Apple beats earnings", published=now - 3600)],
+        'MSFT': [_article("Microsoft partners with Apple on AI", published=now - 7200),
+                 _article("Microsoft cloud growth slows", published=now - 5 * 86400)]
+    })
+    assert [a['title'] for a in store.query(tickers=['aapl'])] == ["Apple beats earnings"]
+    assert len(store.query(tickers=['AAPL'], mentions=[['apple']])) == 2
+    assert [a['title'] for a in store.search("cloud growth", hours=None)] == ["Microsoft cloud growth slows"]
+    assert store.search("cloud growth") == []
+    assert store.query(text="the") == []
+
+
+def test_stale_tickers_and_retention(store):
+    now = time.time()
+    store.ingest({'AAPL': [_article("New story")]}, fetched_at=now)
+    assert store.stale(['AAPL', 'MSFT'], max_age=600) == ['MSFT']
+
+    # Retention is applied at most once per PRUNE_INTERVAL.
+    store.ingest({'MSFT': [_article("Old story", published=now - 40 * 86400)]}, fetched_at=now + 60)
+    assert store.stats()['articles'] == 2
+    store.ingest({'MSFT': [_article("Later story")]}, fetched_at=now + news_store.PRUNE_INTERVAL + 1)
+    assert store.stats()['articles'] == 2
+    assert {a['title'] for a in store.query()} == {"New story", "Later story"}
+
+
+def test_related_news_ignores_tickers_used_as_words(store, monkeypatch):
+    import market_data
+    import news_store
+
+    monkeypatch.setattr(news_store, 'get_news_store', lambda: store)
+    monkeypatch.setattr(market_data, 'get_news', lambda symbol: [])
+    monkeypatch.setattr(market_data, 'get_info', lambda symbol: {'shortName': 'ServiceNow, Inc.'})
+    store.ingest({
+        'NOW': [_article("Quarterly subscription revenue tops estimates")],
+        'SPY': [_article("Buy now before rates fall, strategists say"),
+                _article("Software rally led by NOW and CRM"),
+                _article("Analysts like $NOW into earnings"),
+                _article("ServiceNow lands federal contract")]
+    })
+    titles = {article['title'] for article in news_store.related_news('now')}
+    assert titles == {"Quarterly subscription revenue tops estimates", "Software rally led by NOW and CRM",
+                      "Analysts like $NOW into earnings", "ServiceNow lands federal contract"}
+
+
+def test_portfolio_news_takes_the_tickers(store, monkeypatch):
+    import news_store
+
+    monkeypatch.setattr(news_store, 'get_news_store', lambda: store)
+    store.ingest({'AAPL': [_article("Apple beats earnings")], 'MSFT': [_article("Microsoft cloud grows")]})
+    assert [a['title'] for a in news_store.portfolio_news(['msft'], refresh=False)] == ["Microsoft cloud grows"]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import optimizer
+from optimizer import RiskModel
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0004, 1, (500, len(SYMBOLS))) * np.array([0.01, 0.015, 0.02, 0.025, 0.03])
+    return RiskModel.from_returns(SYMBOLS, returns)
+
+
+@pytest.mark.parametrize('method', optimizer.METHODS)
+def test_weights_respect_caps(model, method):
+    sectors = ['Tech', 'Tech', 'Energy', 'Energy', 'Health']
+    result = optimizer.optimize(model, method, sectors, max_weight=30, max_sector=50)
+    weights = result['weights']
+    assert weights.sum() == pytest.approx(100)
+    assert weights.max() <= 30 + 1e-6
+    assert weights.groupby(np.array(sectors)).sum().max() <= 50 + 1e-6
+
+
+def test_risk_parity_equalizes_contributions(model):
+    result = optimizer.optimize(model, 'risk_parity')
+    assert np.allclose(result['risk_contributions'], 20, atol=1e-4)
+
+
+def test_partial_risk_budgets_give_other_symbols_no_weight(model):
+    result = optimizer.optimize(model, 'risk_parity', risk_budgets={'aaa': 1, 'CCC': 3})
+    weights = result['weights']
+    assert not weights.isna().any()
+    assert weights[['BBB', 'DDD', 'EEE']].sum() == 0
+    contributions = result['risk_contributions']
+    assert contributions['CCC'] / contributions['AAA'] == pytest.approx(3, rel=1e-4)
+
+
+@pytest.mark.parametrize('budgets', [{'AAA': -1, 'BBB': 2}, {'AAA': 0}, {'AAA': float('nan')}])
+def test_invalid_risk_budgets_raise(model, budgets):
+    with pytest.raises(ValueError):
+        optimizer.optimize(model, 'risk_parity', risk_budgets=budgets)
+
+
+def test_rebalance_trades_net_to_zero():
+    trades = optimizer.rebalance(['AAA', 'BBB', 'CCC'], [600, 300, 100], [40, 30, 30], [10, 20, 50], band=0.5)
+    buys = trades.loc[trades['action'] == 'BUY', 'value'].sum()
+    sells = trades.loc[trades['action'] == 'SELL', 'value'].sum()
+    assert buys == pytest.approx(sells) == pytest.approx(200)
+    assert set(trades['symbol']) == {'AAA', 'CCC'}
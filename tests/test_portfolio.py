@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from portfolio import PortfolioStore, SQLitePortfolioStore, mark_to_market
+
+
+def test_mark_to_market_reports_repriced_positions():
+    store = PortfolioStore()
+    store.add_position('AAPL', 1000, 1100, 'Technology', shares=10)
+    store.add_position('MSFT', 1000, 900, 'Technology')
+    assert mark_to_market(store, prices=[150.0, 400.0]) == ['AAPL']
+    assert list(store.column('current_value')) == [1500.0, 900.0]
+
+
+def _disk_rows(path):
+    import sqlite3
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT symbol, initial_investment, current_value, sector, shares FROM positions")
+        return {row[0]: row[1:] for row in rows}
+
+
+def _memory_rows(store):
+    frame = store.to_frame().replace({float('nan'): None})
+    return {row[0]: tuple(row[1:]) for row in frame.itertuples(index=False)}
+
+
+def _seeded(path):
+    store = SQLitePortfolioStore(str(path))
+    store.add_position('AAPL', 1000, 1100, 'Technology', shares=10)
+    store.add_position('JPM', 500, 450, 'Financials')
+    store.add_position('MSFT', 2000, 2500, 'Technology', shares=5)
+    store.add_position('XOM', 800, 900, 'Energy')
+    return store
+
+
+def test_sqlite_store_loads_lazily(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    _seeded(path).close()
+
+    store = SQLitePortfolioStore(str(path))
+    assert store._conn is None and not store._loaded
+    assert store.symbols == ['AAPL', 'JPM', 'MSFT', 'XOM']
+    assert store._loaded
+    assert store.get('msft') == {'symbol': 'MSFT', 'sector': 'Technology', 'initial_investment': 2000.0,
+                                 'current_value': 2500.0, 'shares': 5.0}
+
+
+def test_sqlite_store_writes_each_change(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    store = _seeded(path)
+    store.add_position('AAPL', 500, 600, shares=5)
+    store.update_value('JPM', 475)
+    assert _disk_rows(str(path)) == _memory_rows(store)
+    assert _disk_rows(str(path))['AAPL'] == (1500.0, 1700.0, 'Technology', 15.0)
+    assert _disk_rows(str(path))['JPM'] == (500.0, 475.0, 'Financials', None)
+
+    with pytest.raises(KeyError):
+        store.update_value('NVDA', 1)
+
+
+def test_sqlite_store_remove_keeps_memory_and_disk_in_agreement(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    store = _seeded(path)
+    # Removing a middle row moves the last position into its slot in memory.
+    assert store.remove('jpm')
+    assert not store.remove('JPM')
+    assert store.symbols == ['AAPL', 'XOM', 'MSFT']
+    assert _disk_rows(str(path)) == _memory_rows(store)
+
+    store.update_value('XOM', 950)
+    assert store.get('XOM')['current_value'] == 950.0
+    assert _disk_rows(str(path)) == _memory_rows(store)
+
+
+def test_sqlite_store_round_trips_through_reload(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    store = _seeded(path)
+    store.remove('AAPL')
+    assert mark_to_market(store, prices=[520.0 if symbol == 'MSFT' else np.nan for symbol in store]) == ['MSFT']
+    expected = _memory_rows(store)
+    store.close()
+
+    reloaded = SQLitePortfolioStore(str(path))
+    assert _memory_rows(reloaded) == expected
+    assert expected['MSFT'] == (2000.0, 2600.0, 'Technology', 5.0)
+
+
+def test_sqlite_store_aggregates_in_sql(tmp_path):
+    store = _seeded(tmp_path / 'portfolio.db')
+    store.remove('JPM')
+    assert store.totals() == (3800.0, 4500.0)
+    assert store.profit_loss().to_dict() == {'AAPL': 100.0, 'MSFT': 500.0, 'XOM': 100.0}
+    assert store.profit_loss().index.tolist() == ['AAPL', 'MSFT', 'XOM']
+    assert store.profit_loss().index.name == 'symbol'
+    assert store.sector_totals().to_dict() == {'Energy': 900.0, 'Technology': 3600.0}
+
+    memory = PortfolioStore()
+    for symbol in store.symbols:
+        position = store.get(symbol)
+        memory.upsert(**position)
+    assert memory.totals() == store.totals()
+    assert memory.profit_loss().equals(store.profit_loss())
+    assert memory.sector_totals().equals(store.sector_totals())
+
+
+def test_sqlite_store_keeps_missing_values_missing(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    store = _seeded(path)
+    store.upsert('NVDA', sector='Technology', shares=3)
+    memory = PortfolioStore()
+    for symbol in store.symbols:
+        memory.upsert(**store.get(symbol))
+    assert _disk_rows(str(path))['NVDA'] == (None, None, 'Technology', 3.0)
+    assert store.totals() == memory.totals() == (4300.0, 4950.0)
+    assert store.profit_loss().equals(memory.profit_loss())
+    assert store.sector_totals().equals(memory.sector_totals())
+    store.close()
+
+    position = SQLitePortfolioStore(str(path)).get('NVDA')
+    assert np.isnan(position['initial_investment']) and np.isnan(position['current_value'])
+
+
+def test_sqlite_store_migrates_not_null_columns(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'portfolio.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE positions (symbol TEXT PRIMARY KEY, initial_investment REAL NOT NULL,
+                current_value REAL NOT NULL, sector TEXT NOT NULL, shares REAL, updated_at REAL NOT NULL)
+        """)
+        conn.execute("INSERT INTO positions VALUES ('AAPL', 1000, 1100, 'Technology', 10, 0)")
+    conn.close()
+
+    store = SQLitePortfolioStore(path)
+    assert store.get('AAPL')['current_value'] == 1100.0
+    store.upsert('NVDA', sector='Technology')
+    assert _disk_rows(path)['NVDA'] == (None, None, 'Technology', None)
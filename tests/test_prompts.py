@@ -0,0 +1,27 @@
+import numpy as np
+
+from prompts import count_tokens, fit, format_number, format_price, price_section
+
+
+def test_prices_keep_cents():
+    assert format_price(187.45) == '187.45'
+    assert format_price(1234.5) == '1234.50'
+    assert format_price(float('nan')) is None
+
+
+def test_price_section_keeps_cents():
+    closes = np.array([187.45, 187.5, 187.62, 188.01])
+    text = price_section(closes, 'closes_5m')
+    assert 'last=188.01' in text and 'low=187.45' in text
+    assert '187.50' in text and '187.62' in text
+
+
+def test_format_number_keeps_four_significant_digits():
+    assert format_number(31.214) == '31.21'
+    assert format_number(2.31e12) == '2.31T'
+
+
+def test_fit_drops_lowest_priority_items_first():
+    items = ['a=1', 'b=2', 'c=3']
+    assert fit('x', items, None) == 'X: a=1; b=2; c=3'
+    assert fit('x', items, count_tokens('X: a=1; b=2')) == 'X: a=1; b=2'
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_engine import RiskEngine, RollingMoments
+
+
+def _closes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=count)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, count))), index=index)
+
+
+def test_rolling_moments_match_numpy():
+    values = np.random.default_rng(1).normal(0, 0.02, 100)
+    moments = RollingMoments(20)
+    for value in values:
+        moments.push(value)
+    window = values[-20:]
+    assert moments.mean == pytest.approx(window.mean())
+    assert moments.std == pytest.approx(window.std(ddof=1))
+    assert moments.value_at_risk(0.95) == pytest.approx(-np.sort(window)[0])
+
+
+def test_pop_restores_the_evicted_value():
+    values = np.random.default_rng(2).normal(0, 0.02, 30)
+    moments = RollingMoments(20)
+    for value in values:
+        moments.push(value)
+    moments.push(0.5)
+    moments.pop()
+    assert list(moments.values) == list(values[-20:])
+    assert moments.std == pytest.approx(values[-20:].std(ddof=1))
+
+
+def test_restated_last_bar_replaces_the_old_close():
+    closes = _closes(80)
+    benchmark = _closes(80, seed=3)
+    engine = RiskEngine(windows=(20,), benchmark=None)
+    partial = closes.copy()
+    partial.iloc[-1] *= 0.9
+    engine.feed('ABC', partial, benchmark)
+    engine.feed('ABC', closes, benchmark)
+
+    expected = RiskEngine(windows=(20,), benchmark=None)
+    expected.feed('ABC', closes, benchmark)
+    got, want = (e.metrics('ABC', 20, refresh=False) for e in (engine, expected))
+    for name in ('volatility', 'var_95', 'cvar_95', 'max_drawdown', 'beta', 'observations'):
+        assert got[name] == pytest.approx(want[name])
+
+
+def test_next_bar_uses_the_restated_close():
+    closes = _closes(40)
+    engine = RiskEngine(windows=(20,), benchmark=None)
+    partial = closes.iloc[:-1].copy()
+    partial.iloc[-1] *= 1.1
+    engine.feed('ABC', partial)
+    engine.feed('ABC', closes)
+
+    expected = RiskEngine(windows=(20,), benchmark=None)
+    expected.feed('ABC', closes)
+    assert engine.metrics('ABC', 20, refresh=False)['mean_return'] == \
+        pytest.approx(expected.metrics('ABC', 20, refresh=False)['mean_return'])
@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+import pytest
+
+import screener
+
+
+def _snapshot(symbols, fetched_at=None):
+    symbols = sorted(symbols)
+    columns = {name: np.full(len(symbols), np.nan) for name in screener.NUMERIC_FIELDS}
+    columns['price'] = np.array([float(len(symbol)) for symbol in symbols])
+    columns['pe'] = np.arange(len(symbols), dtype=float)
+    text = {name: [''] * len(symbols) for name in screener.TEXT_FIELDS}
+    text['sector'] = ['Technology'] * len(symbols)
+    return screener.Snapshot(symbols, columns, text, fetched_at)
+
+
+@pytest.fixture
+def built(monkeypatch):
+    calls = []
+
+    def build_snapshot(symbols, max_workers=16):
+        calls.append(sorted(symbols))
+        return _snapshot(symbols)
+
+    monkeypatch.setattr(screener, 'build_snapshot', build_snapshot)
+    return calls
+
+
+def test_where_uses_ranges_and_text():
+    snapshot = _snapshot(['AAPL', 'MSFT', 'GOOG', 'IBM'])
+    rows = snapshot.where(screener.parse_query("pe >= 1 and pe < 3 and sector = technology"))
+    assert list(snapshot.symbols[rows]) == ['GOOG', 'IBM']
+
+
+def test_screen_with_new_tickers_keeps_the_universe(tmp_path, built):
+    path = str(tmp_path / 'snapshot.npz')
+    universe = [f"SYM{i}" for i in range(50)]
+    _snapshot(universe).save(path)
+
+    screen = screener.Screener(path=path)
+    results = screen.screen("price > 0", symbols=['XYZ', 'SYM1'])
+
+    assert built == [['XYZ']]
+    assert sorted(results.index) == ['SYM1', 'XYZ']
+    saved = screener.Snapshot.load(path)
+    assert len(saved) == 51
+    assert 'XYZ' in saved and 'SYM49' in saved
+
+
+def test_screen_with_known_tickers_fetches_nothing(tmp_path, built):
+    path = str(tmp_path / 'snapshot.npz')
+    _snapshot(['AAPL', 'MSFT']).save(path)
+
+    screener.Screener(path=path).screen("price > 0", symbols=['aapl'])
+    assert built == []
+
+
+def test_expired_snapshot_rebuilds_everything_known(tmp_path, built):
+    path = str(tmp_path / 'snapshot.npz')
+    _snapshot(['AAPL', 'MSFT'], fetched_at=time.time() - 2 * screener.SNAPSHOT_TTL).save(path)
+
+    snapshot = screener.Screener(path=path).refresh(['XYZ'])
+    assert built == [['AAPL', 'MSFT', 'XYZ']]
+    assert len(snapshot) == 3
+
+
+def test_merge_keeps_oldest_fetch_time():
+    old = _snapshot(['AAPL', 'MSFT'], fetched_at=100.0)
+    merged = old.merge(_snapshot(['MSFT', 'XYZ'], fetched_at=200.0))
+    assert list(merged.symbols) == ['AAPL', 'MSFT', 'XYZ']
+    assert merged.fetched_at == 100.0
+    assert merged.columns['price'][2] == 3.0
@@ -0,0 +1,153 @@
+import json
+import asyncio
+
+import pytest
+
+import service
+
+
+def read(data, limit=2 ** 16):
+    async def run():
+        reader = asyncio.StreamReader(limit=limit)
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await service._read_request(reader)
+    return asyncio.run(run())
+
+
+def test_reads_request_with_body():
+    method, target, headers, body = read(b"POST /alerts HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}")
+    assert (method, target, body) == ('POST', '/alerts', b'{}')
+
+
+@pytest.mark.parametrize('data', [
+    b"GET / HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+    b"GET / HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+    b"GET / HTTP/1.1\r\nX-Long: " + b"a" * 200 + b"\r\n\r\n"
+])
+def test_bad_requests_are_400(data):
+    with pytest.raises(service.HTTPError) as error:
+        read(data, limit=128)
+    assert error.value.status == 400
+
+
+def test_nan_is_written_as_null():
+    class Writer:
+        def write(self, data):
+            self.data = data
+
+    writer = Writer()
+    service._write_response(writer, 200, {'var_95': float('nan'), 'rows': [1.5, float('inf')]})
+    body = writer.data.split(b'\r\n\r\n', 1)[1]
+    assert json.loads(body) == {'var_95': None, 'rows': [1.5, None]}
+
+
+def test_coalescer_shares_one_call_between_identical_requests():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    release = threading.Event()
+    calls = []
+
+    def fetch(ticker):
+        calls.append(ticker)
+        release.wait(5)
+        if ticker == 'BAD':
+            raise ValueError(f"No price history available for {ticker}")
+        return {'ticker': ticker}
+
+    async def run(coalescer, key, count):
+        waiters = [asyncio.ensure_future(coalescer.run(key, fetch, key)) for _ in range(count)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        coalescer = service.Coalescer(executor)
+        results = asyncio.run(run(coalescer, 'AAPL', 5))
+        assert results == [{'ticker': 'AAPL'}] * 5
+        assert (coalescer.calls, coalescer.coalesced, len(coalescer)) == (1, 4, 0)
+
+        release.clear()
+        errors = asyncio.run(run(coalescer, 'BAD', 3))
+        assert [str(error) for error in errors] == ["No price history available for BAD"] * 3
+        assert calls == ['AAPL', 'BAD'] and len(coalescer) == 0
+
+
+@pytest.mark.parametrize('failure, status', [
+    ('no_data', 404), ('data_upstream', 502), ('llm', 502), (None, 200)
+])
+def test_analysis_failures_map_to_statuses(monkeypatch, failure, status):
+    import llm_client
+    import stock_analysis
+
+    def build(ticker, holding, sentiment):
+        if failure == 'no_data':
+            raise ValueError(f"No price history available for {ticker}")
+        if failure == 'data_upstream':
+            raise ConnectionError("connection reset")
+        return "prompt"
+
+    def chat(system, prompt, **kwargs):
+        if failure == 'llm':
+            raise RuntimeError("rate limited")
+        return "Hold."
+
+    monkeypatch.setattr(stock_analysis, 'build_analysis_prompt', build)
+    monkeypatch.setattr(llm_client, 'chat', chat)
+    advisor = service.AdvisorService(max_workers=2)
+    try:
+        code, payload = asyncio.run(advisor.dispatch('GET', '/analyze?ticker=zzzz', b''))
+    finally:
+        advisor.close()
+    assert code == status
+    if status == 200:
+        assert payload == {'ticker': 'ZZZZ', 'holding': False, 'analysis': "Hold."}
+    else:
+        assert 'analysis' not in payload and payload['error']
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', 'abc'])
+def test_numbers_must_be_finite(value):
+    with pytest.raises(service.HTTPError) as error:
+        service._number({'target_price': value}, 'target_price')
+    assert error.value.status == 400
+
+
+def test_identical_alerts_share_the_prediction_but_not_the_alert(monkeypatch):
+    import threading
+    import real_time_alerts
+    from alert_engine import AlertEngine
+
+    release = threading.Event()
+    predictions = []
+
+    def predict(ticker, target_price, alert_type='above'):
+        predictions.append(ticker)
+        release.wait(5)
+        return "AAPL could reach $200 today."
+
+    engine = AlertEngine(quote_source=object())
+    monkeypatch.setattr(engine, 'start', lambda: None)
+    monkeypatch.setattr(real_time_alerts, '_engine', engine)
+    monkeypatch.setattr(real_time_alerts, 'get_ai_prediction', predict)
+    advisor = service.AdvisorService(max_workers=4)
+    body = json.dumps({'ticker': 'AAPL', 'target_price': 200}).encode()
+
+    async def run():
+        requests = [asyncio.ensure_future(advisor.dispatch('POST', '/alerts', body)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*requests)
+
+    try:
+        responses = asyncio.run(run())
+        assert [status for status, _ in responses] == [201, 201]
+        assert predictions == ['AAPL']
+        first, second = (payload['alert']['id'] for _, payload in responses)
+        assert first != second and len(engine) == 2
+
+        status, _ = asyncio.run(advisor.dispatch('DELETE', f'/alerts?id={first}', b''))
+        assert status == 200 and [alert.id for alert in engine.alerts()] == [second]
+    finally:
+        advisor.close()
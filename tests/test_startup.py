@@ -0,0 +1,27 @@
+import statistics
+import warnings
+
+import bench
+import config
+
+
+def test_main_imports_within_the_startup_budget():
+    # Cumulative `python -X importtime` figure for `main`, which leaves out
+    # interpreter start-up and so does not depend on how fast the machine
+    # spawns processes.
+    timings = bench.import_time('main', 5)
+    assert timings, "python -X importtime did not report main"
+    elapsed_ms = statistics.median(timings) * 1000
+    assert elapsed_ms <= config.STARTUP_BUDGET_MS, \
+        f"importing main took {elapsed_ms:.0f}ms (budget {config.STARTUP_BUDGET_MS:.0f}ms)"
+
+
+def test_main_menu_launch_time_is_advisory():
+    # Wall time from spawning `python main.py` to its first input() prompt.
+    # Process spawn varies too much between machines to fail on, so an
+    # overrun is reported as a warning only.
+    bench.launch_time(1)
+    elapsed_ms = statistics.median(bench.launch_time(5)) * 1000
+    if elapsed_ms > config.STARTUP_BUDGET_MS:
+        warnings.warn(f"main.py took {elapsed_ms:.0f}ms to show its menu "
+                      f"(budget {config.STARTUP_BUDGET_MS:.0f}ms; advisory)")
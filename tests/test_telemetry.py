@@ -0,0 +1,111 @@
+import pytest
+
+import telemetry
+
+
+@pytest.fixture
+def metrics():
+    previous = telemetry.enabled()
+    telemetry.enable()
+    telemetry.reset()
+    yield
+    telemetry.reset()
+    telemetry.enable(previous)
+
+
+def _lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_counters_are_kept_per_label_set(metrics):
+    telemetry.inc('cache_requests_total', cache='llm', result='hit')
+    telemetry.inc('cache_requests_total', 2, result='hit', cache='llm')
+    telemetry.inc('cache_requests_total', cache='llm', result='miss')
+    telemetry.cache_result('headline', True, 0)
+
+    text = telemetry.prometheus()
+    assert _lines(text, 'advisor_cache_requests_total') == [
+        'advisor_cache_requests_total{cache="llm",result="hit"} 3',
+        'advisor_cache_requests_total{cache="llm",result="miss"} 1'
+    ]
+    assert '# TYPE advisor_cache_requests_total counter' in text
+    assert 'headline' not in text
+
+
+def test_histogram_exposition(metrics):
+    for value in (0.003, 0.003, 0.2, 120.0):
+        telemetry.observe('http_request_seconds', value, route='/quote')
+
+    text = telemetry.prometheus()
+    assert '# TYPE advisor_http_request_seconds histogram' in text
+    buckets = _lines(text, 'advisor_http_request_seconds_bucket')
+    assert buckets[0] == 'advisor_http_request_seconds_bucket{route="/quote",le="0.001"} 0'
+    assert 'advisor_http_request_seconds_bucket{route="/quote",le="0.005"} 2' in buckets
+    assert 'advisor_http_request_seconds_bucket{route="/quote",le="0.25"} 3' in buckets
+    assert buckets[-1] == 'advisor_http_request_seconds_bucket{route="/quote",le="+Inf"} 4'
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert _lines(text, 'advisor_http_request_seconds_sum') == ['advisor_http_request_seconds_sum{route="/quote"} 120.206']
+    assert _lines(text, 'advisor_http_request_seconds_count') == ['advisor_http_request_seconds_count{route="/quote"} 4']
+
+
+def test_label_values_are_escaped(metrics):
+    telemetry.inc('http_requests_total', route='/a"b\\c\nd', status=200)
+    assert 'route="/a\\"b\\\\c\\nd",status="200"' in telemetry.prometheus()
+
+
+def test_track_counts_errors_but_not_closed_streams(metrics):
+    with telemetry.track('llm', 'chat'):
+        pass
+    with pytest.raises(RuntimeError):
+        with telemetry.track('llm', 'chat'):
+            raise RuntimeError("upstream down")
+
+    def stream():
+        with telemetry.track('llm', 'stream'):
+            yield 'first'
+            yield 'second'
+
+    reader = stream()
+    next(reader)
+    reader.close()
+
+    text = telemetry.prometheus()
+    assert _lines(text, 'advisor_upstream_requests_total') == [
+        'advisor_upstream_requests_total{operation="chat",service="llm",status="error"} 1',
+        'advisor_upstream_requests_total{operation="chat",service="llm",status="ok"} 1',
+        'advisor_upstream_requests_total{operation="stream",service="llm",status="ok"} 1'
+    ]
+    assert 'advisor_upstream_request_seconds_count{operation="chat",service="llm"} 2' in text
+
+
+def test_bytes_are_attributed_to_the_tracked_call(metrics):
+    with telemetry.track('yahoo', 'info'):
+        with telemetry.track('yahoo', 'news'):
+            telemetry.count_bytes('yahoo', 100)
+        telemetry.count_bytes('yahoo', 50)
+    telemetry.count_bytes('yahoo', 7)
+
+    assert _lines(telemetry.prometheus(), 'advisor_upstream_bytes_total') == [
+        'advisor_upstream_bytes_total{operation="info",service="yahoo"} 50',
+        'advisor_upstream_bytes_total{operation="news",service="yahoo"} 100',
+        'advisor_upstream_bytes_total{operation="other",service="yahoo"} 7'
+    ]
+
+
+def test_nothing_is_recorded_while_disabled(metrics):
+    telemetry.enable(False)
+    telemetry.inc('cache_requests_total', cache='llm', result='hit')
+    with telemetry.track('llm', 'chat'):
+        telemetry.count_bytes('yahoo', 10)
+    assert telemetry.prometheus() == "\n"
+    assert telemetry.summary() == []
+
+
+def test_histogram_quantile_interpolates_within_a_bucket():
+    histogram = telemetry.Histogram()
+    for value in (0.03, 0.04, 0.06, 0.07):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(0.05)
+    assert histogram.quantile(1.0) == pytest.approx(0.1)
+    assert telemetry.Histogram().quantile(0.5) is None